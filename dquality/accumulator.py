@@ -63,20 +63,29 @@ import sys
 import pyinotify
 from pyinotify import WatchManager
 from multiprocessing import Process, Queue
+from threading import Thread
 import json
-import numpy as np
 import dquality.common.utilities as utils
+import dquality.readers.file_reader as freader
 import dquality.handler as datahandler
 import dquality.common.report as report
 import dquality.common.constants as const
-from dquality.common.containers import Data
+import dquality.common.qualitychecks as calc
+import dquality.common.result_cache as result_cache
+from dquality.common.containers import Data, Metrics
+if sys.version[0] == '2':
+    import Queue as queue
+else:
+    import queue as queue
 
 __author__ = "Barbara Frosik"
 __copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
 __all__ = ['init',
            'verify',
-           'directory']
+           'directory',
+           'read_files',
+           'cache_results']
 
 files = Queue()
 INTERRUPT = 'interrupt'
@@ -114,6 +123,18 @@ def init(config):
     consumers : dict
         a dictionary containing consumer processes to run, and their parameters
 
+    block_bytes : int
+        size in bytes of a block of frames read at once; at most three blocks are held in memory
+
+    cache : ResultCache
+        a cache of calculated results, or None if not configured
+
+    metrics_dir : str
+        a directory where calculated results are saved, or None if not configured
+
+    hdf_template : str
+        a file with the structure of the verified files, or None if not configured
+
     """
     conf = utils.get_config(config)
     if conf is None:
@@ -156,7 +177,26 @@ def init(config):
         with open(consumersfile) as consumers_file:
             consumers = json.loads(consumers_file.read())
 
-    return logger, limits, quality_checks, extensions, report_type, consumers
+    try:
+        max_memory = float(conf['max_memory_mb'])
+    except KeyError:
+        max_memory = 256
+    # one block is read, one is waiting in the prefetch queue, and one is being verified
+    block_bytes = max(int(max_memory * 2**20 / 3), 1)
+
+    cache = result_cache.get_cache(conf)
+
+    try:
+        metrics_dir = conf['metrics_dir']
+        if not os.path.isdir(metrics_dir):
+            os.makedirs(metrics_dir)
+    except KeyError:
+        metrics_dir = None
+
+    hdf_template = utils.get_file(conf, 'hdf_template', logger, False)
+
+    return logger, limits, quality_checks, extensions, report_type, consumers, block_bytes, cache, metrics_dir, \
+        hdf_template
 
 
 def directory(directory, patterns):
@@ -197,6 +237,135 @@ def directory(directory, patterns):
     wdd = wm.add_watch(directory, mask, rec=False)
     return notifier
 
+
+def read_files(logger, filesq, blockq, data_type, block_bytes, cache=None, config_key=None, chained=False,
+               template=None):
+    """
+    This function reads data of the files received on the 'filesq' queue in bounded blocks.
+
+    This function is typically started as a thread. For each file it reads the data set of the given data type in
+    chunk aligned blocks, and puts a tuple of the file name, number of frames in the data set, index of the first
+    frame in the block, the block, and the cache key of the file into the 'blockq' queue. The 'blockq' is bounded, so
+    the thread reads ahead (i.e. the first block of a next file while the current file is verified) only one block.
+    A file that cannot be read is passed with None block. If the results of the file are cached, the file is not read,
+    and the cached Metrics are passed instead of a block. The function exits when None is received on the 'filesq'
+    queue, after passing the None to the 'blockq' queue.
+
+    Parameters
+    ----------
+    logger : Logger
+        logger instance
+
+    filesq : Queue
+        a queue delivering file names
+
+    blockq : Queue
+        a bounded queue the blocks are delivered on
+
+    data_type : str
+        defines which data type is being evaluated
+
+    block_bytes : int
+        size in bytes of a block
+
+    cache : ResultCache
+        optional, a cache of calculated results
+
+    config_key : str
+        a hash of the configuration the results are cached with
+
+    chained : boolean
+        if True, the results of a file depend on the file verified before, whose identity is part of the cache key
+
+    template : str
+        optional, a file with the same structure as the files; the data sets are looked up in the template once
+
+    Returns
+    -------
+    None
+    """
+    reader = freader.Hdf_fr(block_bytes)
+    previous = None
+    while True:
+        file = filesq.get()
+        if file is None:
+            blockq.put(None)
+            return
+        key = None
+        if cache is not None:
+            key = cache.get_key(file, config_key, previous if chained else None)
+            try:
+                previous = cache.get_identity(file)
+            except (IOError, OSError):
+                previous = None
+            metrics = cache.get(key)
+            if metrics is not None:
+                if data_type in metrics:
+                    cached = metrics[data_type]
+                else:
+                    cached = Metrics(data_type, [], {})
+                blockq.put((file, len(cached.indexes), 0, cached, key))
+                continue
+        fp = None
+        try:
+            fp, tags = utils.get_data_hdf(file, template, **reader.get_cache_settings())
+            dset = fp[tags['/exchange/'+data_type]]
+            nframes = dset.shape[0]
+            if nframes == 0:
+                blockq.put((file, 0, 0, None, key))
+            for start, block in reader.get_blocks(dset):
+                # the reader reuses the buffer, the block is copied before passing it on
+                blockq.put((file, nframes, start, block.copy(), key))
+        except (IOError, KeyError):
+            logger.error('cannot read ' + data_type + ' from file ' + file)
+            blockq.put((file, 0, 0, None, key))
+        if fp is not None:
+            fp.close()
+
+
+def cache_results(logger, cache, aggregate, entries, data_type, chained):
+    """
+    This function adds calculated results of the verified files to the result cache.
+
+    Parameters
+    ----------
+    logger : Logger
+        logger instance
+
+    cache : ResultCache
+        a cache of calculated results
+
+    aggregate : dict
+        results delivered by the handler
+
+    entries : list
+        a list of tuples of file name, cache key, index of the first frame of the file, and number of frames
+
+    data_type : str
+        defines which data type is being evaluated
+
+    chained : boolean
+        if True, the last frame of each file is cached, as the results of the next file depend on it
+
+    Returns
+    -------
+    None
+    """
+    reader = freader.Hdf_fr()
+    for file, key, start, nframes in entries:
+        metrics = result_cache.get_metrics(aggregate, start, start + nframes)
+        if chained and data_type in metrics:
+            try:
+                fp, tags = utils.get_data_hdf(file)
+                dset = fp[tags['/exchange/'+data_type]]
+                metrics[data_type].last_frame = reader.read_block(dset, nframes - 1, 1)[0]
+                fp.close()
+            except (IOError, KeyError):
+                logger.error('cannot read ' + data_type + ' from file ' + file)
+                continue
+        cache.put(key, file, metrics)
+
+
 def verify(conf, folder, data_type, num_files, report_by_files=True):
     """
     This function discovers new files and evaluates data in the files.
@@ -248,23 +417,45 @@ def verify(conf, folder, data_type, num_files, report_by_files=True):
         a dictionary or list containing bad indexes
 
     """
-    logger, limits, quality_checks, extensions, report_type, consumers = init(conf)
+    logger, limits, quality_checks, extensions, report_type, consumers, block_bytes, cache, metrics_dir, hdf_template = \
+        init(conf)
     if not os.path.isdir(folder):
         logger.error(
             'parameter error: directory ' +
             folder + ' does not exist')
         sys.exit(-1)
 
+    # the results of statistical checks depend on all files verified before, and are not cached
+    if cache is not None and any(qc in calc.statistical_checks for qc in quality_checks[data_type]):
+        logger.info('results of statistical quality checks are not cached')
+        cache.close()
+        cache = None
+    # the difference of the first frame of a file is evaluated against the last frame of the file before
+    chained = 'diff_sat' in quality_checks[data_type]
+    config_key = None
+    if cache is not None:
+        config_key = result_cache.get_config_key({data_type: quality_checks[data_type]}, limits, data_type)
+    cache_entries = []
+
     notifier = directory(folder, extensions)
 
     interrupted = False
     file_list = []
     offset_list = []
-    dataq = Queue()
+    report_file = None
+    dataq = Queue(const.DATA_QUEUE_SIZE)
     aggregateq = Queue()
-    p = Process(target=datahandler.handle_data, args=(dataq, limits, aggregateq, quality_checks, consumers))
+    p = Process(target=datahandler.handle_data,
+                args=(dataq, aggregateq, [limits, quality_checks], {'consumers': consumers, 'aggregate_limit': 0}))
     p.start()
 
+    filesq = queue.Queue()
+    blockq = queue.Queue(1)
+    reader = Thread(target=read_files,
+                    args=(logger, filesq, blockq, data_type, block_bytes, cache, config_key, chained, hdf_template))
+    reader.daemon = True
+    reader.start()
+
     file_index = 0
     slice_index = 0
     while not interrupted:
@@ -274,36 +465,65 @@ def verify(conf, folder, data_type, num_files, report_by_files=True):
         if notifier.check_events():
             notifier.read_events()
 
-        # checking the newFiles queue for new entries and starting verification
-        # processes for each new file
+        # passing new files to the reader thread
         while not files.empty():
             file = files.get()
             if file.find('INTERRUPT') >= 0:
                 # the calling function may use a 'interrupt' command to stop the monitoring
-                # and processing.
-                dataq.put(Data(const.DATA_STATUS_END))
+                # and processing; the files received before are processed
+                filesq.put(None)
                 notifier.stop()
-                interrupted = True
                 break
             else:
+                filesq.put(file)
+
+        # passing the frames of blocks read ahead to the handler
+        while not interrupted:
+            try:
+                block = blockq.get_nowait()
+            except queue.Empty:
+                break
+            if block is None:
+                dataq.put(Data(const.DATA_STATUS_END))
+                interrupted = True
+                break
+            file, nframes, start, frames, key = block
+            if start == 0:
                 if file_index == 0:
                     report_file = file.rsplit(".",)[0] + '.report'
-                fp, tags = utils.get_data_hdf(file)
-                data_tag = tags['/exchange/'+data_type]
-                data = np.asarray(fp[data_tag])
-                slice_index += data.shape[0]
+                if key is not None and frames is not None and not isinstance(frames, Metrics):
+                    cache_entries.append((file, key, slice_index, nframes))
+                slice_index += nframes
                 file_list.append(file)
                 offset_list.append(slice_index)
-                for i in range(0, data.shape[0]):
-                    dataq.put(Data(const.DATA_STATUS_DATA, data[i], data_type))
+            if isinstance(frames, Metrics):
+                # the cached results are evaluated by the handler; the last frame is kept for the next file
+                for i in range(nframes):
+                    last_frame = frames.last_frame if i == nframes - 1 else None
+                    metrics = dict((qc, frames.values[qc][i]) for qc in frames.values)
+                    dataq.put(Data(const.DATA_STATUS_DATA, last_frame, data_type, metrics=metrics))
+            elif frames is not None:
+                for frame in frames:
+                    dataq.put(Data(const.DATA_STATUS_DATA, frame, data_type))
+            if frames is None or isinstance(frames, Metrics) or start + len(frames) == nframes:
                 file_index += 1
                 if file_index == num_files:
                     dataq.put(Data(const.DATA_STATUS_END))
+                    filesq.put(None)
                     notifier.stop()
                     interrupted = True
-                    break
 
     aggregate = aggregateq.get()
+    if cache is not None:
+        cache_results(logger, cache, aggregate, cache_entries, data_type, chained)
+        cache.log_stats(logger)
+        cache.close()
+    if metrics_dir is not None:
+        start = 0
+        for file, end in zip(file_list, offset_list):
+            metrics = result_cache.get_metrics(aggregate, start, end)
+            result_cache.save_metrics(result_cache.get_metrics_file(file, metrics_dir), metrics, file)
+            start = end
 
     #report.report_results(logger, aggregate, data_type, None, report_file, report_type)
 
@@ -313,8 +533,8 @@ def verify(conf, folder, data_type, num_files, report_by_files=True):
     else:
         report.add_bad_indexes(aggregate, bad_indexes)
     try:
-        report_file = open(report_file, 'w')
-        report.report_bad_indexes(bad_indexes, report_file)
+        with open(report_file, 'w') as rf:
+            report.report_bad_indexes(bad_indexes, rf)
     except:
         logger.warning('Cannot open report file')
 
@@ -59,15 +59,19 @@ import dquality.accumulator as acc
 import dquality.monitor as dqdmonitor
 import dquality.monitor_polling as dqpolmonitor
 import dquality.pv as dqpv
+import dquality.rethreshold as dqrethreshold
 
 __author__ = "Barbara Frosik"
 __copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
 __all__ = ['hdf',
+           'hdf_files',
            'pv',
+           'pv_monitor',
            'monitor',
            'accumulator',
            'data',
+           'rethreshold',
            'hdf_dependency']
 
 def hdf(conf, fname):
@@ -94,6 +98,36 @@ def hdf(conf, fname):
     else:
         print ('Some of the tags do not exist or do not meet conditions, check log file')
 
+def hdf_files(conf, files, report_file=None):
+    """
+    HDF file structure verifier for many files.
+
+    Parameters
+    ----------
+    conf : str
+        configuration file name, including path
+
+    files : list or str
+        file name or glob pattern, or a list of them
+
+    report_file : str
+        optional, file the combined report is written to
+
+    Returns
+    -------
+    results : dict
+        verification results keyed by file name
+
+    """
+
+    results = dqhdf.verify_files(conf, files, report_file)
+    failed = [file for file in results if not results[file]]
+    if len(failed) == 0:
+        print ('All tags in ' + str(len(results)) + ' files exist and meet conditions')
+    else:
+        print ('Some of the tags in ' + str(len(failed)) + ' files do not exist or do not meet conditions, check log file')
+    return results
+
 def pv(conf):
     """
 
@@ -115,6 +149,30 @@ def pv(conf):
         print ('Some of the PVs listed in pvs.json do not exist or do not meet conditions')
 
 
+def pv_monitor(conf, duration=None):
+    """
+
+    PV monitor, evaluating the PVs conditions on each change.
+
+    Parameters
+    ----------
+    conf : str
+        configuration file name, including path
+
+    duration : float
+        optional, number of seconds to monitor; if None, the PVs are monitored until keyboard interrupt
+
+    Returns
+    -------
+    boolean
+
+    """
+    if dqpv.monitor(conf, duration):
+        print ('All PVs listed in pvs.json exist and meet conditions')
+    else:
+        print ('Some of the PVs listed in pvs.json do not exist or do not meet conditions, check log file')
+
+
 def monitor(conf, folder, num_files):
     """
     Data quality monitor verifier.
@@ -223,6 +281,32 @@ def data(conf, fname):
     return bad_indexes
 
 
+def rethreshold(conf, folder, report_file=None):
+    """
+    Evaluates saved results of quality checks against configured limits.
+
+    Parameters
+    ----------
+    conf : str
+        configuration file name, including path
+
+    folder : str
+        directory containing saved results, i.e. the configured 'metrics_dir'
+
+    report_file : str
+        optional, file the bad indexes are reported to
+
+    Returns
+    -------
+    bad_indexes : dict
+        a dictionary of bad indexes by data type keyed by the verified file
+    """
+
+    bad_indexes = dqrethreshold.verify(conf, folder, report_file)
+    print (json.dumps(bad_indexes))
+    return bad_indexes
+
+
 def hdf_dependency(conf, fname):
     """
     Dependency verifier.
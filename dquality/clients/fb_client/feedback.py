@@ -1,13 +1,16 @@
 import dquality.common.constants as const
 import dquality.clients.fb_client.pv_feedback as pv_fb
 import dquality.clients.fb_client.pv_feedback_12 as pv_fb_12
+from dquality.clients.fb_client.summary import FailureSummary
 
 
 class Feedback(object):
     """
     This class is a container of real-time feedback related information.
+
+    The console and log feedback is summarized over the 'summary_period'.
     """
-    def __init__(self, q, feedback_type, **kwargs):
+    def __init__(self, q, feedback_type, summary_period=const.FEEDBACK_SUMMARY_PERIOD, **kwargs):
         """
         Constructor
 
@@ -15,9 +18,13 @@ class Feedback(object):
         ----------
         feedback_type : list
             a list of configured feedbac types. Possible options: console, log, and pv
+
+        summary_period : float
+            number of seconds the failures are summarized over in the console and log feedback
         """
         self.q = q
         self.feedback_type = feedback_type
+        self.summary = FailureSummary(self.report, summary_period)
         # create pv driver if pv feedback
         if const.FEEDBACK_PV in self.feedback_type:
             # base support
@@ -39,6 +46,13 @@ class Feedback(object):
         self.logger = logger
 
 
+    def report(self, msg):
+        if const.FEEDBACK_CONSOLE in self.feedback_type:
+            print (msg)
+        if const.FEEDBACK_LOG in self.feedback_type:
+            self.logger.info(msg)
+
+
     def deliver(self):
         """
         This function provides feedback as defined by the feedback_type in a real time.
@@ -62,19 +76,18 @@ class Feedback(object):
 
             if results == const.DATA_STATUS_END:
                 evaluating = False
+                # the coalesced pvs are posted with the final values
+                self.summary.check(force=True)
+                self.pv.flush()
             elif results == const.DATA_STATUS_MISSING:
                 pass
             else:
                 if results.failed:
                     for result in results.results:
                         if result.error != 0:
-                            # for console and log feedback deliver only the errors
-                            if const.FEEDBACK_CONSOLE in self.feedback_type:
-                                print ('failed frame ' + str(results.index) + ' result of ' +
-                                       result.quality_id + ' is ' + str(result.res))
-                            if const.FEEDBACK_LOG in self.feedback_type:
-                                self.logger.info('failed frame ' + str(results.index) + ' result of ' +
-                                                 result.quality_id + ' is ' + str(result.res))
+                            # for console and log feedback deliver only the errors, summarized
+                            self.summary.add(results.type, results.index, result.quality_id, result.res)
+                self.summary.check()
                 if not self.pv is None:
                     self.pv.write_to_pv(results)
 
@@ -50,11 +50,16 @@
 Please make sure the installation :ref:`pre-requisite-reference-label` are met.
 
 This module contains classes handling real time feedback of the quality results via process variables.
+The results are set in the driver as they come, and the process variables are updated at most once per update
+period by the server thread, so only the last values are posted.
 
 """
 
 from pcaspy import SimpleServer, Driver
 import sys
+import time
+import threading
+import dquality.common.constants as const
 if sys.version[0] == '2':
     import thread as thread
 else:
@@ -70,10 +75,15 @@ class PV_FB(object):
     def start_driver(self):
         server = FbServer()
         driver = server.init_driver(self.detector, self.feedback_pvs)
+        driver.update_period = getattr(self, 'update_period', driver.update_period)
         thread.start_new_thread(server.activate_pv, ())
         self.driver = driver
 
 
+    def flush(self):
+        self.driver.flush(True)
+
+
     def write_to_pv(self, results):
         text = results.file_name
         if results.failed:
@@ -98,19 +108,54 @@ class FbDriver(Driver):
             a dictionary where a key is pv (one for data type and quality method) and value is the number of
             failed frames
 
+        update_period : float
+            minimum number of seconds between updates of the pvs
+
         """
         super(FbDriver, self).__init__()
         try:
             self.counters = kwargs['counters']
         except:
             pass
+        try:
+            self.update_period = kwargs['update_period']
+        except KeyError:
+            self.update_period = const.FEEDBACK_UPDATE_PERIOD
+        self.last_update = 0
+        self.changed = False
+        self.lock = threading.Lock()
 
 
     def reset_counters(self):
-        for pv in self.counters:
-            self.counters[pv] = 0
-            self.setParam(pv+'_ctr', self.counters[pv])
-        self.updatePVs()
+        with self.lock:
+            for pv in self.counters:
+                self.counters[pv] = 0
+                self.setParam(pv+'_ctr', self.counters[pv])
+            self.changed = True
+        self.flush(True)
+
+
+    def flush(self, force=False):
+        """
+        This function posts the changed pvs, if the update period passed since the last update.
+
+        The values set between the updates are coalesced, the last value of each pv is posted.
+
+        Parameters
+        ----------
+        force : boolean
+            if True, the pvs are posted regardless of the update period
+
+        Returns
+        -------
+        none
+        """
+        with self.lock:
+            now = time.time()
+            if self.changed and (force or now - self.last_update >= self.update_period):
+                self.updatePVs()
+                self.changed = False
+                self.last_update = now
 
 
     def write(self, pv, result):
@@ -118,7 +163,8 @@ class FbDriver(Driver):
         This function override write method from Driver.
 
         It sets the 'index' pv to the index value, increments count of failing frames for the data type and quality
-        check indicated by pv, and sets the 'counter' pv to the new counter value.
+        check indicated by pv, and sets the 'counter' pv to the new counter value. The pvs are posted by the server
+        thread.
 
         Parameters
         ----------
@@ -134,11 +180,12 @@ class FbDriver(Driver):
 
         """
         status = True
-        self.setParam(pv+'_res', result)
-        self.counters[pv] += 1
-        # this method is called on failed quality check, increase counter for this pv
-        self.setParam(pv+'_ctr', self.counters[pv])
-        self.updatePVs()
+        with self.lock:
+            self.setParam(pv+'_res', result)
+            self.counters[pv] += 1
+            # this method is called on failed quality check, increase counter for this pv
+            self.setParam(pv+'_ctr', self.counters[pv])
+            self.changed = True
         return status
 
 
@@ -188,15 +235,18 @@ class FbServer(object):
         self.server.createPV(prefix, pvdb)
 
         driver = FbDriver(counters=counters)
+        self.driver = driver
         return driver
 
     def activate_pv(self):
         """
-        Infinite loop processing the pvs defined in server; exits when parent process exits.
+        Infinite loop processing the pvs defined in server, and posting the changed pvs at most once per the driver
+        update period; exits when parent process exits.
 
         """
         while True:
             self.server.process(.1)
+            self.driver.flush()
 
 #if __name__ == '__main__':
     # args = sys.argv[1:]
@@ -69,6 +69,7 @@ class PV_FB_12(pvfb.PV_FB):
     def start_driver(self):
         server = FbServer_12()
         driver = server.init_driver(self.detector, self.feedback_pvs)
+        driver.update_period = getattr(self, 'update_period', driver.update_period)
         thread.start_new_thread(server.activate_pv, ())
         self.driver = driver
 
@@ -126,8 +127,9 @@ class FbDriver_12(pvfb.FbDriver):
 
         """
         status = True
-        self.setParam('STAT', msg)
-        self.updatePVs()
+        with self.lock:
+            self.setParam('STAT', msg)
+            self.changed = True
         return status
 
 
@@ -175,4 +177,5 @@ class FbServer_12(pvfb.FbServer):
         self.server.createPV(prefix, pvdb)
 
         driver = FbDriver_12()
+        self.driver = driver
         return driver
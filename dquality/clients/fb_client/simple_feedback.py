@@ -1,14 +1,22 @@
+import time
+import threading
 import dquality.common.constants as const
 import dquality.common.utilities as utils
-from epics import caput, caget
+from dquality.clients.fb_client.summary import FailureSummary
+from epics import caput
 
 
 class Feedback(object):
     """
     This class is a container of real-time feedback related information.
+
+    The pv feedback counters are kept locally. The feedback pvs are updated at most once per update period, with the
+    last values, so the failures are not written one by one. The console and log feedback is summarized over the
+    summary period.
     """
 
-    def __init__(self,feedback, detector, quality_checks, logger):
+    def __init__(self,feedback, detector, quality_checks, logger, update_period=const.FEEDBACK_UPDATE_PERIOD,
+                 summary_period=const.FEEDBACK_SUMMARY_PERIOD):
         """
         Constructor
 
@@ -16,19 +24,41 @@ class Feedback(object):
         ----------
         feedback_type : list
             a list of configured feedbac types. Possible options: console, log, and pv
+
+        update_period : float
+            minimum number of seconds between updates of the feedback pvs
+
+        summary_period : float
+            number of seconds the failures are summarized over in the console and log feedback
         """
 
         self.feedback_type = feedback
         if const.FEEDBACK_PV in self.feedback_type:
             self.detector = detector
+            self.update_period = update_period
+            # pv name : value, the values waiting for the next update
+            self.pending = {}
+            self.counters = {}
+            self.last_update = 0
+            self.timer = None
+            self.lock = threading.Lock()
             #zero out the ctr pvs
             feedback_pvs = utils.get_feedback_pvs(quality_checks)
             for fb_pv in feedback_pvs:
-                caput(self.detector + ':data_' + fb_pv + '_ctr', 0)
+                caput(self.detector + ':' + fb_pv + '_ctr', 0)
 
         if const.FEEDBACK_LOG in self.feedback_type:
             self.logger = logger
 
+        self.summary = FailureSummary(self.report, summary_period)
+
+
+    def report(self, msg):
+        if const.FEEDBACK_CONSOLE in self.feedback_type:
+            print(msg)
+        if const.FEEDBACK_LOG in self.feedback_type:
+            self.logger.info(msg)
+
 
     def deliver(self, results):
         """
@@ -49,16 +79,69 @@ class Feedback(object):
         if results.failed:
             for result in results.results:
                 if result.error != 0:
-                    # for console and log feedback deliver only the errors
-                    if const.FEEDBACK_CONSOLE in self.feedback_type:
-                        print('failed frame ' + str(results.index) + ' result of ' +
-                              result.quality_id + ' is ' + str(result.res))
-                    if const.FEEDBACK_LOG in self.feedback_type:
-                        self.logger.info('failed frame ' + str(results.index) + ' result of ' +
-                                         result.quality_id + ' is ' + str(result.res))
+                    # for console and log feedback deliver only the errors, summarized
+                    self.summary.add(results.type, results.index, result.quality_id, result.res)
                     if const.FEEDBACK_PV in self.feedback_type:
                         pv = self.detector + ':' + results.type + '_' + result.quality_id
-                        caput(pv + '_res', result.res)
-                        counter = caget(pv + '_ctr') + 1
-                        caput(pv + '_ctr', counter)
+                        with self.lock:
+                            self.counters[pv] = self.counters.get(pv, 0) + 1
+                            self.pending[pv + '_res'] = result.res
+                            self.pending[pv + '_ctr'] = self.counters[pv]
+            if const.FEEDBACK_PV in self.feedback_type:
+                self.update()
+        self.summary.check()
+
+
+    def update(self):
+        """
+        This function writes the pending values to the feedback pvs, if the update period passed since the last
+        update. Otherwise the update is scheduled, so the last values are written when the failures stop.
+
+        Returns
+        -------
+        none
+        """
+        with self.lock:
+            if len(self.pending) == 0:
+                return
+            wait = self.last_update + self.update_period - time.time()
+            if wait > 0:
+                if self.timer is None:
+                    self.timer = threading.Timer(wait, self.publish)
+                    self.timer.daemon = True
+                    self.timer.start()
+                return
+        self.publish()
+
 
+    def flush(self):
+        """
+        This function reports the summaries of failures, and writes the pending values to the feedback pvs. It is
+        called when the feedback ends, so the pvs hold the final values.
+
+        Returns
+        -------
+        none
+        """
+        self.summary.check(force=True)
+        if const.FEEDBACK_PV in self.feedback_type:
+            self.publish()
+
+
+    def publish(self):
+        """
+        This function writes the pending values to the feedback pvs.
+
+        Returns
+        -------
+        none
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            # the values are written in order, under the lock, so a later update does not overtake
+            for pv in self.pending:
+                caput(pv, self.pending[pv], wait=False)
+            self.pending = {}
+            self.last_update = time.time()
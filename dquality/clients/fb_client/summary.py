@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# #########################################################################
+# Copyright (c) 2016, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2016. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+
+"""
+Please make sure the installation :ref:`pre-requisite-reference-label` are met.
+
+This module summarizes failed quality checks for the console and log feedback.
+
+The first failure of a quality check is reported immediately. The following failures of the check are counted, and
+reported in one message per summary period, with the range of the failed frames indexes. The details of each failure
+are in the report.
+
+"""
+
+import time
+import threading
+import dquality.common.constants as const
+
+__author__ = "Barbara Frosik"
+__copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
+__docformat__ = 'restructuredtext en'
+__all__ = ['FailureSummary']
+
+
+class FailureSummary(object):
+    """
+    This class aggregates failures of quality checks over a time window, per data type and quality check.
+    """
+
+    def __init__(self, emit, period=const.FEEDBACK_SUMMARY_PERIOD):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        emit : function
+            a function delivering a message, i.e. printing or logging it
+
+        period : float
+            number of seconds the failures are summarized over
+        """
+        self.emit = emit
+        self.period = period
+        # (data type, quality check) : [window start, number of failures, first index, last index, last result,
+        # number of failures reported immediately]
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def add(self, type, index, quality_id, res, now=None):
+        """
+        This function adds a failure of a quality check.
+
+        The failure is reported immediately if the check did not fail in the current window, otherwise it is counted.
+
+        Parameters
+        ----------
+        type : str
+            data type
+
+        index : int
+            index of the failed frame
+
+        quality_id : str
+            the failed quality check
+
+        res : float
+            the result of the quality check
+
+        now : float
+            optional, current time
+
+        Returns
+        -------
+        none
+        """
+        if now is None:
+            now = time.time()
+        key = (type, quality_id)
+        with self.lock:
+            window = self.windows.get(key)
+            if window is not None:
+                window[1] += 1
+                window[2] = min(window[2], index)
+                window[3] = max(window[3], index)
+                window[4] = res
+                return
+            self.windows[key] = [now, 1, index, index, res, 1]
+        self.emit('failed frame ' + str(index) + ' result of ' + quality_id + ' is ' + str(res))
+
+    def check(self, now=None, force=False):
+        """
+        This function reports the summaries of the windows that ended.
+
+        A check that failed in the ended window starts a new window, so a continuous failure is reported once per
+        period. A check that did not fail is reported immediately on the next failure.
+
+        Parameters
+        ----------
+        now : float
+            optional, current time
+
+        force : boolean
+            if True, all windows are ended, i.e. when the feedback ends
+
+        Returns
+        -------
+        none
+        """
+        if now is None:
+            now = time.time()
+        messages = []
+        with self.lock:
+            for key in list(self.windows.keys()):
+                start, count, first, last, res, reported = self.windows[key]
+                if not force and now - start < self.period:
+                    continue
+                if count == reported:
+                    del self.windows[key]
+                    continue
+                messages.append(key[0] + ' ' + key[1] + ' failed on ' + str(count) + ' frames in last ' +
+                                str(int(round(now - start))) + ' s, idx ' + str(first) + '-' + str(last) +
+                                ', last result is ' + str(res))
+                if force:
+                    del self.windows[key]
+                else:
+                    self.windows[key] = [now, 0, float('inf'), -1, None, 0]
+        for msg in messages:
+            self.emit(msg)
@@ -118,6 +118,7 @@ class zmq_sen():
                     key="dim",
                     dim_x=data.dim_x,
                     dim_y=data.dim_y,
+                    channel=getattr(data, 'channel', None),
                 ))
         else:
             slice = data.slice
@@ -129,6 +130,7 @@ class zmq_sen():
                     ver=data.ver,
                     image_number=data.image_number,
                     theta= data.theta,
+                    channel=getattr(data, 'channel', None),
                     # image_timestamp=image_time,
                     # sending_timestamp=time.time(),
                     # rotation=_cache_["rotation"],
@@ -22,4 +22,41 @@ DATA_STATUS_MISSING = 1
 DATA_STATUS_END = 2
 DATA_STATUS_DIM = 3
 
-ZMQ_CONTROLLER_PORT = 5511
\ No newline at end of file
+ZMQ_CONTROLLER_PORT = 5511
+
+# maximum number of frames waiting in a queue for the handler process; the reader blocks when the queue is full
+DATA_QUEUE_SIZE = 64
+
+# number of items (files, blocks of frames) read ahead of the checks, and threads doing the reading
+PREFETCH_DEPTH = 4
+PREFETCH_WORKERS = 2
+
+# maximum number of verified files with results kept in the result cache, and size of the blocks at the beginning and
+# end of a file included in the file identity hash
+RESULT_CACHE_SIZE = 1000
+RESULT_CACHE_HASH_BLOCK = 65536
+
+# maximum number of hdf files which data sets layout is cached
+HDF_LAYOUT_CACHE_SIZE = 128
+
+# number of seconds between checks of files that are being written, and number of seconds after which a file that did
+# not grow is considered complete, and number of seconds between progress reports, when following files
+FOLLOW_POLL_PERIOD = 1.0
+FOLLOW_IDLE_TIMEOUT = 30.0
+FOLLOW_PROGRESS_PERIOD = 10.0
+
+# number of seconds to connect and read all required PVs, and number of seconds between checks of the connections
+PV_TIMEOUT = 5.0
+PV_POLL_PERIOD = 0.01
+
+# minimum number of seconds between updates of the feedback PVs; the updates in between are coalesced, and number of
+# seconds the failures are summarized over in the console and log feedback
+FEEDBACK_UPDATE_PERIOD = 0.5
+FEEDBACK_SUMMARY_PERIOD = 5.0
+
+# maximum number of log records waiting for the log writer, the records are dropped when the writer does not keep up,
+# minimum number of seconds between reports of the dropped records, and number of seconds to wait for the log writer
+# to write the queued records on exit
+LOG_QUEUE_SIZE = 10000
+LOG_DROP_REPORT_PERIOD = 1.0
+LOG_WRITER_JOIN_TIMEOUT = 10.0
@@ -31,6 +31,20 @@ class Results:
             self.results.append(results[qc])
 
 
+class Metrics:
+    """
+    This class is a container of calculated results of quality checks for frames of one data type.
+
+    The results are kept in arrays with one value per frame, keyed by quality check ID, so they can be stored and
+    evaluated against limits without the data.
+    """
+    def __init__(self, type, indexes, values, last_frame=None):
+        self.type = type
+        self.indexes = indexes
+        self.values = values
+        self.last_frame = last_frame
+
+
 class Data:
     """
     This class is a container of data.
@@ -0,0 +1,812 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# #########################################################################
+# Copyright (c) 2016, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2016. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+
+"""
+Please make sure the installation :ref:`pre-requisite-reference-label` are met.
+
+This module provides file discovery for the polling monitors. The monitored directory tree is kept in an index that
+is updated incrementally: a directory is listed only if its modification time changed, and the files that changed
+recently are watched until they stop changing. A poll costs a stat of each directory and of each watched file,
+instead of a stat of every file in the tree.
+
+A discovered file is passed on only when it is completely written. The file must not change for a stability window,
+and must pass a probe of its format, i.e. the GE header frame count agrees with the file size, or the HDF5 file
+opens. Where inotify is available, a file closed after writing is probed right away, without waiting for the window.
+Each version (size and modification time) of a file is passed on once.
+
+"""
+
+import os
+import time
+from threading import Lock
+import h5py
+import dquality.common.constants as const
+import dquality.readers.file_reader as freader
+from dquality.common.scheduler import get_scheduler
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+__author__ = "Barbara Frosik"
+__copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
+__docformat__ = 'restructuredtext en'
+__all__ = ['DirectoryIndex',
+           'CompletionTracker',
+           'FileSeek',
+           'FileValidatorGe',
+           'FileValidatorHdf',
+           'FileValidatorTif',
+           'get_validator']
+
+
+class DirectoryIndex():
+    """
+    This class keeps an index of files with given extensions in a directory tree.
+
+    For each directory the index holds the directory modification time, the subdirectories, and the size and
+    modification time of the matching files. A directory with unchanged modification time is not listed again,
+    as files were neither added nor removed. The changes of files content do not change the directory, so the files
+    that were added or changed recently are watched, i.e. checked on each scan, until they do not change for the
+    'settle_time'. A directory modified within the 'settle_time' is listed on each scan, as the file system time
+    resolution may hide a following change.
+    """
+
+    def __init__(self, ext, settle_time=2.0):
+        """
+        constructor
+
+        Parameters
+        ----------
+        ext : list
+            list of file extensions that will be discovered
+
+        settle_time : float
+            number of seconds after a change during which a file or directory is checked on each scan
+        """
+        self.ext = ext
+        self.settle_time = settle_time
+        self.dirs = {}
+        self.files = {}
+        self.watched = {}
+        self.listed_dirs = 0
+        self.skipped_dirs = 0
+
+    def __len__(self):
+        return sum(len(files) for files in self.files.values())
+
+    def match(self, name):
+        """
+        This method checks if the file name has one of the discovered extensions.
+
+        Parameters
+        ----------
+        name : str
+            file name
+
+        Returns
+        -------
+        True if the extension matches, False otherwise
+        """
+        for fext in self.ext:
+            if name.endswith(fext):
+                return True
+        return False
+
+    def scan(self, folder, full=False):
+        """
+        This method updates the index and returns files that are new or changed since the last scan.
+
+        Parameters
+        ----------
+        folder : str
+            a folder name that will be checked for files
+
+        full : boolean
+            if True, all directories are listed regardless of the modification time
+
+        Returns
+        -------
+        changed : list
+            a list of full names of files that were added or changed
+        """
+        changed = []
+        now = time.time()
+        self.check_watched(now, changed)
+        self.scan_dir(folder, now, full, changed)
+        return changed
+
+    def check_watched(self, now, changed):
+        """
+        This method checks the watched files for changes.
+
+        Parameters
+        ----------
+        now : float
+            time of the scan
+
+        changed : list
+            a list the changed files are added to
+
+        Returns
+        -------
+        none
+        """
+        for full_path in list(self.watched.keys()):
+            dir, name, last_change = self.watched[full_path]
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                # removed; the directory changed and will be listed
+                del self.watched[full_path]
+                continue
+            file_info = (st.st_size, st.st_mtime)
+            if self.files[dir].get(name) != file_info:
+                self.files[dir][name] = file_info
+                self.watched[full_path] = (dir, name, now)
+                changed.append(full_path)
+            elif now - last_change > self.settle_time and now - st.st_mtime > self.settle_time:
+                del self.watched[full_path]
+
+    def scan_dir(self, path, now, full, changed):
+        """
+        This method updates the index of a directory and its subdirectories.
+
+        Parameters
+        ----------
+        path : str
+            directory name
+
+        now : float
+            time of the scan
+
+        full : boolean
+            if True, the directory is listed regardless of the modification time
+
+        changed : list
+            a list the changed files are added to
+
+        Returns
+        -------
+        none
+        """
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            self.remove_dir(path)
+            return
+
+        known = self.dirs.get(path)
+        if not full and known is not None and known[0] == mtime and now - mtime > self.settle_time:
+            self.skipped_dirs += 1
+            subdirs = known[1]
+        else:
+            self.listed_dirs += 1
+            subdirs = self.list_dir(path, mtime, now, changed)
+            if known is not None:
+                for subdir in known[1]:
+                    if subdir not in subdirs:
+                        self.remove_dir(subdir)
+
+        for subdir in subdirs:
+            self.scan_dir(subdir, now, full, changed)
+
+    def list_dir(self, path, mtime, now, changed):
+        """
+        This method lists a directory and updates the index of its files.
+
+        Parameters
+        ----------
+        path : str
+            directory name
+
+        mtime : float
+            modification time of the directory
+
+        now : float
+            time of the scan
+
+        changed : list
+            a list the changed files are added to
+
+        Returns
+        -------
+        subdirs : list
+            a list of subdirectories
+        """
+        subdirs = []
+        known_files = self.files.get(path, {})
+        files = {}
+        try:
+            entries = sorted(scandir(path), key=lambda entry: entry.name)
+        except OSError:
+            entries = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    subdirs.append(entry.path)
+                elif entry.is_file() and self.match(entry.name):
+                    st = entry.stat()
+                    file_info = (st.st_size, st.st_mtime)
+                    files[entry.name] = file_info
+                    if known_files.get(entry.name) != file_info:
+                        changed.append(entry.path)
+                        if now - st.st_mtime <= self.settle_time:
+                            self.watched[entry.path] = (path, entry.name, now)
+            except OSError:
+                # the entry was removed while listing
+                pass
+
+        for name in known_files:
+            if name not in files:
+                self.watched.pop(os.path.join(path, name), None)
+        self.files[path] = files
+        self.dirs[path] = (mtime, subdirs)
+        return subdirs
+
+    def remove_dir(self, path):
+        """
+        This method removes a directory and its subdirectories from the index.
+
+        Parameters
+        ----------
+        path : str
+            directory name
+
+        Returns
+        -------
+        none
+        """
+        known = self.dirs.pop(path, None)
+        for name in self.files.pop(path, {}):
+            self.watched.pop(os.path.join(path, name), None)
+        if known is not None:
+            for subdir in known[1]:
+                self.remove_dir(subdir)
+
+
+class CompletionTracker():
+    """
+    This class tracks discovered files until they are completely written.
+
+    A file is complete when its size and modification time did not change for the 'stable_time' and the validator
+    accepts it. A file reported as closed after writing is only validated. A file that is stable, but is not accepted
+    by the validator for the 'give_up_time' is dropped with a warning. Each version of a file is reported complete
+    once. In the follow mode, a file is reported once, as soon as the validator accepts it, so it can be verified
+    while it is written. The methods can be called from different threads.
+    """
+
+    def __init__(self, validator=None, stable_time=2.0, give_up_time=60.0, logger=None, journal=None, follow=False):
+        """
+        constructor
+
+        Parameters
+        ----------
+        validator : object
+            optional, an object with is_valid(file) method probing the file format; if None, the files are accepted
+            when stable
+
+        stable_time : float
+            number of seconds the file must not change
+
+        give_up_time : float
+            number of seconds after which a stable file not accepted by the validator is dropped
+
+        logger : Logger
+            optional, logger instance
+
+        journal : Journal
+            optional, a journal of verified files; the files verified before are not reported
+
+        follow : boolean
+            if True, the files are reported when accepted by the validator, without waiting until they are stable
+        """
+        self.validator = validator
+        self.follow = follow
+        self.journal = journal
+        self.stable_time = stable_time
+        self.give_up_time = give_up_time
+        self.logger = logger
+        self.pending = {}
+        self.completed = {}
+        self.lock = Lock()
+
+    def get_identity(self, file):
+        st = os.stat(file)
+        return (st.st_size, st.st_mtime)
+
+    def is_valid(self, file):
+        return self.validator is None or self.validator.is_valid(file)
+
+    def is_completed(self, file, identity):
+        if self.completed.get(file) == identity or (self.follow and file in self.completed):
+            return True
+        return self.journal is not None and self.journal.is_processed(file, *identity)
+
+    def add(self, file, now=None):
+        """
+        This method starts tracking of a new or changed file.
+
+        Parameters
+        ----------
+        file : str
+            a full name of a file
+
+        now : float
+            optional, current time
+
+        Returns
+        -------
+        none
+        """
+        if now is None:
+            now = time.time()
+        try:
+            identity = self.get_identity(file)
+        except OSError:
+            return
+        with self.lock:
+            if self.is_completed(file, identity):
+                return
+            pending = self.pending.get(file)
+            if pending is None or pending[0] != identity:
+                self.pending[file] = (identity, now)
+
+    def closed(self, file):
+        """
+        This method probes a file that was closed after writing.
+
+        Parameters
+        ----------
+        file : str
+            a full name of a file
+
+        Returns
+        -------
+        completed : list
+            a list with the file if it is complete and was not reported before, empty list otherwise
+        """
+        try:
+            identity = self.get_identity(file)
+        except OSError:
+            return []
+        with self.lock:
+            if self.is_completed(file, identity):
+                return []
+            if self.is_valid(file):
+                self.completed[file] = identity
+                self.pending.pop(file, None)
+                return [file]
+            if file not in self.pending:
+                self.pending[file] = (identity, time.time())
+            return []
+
+    def check(self, now=None):
+        """
+        This method checks the tracked files and returns the files that became complete.
+
+        Parameters
+        ----------
+        now : float
+            optional, current time
+
+        Returns
+        -------
+        completed : list
+            a list of full names of complete files, in order they were added
+        """
+        if now is None:
+            now = time.time()
+        completed = []
+        with self.lock:
+            for file in list(self.pending.keys()):
+                identity, since = self.pending[file]
+                try:
+                    current = self.get_identity(file)
+                except OSError:
+                    del self.pending[file]
+                    continue
+                if current != identity and not self.follow:
+                    self.pending[file] = (current, now)
+                elif self.follow or now - since >= self.stable_time:
+                    if self.is_valid(file):
+                        del self.pending[file]
+                        self.completed[file] = current
+                        completed.append(file)
+                    elif now - since >= self.give_up_time:
+                        del self.pending[file]
+                        if self.logger is not None:
+                            self.logger.warning('file %s is not complete, it will not be verified' % (file))
+        return completed
+
+
+class FileSeek():
+    """
+    This class provides file discovery functionality.
+
+    An instance is initialized with parameters.
+    On the start the FileSeek indexes existing files. After that it periodically checks
+    for new files in monitored directory and subdirectories. The new or updated files are tracked
+    until they are completely written, and then enqueued into the queue. If inotify is available,
+    the files closed after writing are enqueued without waiting for the next polling period.
+    The polls are run by the scheduler shared by all monitored directories. The polling period
+    drops to a quarter when files are found, and grows up to eight times when nothing changes.
+    In the follow mode the files are enqueued as soon as they can be read, to be verified while they are written.
+    """
+
+    def __init__(self, q, polling_period, logger, file_type, full_scan_period=60, stable_time=2.0,
+                 use_inotify=True, min_polling_period=None, max_polling_period=None, journal=None,
+                 follow=False):
+        """
+        constructor
+
+        Parameters
+        ----------
+        q : Queue
+            a queue used to pass discovered files
+
+        polling_period : int
+            number of second defining polling period
+
+        logger : Logger
+            logger instance
+
+        file_type : int
+            a constant defining type of data file. Supporting FILE_TYPE_GE, FILE_TYPE_HDF and FILE_TYPE_TIF
+
+        full_scan_period : int
+            number of polls after which all directories are listed, to find files changed after they settled
+
+        stable_time : float
+            number of seconds a file must not change to be considered complete
+
+        use_inotify : boolean
+            if True and pyinotify is installed, the files closed after writing are reported by inotify
+
+        min_polling_period : float
+            number of seconds between polls when files are found; defaults to a quarter of the polling period
+
+        max_polling_period : float
+            maximum number of seconds between polls when nothing changes; defaults to eight polling periods
+
+        journal : Journal
+            optional, a journal of verified files. If given, the existing files that are not in the journal are
+            reported on start, and the files in the journal are not reported again.
+
+        follow : boolean
+            if True, the files are enqueued when they can be read, without waiting until they are completely written
+        """
+        self.q = q
+        self.polling_period = polling_period
+        if min_polling_period is None:
+            min_polling_period = polling_period / 4.0
+        if max_polling_period is None:
+            max_polling_period = polling_period * 8
+        self.min_polling_period = min_polling_period
+        self.max_polling_period = max_polling_period
+        self.job = None
+        self.index = None
+        self.logger = logger
+        self.file_type = file_type
+        self.full_scan_period = full_scan_period
+        self.journal = journal
+        self.tracker = CompletionTracker(get_validator(file_type, follow), stable_time, logger=logger, journal=journal,
+                                         follow=follow)
+        self.use_inotify = use_inotify and pyinotify is not None
+        self.notifier = None
+        self.polls = 0
+        self.done = False
+
+    def notify(self, file_name):
+        """
+        This method performs action to notify stakeholders about a discovered complete file.
+
+        Currently the notification is done by using queue.
+
+        Parameters
+        ----------
+        file_name : str
+            a full name of a file
+
+        Returns
+        -------
+        none
+        """
+        self.q.put(file_name)
+
+    def poll_file_system(self, folder, ext):
+        """
+        This method initiates for polling the file information off of the file system.
+
+        The new and changed files found by the incremental scan of the index are tracked, and the files that
+        became complete are reported through notify to the stakeholders.
+
+        Parameters
+        ----------
+        folder : str
+            a folder name that will be checked for files
+
+        ext : list
+            list of file extensions that will be discovered
+
+        Returns
+        -------
+        activity : int
+            number of files found changed or waiting to complete
+        """
+
+        try:
+            self.polls += 1
+            full = self.full_scan_period > 0 and self.polls % self.full_scan_period == 0
+            changed = self.index.scan(folder, full)
+            for file_name in changed:
+                self.tracker.add(file_name)
+            for file_name in self.tracker.check():
+                self.notify(file_name)
+            return len(changed) + len(self.tracker.pending)
+        except:
+            self.logger.error('Could not poll directory %s' % (folder))
+            return 0
+
+    def start_inotify(self, folder, ext):
+        """
+        This method starts a thread receiving inotify close after write events for the monitored tree.
+
+        Parameters
+        ----------
+        folder : str
+            a folder name that will be monitored
+
+        ext : list
+            list of file extensions that will be discovered
+
+        Returns
+        -------
+        none
+        """
+        seek = self
+
+        class EventHandler(pyinotify.ProcessEvent):
+
+            def process_IN_CLOSE_WRITE(self, event):
+                for pattern in ext:
+                    if event.pathname.endswith(pattern):
+                        for file_name in seek.tracker.closed(event.pathname):
+                            seek.notify(file_name)
+                        break
+
+        try:
+            wm = pyinotify.WatchManager()
+            self.notifier = pyinotify.ThreadedNotifier(wm, EventHandler())
+            self.notifier.daemon = True
+            self.notifier.start()
+            wm.add_watch(folder, pyinotify.IN_CLOSE_WRITE, rec=True, auto_add=True)
+        except Exception:
+            # polling alone finds the files
+            self.logger.warning('inotify is not available for directory %s' % (folder))
+            self.notifier = None
+
+    def start_observing(self, folder, ext):
+        """
+        This method startss for polling the file information off of the file system.
+
+        On the first call the existing files are indexed; they are not reported, unless a journal is used
+        and the files are not in the journal. The polling job is added to the shared scheduler.
+
+        Parameters
+        ----------
+        folder : str
+            a folder name that will be checked for files
+
+        ext : list
+            list of file extensions that will be discovered
+
+        Returns
+        -------
+        none
+        """
+
+        if self.index is None:
+            self.index = DirectoryIndex(ext)
+            existing = self.index.scan(folder)
+            if self.journal is not None:
+                # resuming, the files that were not verified before are reported
+                for file_name in existing:
+                    self.tracker.add(file_name)
+            if self.use_inotify:
+                self.start_inotify(folder, ext)
+        if self.done or self.job is not None:
+            return
+
+        self.job = get_scheduler().add(folder, lambda: self.poll_file_system(folder, ext), self.polling_period,
+                                       self.min_polling_period, self.max_polling_period)
+
+    def stop_observing(self):
+        """
+        This method stops the polling the file information off of the file system.
+
+        Parameters
+        ----------
+        none
+
+        Returns
+        -------
+        none
+        """
+
+        self.done = True
+        if self.job is not None:
+            get_scheduler().remove(self.job)
+            metrics = self.job.get_metrics()
+            self.logger.info('polled %s %d times, %.3f s mean, %.3f s max poll time' %
+                             (self.job.name, metrics['polls'], metrics['mean_time'], metrics['max_time']))
+            self.job = None
+        if self.notifier is not None:
+            self.notifier.stop()
+            self.notifier = None
+
+
+class FileValidatorGe():
+    """
+    This class is an interface to the concrete file verification functionality.
+    """
+    def __init__(self, follow=False):
+        """
+        constructor
+
+        Parameters
+        ----------
+        follow : boolean
+            if True, the files that are being written are accepted when the header is written
+        """
+        self.follow = follow
+
+    def is_valid(self, file):
+        """
+        This method checks if the ge file is compatible with the standards and completely written.
+
+        Parameters
+        ----------
+        file : str
+            file name
+
+        Returns
+        -------
+        True if validated, False otherwise
+        """
+        if self.follow:
+            return freader.Ge_fr().get_header(file) is not None
+        return freader.Ge_fr().is_complete(file)
+
+
+class FileValidatorHdf():
+    """
+    This class is an interface to the concrete file verification functionality.
+    """
+    def __init__(self, swmr=False):
+        """
+        constructor
+
+        Parameters
+        ----------
+        swmr : boolean
+            if True, the file is opened in SWMR read mode, so the files that are being written are accepted
+        """
+        self.swmr = swmr
+
+    def is_valid(self, file):
+        """
+        This method checks if the hdf file opens, i.e. the file is not truncated.
+
+        Parameters
+        ----------
+        file : str
+            file name
+
+        Returns
+        -------
+        True if validated, False otherwise
+        """
+        try:
+            if self.swmr:
+                with h5py.File(file, 'r', libver='latest', swmr=True):
+                    return True
+            with h5py.File(file, 'r'):
+                return True
+        except (IOError, OSError):
+            return False
+
+
+class FileValidatorTif():
+    """
+    This class is an interface to the concrete file verification functionality.
+    """
+    def is_valid(self, file):
+        """
+        This method checks if all pages of the tiff file are completely written.
+
+        Parameters
+        ----------
+        file : str
+            file name
+
+        Returns
+        -------
+        True if validated, False otherwise
+        """
+        return freader.Tif_stack_fr().is_complete(file)
+
+
+def get_validator(file_type, follow=False):
+    """
+    This function returns a validator probing completeness of files of the given type.
+
+    Parameters
+    ----------
+    file_type : int
+        a constant defining type of data file
+
+    follow : boolean
+        if True, the validator accepts files that can be read while they are written
+
+    Returns
+    -------
+    validator : object
+        a validator instance, or None if there is no validator for the file type
+    """
+    if file_type == const.FILE_TYPE_GE:
+        return FileValidatorGe(follow)
+    elif file_type == const.FILE_TYPE_HDF:
+        return FileValidatorHdf(follow)
+    elif file_type == const.FILE_TYPE_TIF:
+        return FileValidatorTif()
+    return None
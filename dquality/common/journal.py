@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# #########################################################################
+# Copyright (c) 2016, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2016. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+
+"""
+Please make sure the installation :ref:`pre-requisite-reference-label` are met.
+
+This module provides a journal of files processed by the monitors. The journal is a sqlite database that records
+the path, size, modification time and verification outcome of each verified file. When a monitor is restarted with
+the same journal, the files verified before are not verified again, and the files that were not verified (i.e.
+arrived while the monitor was down, or were being verified when it stopped) are verified. The path is the primary
+key, so a lookup does not depend on the number of files in the journal.
+
+"""
+
+import os
+import json
+import time
+import sqlite3
+from threading import Lock
+from collections import OrderedDict
+
+__author__ = "Barbara Frosik"
+__copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
+__docformat__ = 'restructuredtext en'
+__all__ = ['Journal']
+
+
+class Journal():
+    """
+    This class records verified files in a sqlite database.
+
+    The methods can be called from different threads.
+    """
+
+    def __init__(self, journal_file):
+        """
+        constructor
+
+        Parameters
+        ----------
+        journal_file : str
+            name of the database file including path; created if it does not exist
+        """
+        self.journal_file = journal_file
+        self.lock = Lock()
+        self.db = sqlite3.connect(journal_file, check_same_thread=False)
+        with self.lock:
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('PRAGMA synchronous=NORMAL')
+            self.db.execute('CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, '
+                            'status TEXT, result TEXT, time REAL)')
+            self.db.commit()
+
+    def get_identity(self, file):
+        st = os.stat(file)
+        return st.st_size, st.st_mtime
+
+    def is_processed(self, file, size, mtime):
+        """
+        This method checks whether the file of given size and modification time was verified.
+
+        Parameters
+        ----------
+        file : str
+            a full name of a file
+
+        size : int
+            size of the file
+
+        mtime : float
+            modification time of the file
+
+        Returns
+        -------
+        True if the file was verified, False otherwise
+        """
+        with self.lock:
+            row = self.db.execute('SELECT size, mtime FROM files WHERE path = ?', (file,)).fetchone()
+        return row is not None and row[0] == size and row[1] == mtime
+
+    def record(self, file, status, result=None):
+        """
+        This method records the outcome of a file verification.
+
+        The size and modification time of the file are taken when recorded. A file recorded before is replaced.
+
+        Parameters
+        ----------
+        file : str
+            a full name of a file
+
+        status : str
+            verification outcome, i.e. 'passed' or 'failed'
+
+        result : object
+            optional, a result that can be serialized to json, i.e. bad indexes
+
+        Returns
+        -------
+        none
+        """
+        try:
+            size, mtime = self.get_identity(file)
+        except OSError:
+            size, mtime = None, None
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)',
+                            (file, size, mtime, status, json.dumps(result), time.time()))
+            self.db.commit()
+
+    def get_processed(self, folder):
+        """
+        This method returns the files in the folder and subfolders that were verified.
+
+        Parameters
+        ----------
+        folder : str
+            folder name
+
+        Returns
+        -------
+        processed : dict
+            a dictionary of file name : (status, result), ordered by the verification time
+        """
+        prefix = os.path.join(folder, '')
+        # the prefix is matched as a range of keys, so the primary key index is used
+        with self.lock:
+            rows = self.db.execute('SELECT path, status, result FROM files WHERE path >= ? AND path < ? '
+                                   'ORDER BY time', (prefix, prefix + u'\uffff')).fetchall()
+        processed = OrderedDict()
+        for path, status, result in rows:
+            processed[path] = (status, json.loads(result))
+        return processed
+
+    def close(self):
+        """
+        This method closes the journal.
+
+        Returns
+        -------
+        none
+        """
+        with self.lock:
+            self.db.close()
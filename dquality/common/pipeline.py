@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# #########################################################################
+# Copyright (c) 2016, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2016. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+
+"""
+Please make sure the installation :ref:`pre-requisite-reference-label` are met.
+
+This module provides a read-ahead stage for the file based verifiers. A pool of threads reads and decodes the next
+items (files or blocks of frames) while the current item is checked, so the storage latency overlaps with the
+computation. The number of items read ahead is bounded, and the items are returned in the order they were
+submitted.
+
+"""
+
+import os
+import time
+from collections import deque
+from multiprocessing.pool import ThreadPool
+import dquality.common.constants as const
+
+__author__ = "Barbara Frosik"
+__copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
+__docformat__ = 'restructuredtext en'
+__all__ = ['Prefetcher',
+           'readahead']
+
+
+class Prefetcher():
+    """
+    This class reads items ahead of the consumer with a bounded read-ahead depth.
+
+    The items are submitted with put, and loaded by the 'load' function in the thread pool. At most 'depth' items
+    are being loaded or wait loaded; the remaining submitted items are held until a loaded item is taken.
+    The get returns the items in order of submission. The instance counts hits (the item was loaded when requested),
+    misses (the consumer had to wait for the item) and the time the consumer stalled.
+    """
+
+    def __init__(self, load, depth=const.PREFETCH_DEPTH, no_workers=const.PREFETCH_WORKERS, pool=None):
+        """
+        constructor
+
+        Parameters
+        ----------
+        load : function
+            a function taking an item and returning the loaded value
+
+        depth : int
+            maximum number of items loaded ahead
+
+        no_workers : int
+            number of threads loading the items
+
+        pool : Pool
+            optional, a pool the items are loaded in, i.e. a pool of worker processes; the pool is not closed with
+            this instance. If not given, a pool of 'no_workers' threads is created.
+        """
+        self.load = load
+        self.depth = max(depth, 1)
+        self.own_pool = pool is None
+        if pool is None:
+            pool = ThreadPool(max(no_workers, 1))
+        self.pool = pool
+        self.waiting = deque()
+        self.loading = deque()
+        self.hits = 0
+        self.misses = 0
+        self.stall_time = 0.0
+
+    def __len__(self):
+        return len(self.waiting) + len(self.loading)
+
+    def fill(self):
+        """
+        This method starts loading of the waiting items, up to the read-ahead depth.
+
+        Parameters
+        ----------
+        none
+
+        Returns
+        -------
+        none
+        """
+        while len(self.waiting) > 0 and len(self.loading) < self.depth:
+            item = self.waiting.popleft()
+            self.loading.append((item, self.pool.apply_async(self.load, (item,))))
+
+    def put(self, item):
+        """
+        This method submits an item to be loaded.
+
+        Parameters
+        ----------
+        item : object
+            an item passed to the load function
+
+        Returns
+        -------
+        none
+        """
+        self.waiting.append(item)
+        self.fill()
+
+    def ready(self, timeout=0):
+        """
+        This method checks whether the oldest submitted item is loaded.
+
+        Parameters
+        ----------
+        timeout : float
+            number of seconds to wait for the item
+
+        Returns
+        -------
+        True if the oldest item is loaded, False otherwise or if there is no item loading
+        """
+        if len(self.loading) == 0:
+            return False
+        result = self.loading[0][1]
+        if timeout > 0:
+            result.wait(timeout)
+        return result.ready()
+
+    def get(self):
+        """
+        This method returns the oldest submitted item and its loaded value.
+
+        If the value is not loaded yet, the method waits for it, and the wait is counted as a miss. An exception raised
+        by the load function is raised here.
+
+        Parameters
+        ----------
+        none
+
+        Returns
+        -------
+        item, value : tuple
+            the submitted item and the value returned by the load function
+        """
+        item, result = self.loading.popleft()
+        if result.ready():
+            self.hits += 1
+        else:
+            self.misses += 1
+            start = time.time()
+            result.wait()
+            self.stall_time += time.time() - start
+        try:
+            return item, result.get()
+        finally:
+            self.fill()
+
+    def map(self, items):
+        """
+        This generator loads the items ahead and yields them with the loaded values in order.
+
+        Parameters
+        ----------
+        items : iterable
+            items passed to the load function; the iterable is consumed lazily
+
+        Returns
+        -------
+        item, value : tuple
+            the item and the value returned by the load function
+        """
+        for item in items:
+            self.put(item)
+            if len(self) > self.depth:
+                yield self.get()
+        while len(self) > 0:
+            yield self.get()
+
+    def get_stats(self):
+        """
+        This method returns the read-ahead statistics.
+
+        Parameters
+        ----------
+        none
+
+        Returns
+        -------
+        stats : dict
+            a dictionary with number of hits, number of misses, and the stall time in seconds
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'stall_time': self.stall_time}
+
+    def log_stats(self, logger, name):
+        """
+        This method logs the read-ahead statistics.
+
+        Parameters
+        ----------
+        logger : Logger
+            logger instance
+
+        name : str
+            name of the verified object, included in the message
+
+        Returns
+        -------
+        none
+        """
+        logger.info('prefetch for %s: %d hits, %d misses, %.3f s stalled' %
+                    (name, self.hits, self.misses, self.stall_time))
+
+    def close(self):
+        """
+        This method stops the loading threads, unless the pool was given to the constructor. The items that were not
+        loaded are dropped.
+
+        Parameters
+        ----------
+        none
+
+        Returns
+        -------
+        none
+        """
+        self.waiting.clear()
+        if self.own_pool:
+            self.pool.terminate()
+
+
+def readahead(file, block_size=2**22):
+    """
+    This function brings the content of the file into the page cache.
+
+    On systems supporting posix_fadvise the kernel is advised to read the file; otherwise the file is read through
+    in blocks. The function is used as a load function when the file is read later by another reader.
+
+    Parameters
+    ----------
+    file : str
+        file name including path
+
+    block_size : int
+        size of a block in bytes when the file is read through
+
+    Returns
+    -------
+    size : int
+        size of the file in bytes, or None if the file cannot be read; the error is then reported by the reader
+    """
+    try:
+        with open(file, 'rb') as fp:
+            size = os.fstat(fp.fileno()).st_size
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(fp.fileno(), 0, size, os.POSIX_FADV_WILLNEED)
+            else:
+                while len(fp.read(block_size)) > 0:
+                    pass
+    except (IOError, OSError):
+        return None
+    return size
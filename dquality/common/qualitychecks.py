@@ -59,6 +59,7 @@ __author__ = "Barbara Frosik"
 __copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
 __all__ = ['find_result',
+           'evaluate_metrics',
            'mean',
            'st_dev',
            'sum',
@@ -67,7 +68,58 @@ __all__ = ['find_result',
            'Npix_sat',
            'stat_mean',
            'acc_sat',
-           'run_quality_checks']
+           'run_quality_checks',
+           'evaluate_quality_checks']
+
+
+def signed_dtype(dtype):
+    """
+    This function returns a signed data type that can hold a difference of two values of the given data type.
+
+    Parameters
+    ----------
+    dtype : numpy.dtype
+        data type of the frame
+
+    Returns
+    -------
+    numpy.dtype
+        signed data type
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'u':
+        return np.dtype('i' + str(min(2 * dtype.itemsize, 8)))
+    elif dtype.kind == 'b':
+        return np.dtype(np.int8)
+    return dtype
+
+
+def accumulator_dtype(dtype, floating=False):
+    """
+    This function returns data type used to accumulate reductions over a frame of the given data type.
+
+    The frames are kept in the detector data type, the reductions accumulate in a wide type, so the sums do not
+    overflow.
+
+    Parameters
+    ----------
+    dtype : numpy.dtype
+        data type of the frame
+
+    floating : boolean
+        if True, a floating point accumulator is returned, as needed for mean and standard deviation
+
+    Returns
+    -------
+    numpy.dtype
+        accumulator data type
+    """
+    dtype = np.dtype(dtype)
+    if floating or dtype.kind in 'fc':
+        return np.dtype(np.float64)
+    elif dtype.kind == 'u':
+        return np.dtype(np.uint64)
+    return np.dtype(np.int64)
 
 
 def find_result(res, quality_id, limits):
@@ -110,6 +162,38 @@ def find_result(res, quality_id, limits):
     return Result(res, quality_id, const.NO_ERROR)
 
 
+def evaluate_metrics(values, limits):
+    """
+    This function evaluates an array of calculated results against limits.
+
+    It is a vectorized equivalent of find_result; the low limit is evaluated first.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        calculated results
+
+    limits : dictionary
+        a dictionary containing threshold values
+
+    Returns
+    -------
+    errors : numpy.ndarray
+        an array of QUALITYERROR_LOW, QUALITYERROR_HIGH, or NO_ERROR values, one for each result
+    """
+    values = np.asarray(values)
+    errors = np.full(values.shape, const.NO_ERROR, dtype=np.int8)
+    try:
+        errors[values > limits['high_limit']] = const.QUALITYERROR_HIGH
+    except KeyError:
+        pass
+    try:
+        errors[values < limits['low_limit']] = const.QUALITYERROR_LOW
+    except KeyError:
+        pass
+    return errors
+
+
 def mean(**kws):
     """
     This method validates mean value of the frame.
@@ -135,7 +219,7 @@ def mean(**kws):
     data = kws['data']
 
     this_limits = limits['mean']
-    res = np.mean(data.slice)
+    res = data.slice.mean(dtype=accumulator_dtype(data.slice.dtype, True))
     result = find_result(res, 'mean', this_limits)
     return result
 
@@ -165,7 +249,7 @@ def st_dev(**kws):
     data = kws['data']
 
     this_limits = limits['std']
-    res = np.std(data.slice)
+    res = data.slice.std(dtype=accumulator_dtype(data.slice.dtype, True))
     result = find_result(res, 'st_dev', this_limits)
     return result
 
@@ -195,7 +279,7 @@ def sum(**kws):
     data = kws['data']
 
     this_limits = limits['sum']
-    res = data.slice.sum()
+    res = data.slice.sum(dtype=accumulator_dtype(data.slice.dtype))
     result = find_result(res, 'sum', this_limits)
 
     return result
@@ -227,11 +311,12 @@ def diff_sat(**kws):
     last_frame = kws['last_frame']
     if last_frame is None:  # evaluating the first slice
         last_frame = data.slice
-    diff = data.slice - last_frame
+    # the frames are in detector data type, subtract in signed type to avoid wrap around of unsigned pixels
+    diff = np.subtract(data.slice, last_frame, dtype=signed_dtype(data.slice.dtype))
 
     # find how many pixels have intensity exceeding the point saturation limit
     sat_high = (limits['pix_sat'])['high_limit']
-    points = (diff > sat_high).sum()
+    points = np.count_nonzero(diff > sat_high)
 
     # check if the number of saturated points are within limit
     this_limits = limits['diff_sat']
@@ -268,7 +353,8 @@ def Npix_sat_cnt_rate(**kws):
     # point saturation rate limit
     acq_time = data.acq_time
     sat_high = (limits['pix_sat_cnt_rate'])['high_limit']
-    points = (data.slice/acq_time > sat_high).sum()
+    # compare the pixels with the limit scaled by acquire time rather than dividing the frame
+    points = np.count_nonzero(data.slice > sat_high * acq_time)
 
     # evaluate if the number of saturated points are within limit
     this_limits = limits['Npix_sat_cnt_rate']
@@ -302,7 +388,7 @@ def Npix_sat(**kws):
 
     # find how many pixels have intensity exceeding the point saturation limit
     sat_high = (limits['pix_sat'])['high_limit']
-    points = (data.slice > sat_high).sum()
+    points = np.count_nonzero(data.slice > sat_high)
 
     # evaluate if the number of saturated points are within limit
     this_limits = limits['Npix_sat']
@@ -408,6 +494,23 @@ function_mapper = {'mean' : mean,
                    'diff_sat' : diff_sat
                    }
 
+# maps the quality check ID to the limits entry the result is evaluated against
+limits_mapper = {'mean' : 'mean',
+                 'st_dev' : 'std',
+                 'Npix_sat' : 'Npix_sat',
+                 'Npix_sat_cnt_rate': 'Npix_sat_cnt_rate',
+                 'sum': 'sum',
+                 'stat_mean' : 'stat_mean',
+                 'acc_sat' : 'sat_points',
+                 'diff_sat' : 'diff_sat'
+                 }
+
+# limits entries that are parameters of the calculated results rather than thresholds
+metric_limits = ['pix_sat', 'pix_sat_cnt_rate']
+
+# quality checks which results depend on the results of the previous frames
+statistical_checks = ['stat_mean', 'acc_sat']
+
 def run_quality_checks(data, index, limits, quality_checks, **kwargs):
     """
     This function runs validation methods applicable to the frame data type and enqueues results.
@@ -453,3 +556,43 @@ def run_quality_checks(data, index, limits, quality_checks, **kwargs):
 
     results = Results(data.type, index, failed, results_dict)
     return results
+
+
+def evaluate_quality_checks(metrics, type, index, limits, quality_checks):
+    """
+    This function evaluates calculated results of quality checks against limits.
+
+    The results calculated before (i.e. cached) are evaluated as if the quality checks run on the frame, so a
+    change of the limits does not require the data to be read again.
+
+    Parameters
+    ----------
+    metrics : dict
+        a dictionary of calculated results keyed by quality check ID
+
+    type : str
+        data type of the frame
+
+    index : int
+        frame index
+
+    limits : dictionary
+        a dictionary containing threshold values for the evaluated data type
+
+    quality_checks : list
+        a list of quality checks that apply to the data type
+
+    Returns
+    -------
+    results : Results
+        a Results object
+    """
+    results_dict = {}
+    failed = False
+    for qc in quality_checks:
+        result = find_result(metrics[qc], qc, limits[limits_mapper[qc]])
+        results_dict[qc] = result
+        if result.error != 0:
+            failed = True
+
+    return Results(type, index, failed, results_dict)
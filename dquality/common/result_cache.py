@@ -0,0 +1,528 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# #########################################################################
+# Copyright (c) 2016, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2016. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+
+"""
+Please make sure the installation :ref:`pre-requisite-reference-label` are met.
+
+This module provides a cache of calculated results of quality checks. An entry is keyed by the identity of the
+verified file (path, size, modification time, and optionally a hash of the beginning and end of the file) combined
+with a hash of the configuration the results depend on, i.e. the quality checks and the limits that are parameters of
+the calculations. The entry holds the per frame results, so verifying a file that did not change does not read the
+data, and a change of the thresholds only evaluates the cached results against the new limits.
+
+The results are stored in a numpy .npz file per entry, and the entries are indexed in a sqlite database in the cache
+directory. The number of entries is bounded; the least recently used entries are evicted.
+
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import tempfile
+from threading import Lock
+import numpy as np
+import dquality.common.constants as const
+import dquality.common.qualitychecks as calc
+from dquality.common.containers import Metrics
+
+__author__ = "Barbara Frosik"
+__copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
+__docformat__ = 'restructuredtext en'
+__all__ = ['get_cache',
+           'get_config_key',
+           'get_metrics',
+           'get_aggregate',
+           'get_metrics_file',
+           'save_metrics',
+           'load_metrics',
+           'ResultCache']
+
+
+def get_cache(conf):
+    """
+    This function creates a result cache according to configuration.
+
+    Parameters
+    ----------
+    conf : ConfigObj
+        configuration
+
+    Returns
+    -------
+    cache : ResultCache
+        a result cache, or None if the 'result_cache' directory is not configured
+    """
+    try:
+        cache_dir = conf['result_cache']
+    except KeyError:
+        return None
+
+    try:
+        max_entries = int(conf['result_cache_size'])
+    except KeyError:
+        max_entries = const.RESULT_CACHE_SIZE
+
+    try:
+        fast_hash = str(conf['result_cache_hash']) == 'True'
+    except KeyError:
+        fast_hash = False
+
+    return ResultCache(cache_dir, max_entries, fast_hash)
+
+
+def get_config_key(quality_checks, limits, *args):
+    """
+    This function returns a hash of the configuration the calculated results depend on.
+
+    The thresholds are not part of the key, as the cached results are evaluated against current limits. The limits
+    that are parameters of the calculations are. If a data type is verified with statistical quality checks, the
+    results depend on which of the previous frames passed, so all limits of the data type are part of the key.
+
+    Parameters
+    ----------
+    quality_checks : dict
+        a dictionary of quality checks lists keyed by data type
+
+    limits : dict
+        a dictionary of limits keyed by data type
+
+    args : list
+        other values the results depend on, i.e. data tags
+
+    Returns
+    -------
+    key : str
+        a hash of the configuration
+    """
+    config_limits = {}
+    for type in quality_checks:
+        type_limits = limits.get(type, {})
+        if any(qc in calc.statistical_checks for qc in quality_checks[type]):
+            config_limits[type] = type_limits
+        else:
+            config_limits[type] = dict((key, type_limits[key]) for key in calc.metric_limits if key in type_limits)
+    config = {'quality_checks': quality_checks, 'limits': config_limits, 'args': args}
+    return hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def get_metrics(aggregate, start=0, end=None):
+    """
+    This function returns calculated results of quality checks contained in aggregate.
+
+    Parameters
+    ----------
+    aggregate : dict
+        results delivered by the handler; a dictionary keyed by data type with 'bad_indexes' and 'good_indexes'
+        dictionaries of results lists keyed by frame index
+
+    start : int
+        index of the first frame to include; the indexes in returned metrics are relative to it
+
+    end : int
+        index after the last frame to include, or None to include all frames
+
+    Returns
+    -------
+    metrics : dict
+        a dictionary of Metrics keyed by data type
+    """
+    metrics = {}
+    for type in aggregate:
+        frames = dict(aggregate[type]['good_indexes'])
+        frames.update(aggregate[type]['bad_indexes'])
+        indexes = sorted(index for index in frames if index >= start and (end is None or index < end))
+        values = {}
+        for index in indexes:
+            for result in frames[index]:
+                values.setdefault(result.quality_id, []).append(result.res)
+        metrics[type] = Metrics(type, np.array(indexes, dtype=np.int64) - start,
+                                dict((qc, np.array(values[qc], dtype=np.float64)) for qc in values))
+    return metrics
+
+
+def get_aggregate(metrics, limits, quality_checks):
+    """
+    This function evaluates the calculated results against limits.
+
+    Parameters
+    ----------
+    metrics : dict
+        a dictionary of Metrics keyed by data type
+
+    limits : dict
+        a dictionary of limits keyed by data type
+
+    quality_checks : dict
+        a dictionary of quality checks lists keyed by data type
+
+    Returns
+    -------
+    aggregate : dict
+        results structured as delivered by the handler
+    """
+    aggregate = {}
+    for type in metrics:
+        bad_indexes = {}
+        good_indexes = {}
+        results = dict((qc, []) for qc in quality_checks[type])
+        values = metrics[type].values
+        for i, index in enumerate(metrics[type].indexes):
+            index = int(index)
+            frame = calc.evaluate_quality_checks(dict((qc, values[qc][i]) for qc in values), type, index,
+                                                 limits[type], quality_checks[type])
+            if frame.failed:
+                bad_indexes[index] = frame.results
+            else:
+                good_indexes[index] = frame.results
+                for result in frame.results:
+                    results[result.quality_id].append(result)
+        if len(bad_indexes) > 0 or len(good_indexes) > 0:
+            aggregate[type] = {'bad_indexes': bad_indexes, 'good_indexes': good_indexes, 'results': results}
+    return aggregate
+
+
+def get_metrics_file(file, metrics_dir):
+    """
+    This function returns name of the file the calculated results of a verified file are saved in.
+
+    Parameters
+    ----------
+    file : str
+        a filename including path that was verified
+
+    metrics_dir : str
+        a directory where the calculated results are saved
+
+    Returns
+    -------
+    metrics_file : str
+        the file name including path
+    """
+    file_path = file.rsplit("/",)
+    return metrics_dir + "/" + file_path[len(file_path)-1] + '.metrics.npz'
+
+
+def save_metrics(metrics_file, metrics, file=None):
+    """
+    This function saves calculated results of quality checks in a numpy .npz file.
+
+    The file contains for each data type an array of frame indexes named '<data type>.index', and an array of
+    results named '<data type>.<quality check ID>' for each quality check. The file is written to a temporary file and
+    renamed, so it is never read incomplete.
+
+    Parameters
+    ----------
+    metrics_file : str
+        name of the file including path
+
+    metrics : dict
+        a dictionary of Metrics keyed by data type
+
+    file : str
+        optional, name of the verified file, saved as 'source' array
+
+    Returns
+    -------
+    none
+    """
+    arrays = {}
+    for type in metrics:
+        arrays[type + '.index'] = metrics[type].indexes
+        for qc in metrics[type].values:
+            arrays[type + '.' + qc] = metrics[type].values[qc]
+        if metrics[type].last_frame is not None:
+            arrays[type + '.last_frame'] = metrics[type].last_frame
+    if file is not None:
+        arrays['source'] = np.array(file)
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(metrics_file)), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as fp:
+        np.savez(fp, **arrays)
+    os.rename(tmp_file, metrics_file)
+
+
+def load_metrics(metrics_file):
+    """
+    This function loads calculated results of quality checks saved with save_metrics.
+
+    Parameters
+    ----------
+    metrics_file : str
+        name of the file including path
+
+    Returns
+    -------
+    metrics : dict
+        a dictionary of Metrics keyed by data type
+
+    file : str
+        name of the verified file, or None if not saved
+    """
+    with np.load(metrics_file) as entry:
+        arrays = dict((name, entry[name]) for name in entry.files)
+    file = arrays.pop('source', None)
+    if file is not None:
+        file = str(file)
+    metrics = {}
+    for name in arrays:
+        type, qc = name.split('.', 1)
+        if type not in metrics:
+            metrics[type] = Metrics(type, None, {}, None)
+        if qc == 'index':
+            metrics[type].indexes = arrays[name]
+        elif qc == 'last_frame':
+            metrics[type].last_frame = arrays[name]
+        else:
+            metrics[type].values[qc] = arrays[name]
+    return metrics, file
+
+
+class ResultCache():
+    """
+    This class is a bounded cache of calculated results of quality checks.
+
+    The methods can be called from different threads, and the cache directory can be shared by processes.
+    """
+
+    def __init__(self, cache_dir, max_entries=const.RESULT_CACHE_SIZE, fast_hash=False):
+        """
+        constructor
+
+        Parameters
+        ----------
+        cache_dir : str
+            a directory where the cache is located; created if it does not exist
+
+        max_entries : int
+            maximum number of cached entries
+
+        fast_hash : boolean
+            if True, a hash of the beginning and end of the file is part of the file identity
+        """
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.fast_hash = fast_hash
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+        self.db = sqlite3.connect(os.path.join(cache_dir, 'index.db'), check_same_thread=False, timeout=30)
+        with self.lock:
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, path TEXT, used REAL)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+            self.db.commit()
+
+    def get_identity(self, file):
+        """
+        This method returns identity of a file.
+
+        Parameters
+        ----------
+        file : str
+            a full name of a file
+
+        Returns
+        -------
+        identity : list
+            the path, size, modification time, and optionally hash of the first and last block of the file
+        """
+        st = os.stat(file)
+        identity = [os.path.abspath(file), st.st_size, st.st_mtime]
+        if self.fast_hash:
+            block_size = const.RESULT_CACHE_HASH_BLOCK
+            digest = hashlib.sha1()
+            with open(file, 'rb') as fp:
+                digest.update(fp.read(block_size))
+                if st.st_size > block_size:
+                    fp.seek(max(block_size, st.st_size - block_size))
+                    digest.update(fp.read(block_size))
+            identity.append(digest.hexdigest())
+        return identity
+
+    def get_key(self, file, config_key, context=None):
+        """
+        This method returns a cache key of results of the file verified with given configuration.
+
+        Parameters
+        ----------
+        file : str
+            a full name of a file
+
+        config_key : str
+            a hash of the configuration, as returned by get_config_key
+
+        context : object
+            optional, other values the results depend on, i.e. identity of the file verified before
+
+        Returns
+        -------
+        key : str
+            the key, or None if the file does not exist
+        """
+        try:
+            identity = self.get_identity(file)
+        except (IOError, OSError):
+            return None
+        return hashlib.sha1(json.dumps([identity, config_key, context]).encode('utf-8')).hexdigest()
+
+    def get_entry_file(self, key):
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    def get(self, key):
+        """
+        This method returns cached results.
+
+        Parameters
+        ----------
+        key : str
+            a cache key
+
+        Returns
+        -------
+        metrics : dict
+            a dictionary of Metrics keyed by data type, or None if the results are not cached
+        """
+        metrics = None
+        if key is not None:
+            with self.lock:
+                row = self.db.execute('SELECT key FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                try:
+                    metrics, file = load_metrics(self.get_entry_file(key))
+                    with self.lock:
+                        self.db.execute('UPDATE entries SET used = ? WHERE key = ?', (time.time(), key))
+                        self.db.commit()
+                except (IOError, OSError, ValueError, KeyError):
+                    self.remove([key])
+        if metrics is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return metrics
+
+    def put(self, key, file, metrics):
+        """
+        This method adds results to the cache, and evicts the least recently used entries above the bound.
+
+        Parameters
+        ----------
+        key : str
+            a cache key
+
+        file : str
+            a full name of the verified file
+
+        metrics : dict
+            a dictionary of Metrics keyed by data type
+
+        Returns
+        -------
+        none
+        """
+        if key is None:
+            return
+        save_metrics(self.get_entry_file(key), metrics, file)
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?)', (key, file, time.time()))
+            self.db.commit()
+            evicted = [row[0] for row in self.db.execute('SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?',
+                                                         (self.max_entries,)).fetchall()]
+        self.remove(evicted)
+
+    def remove(self, keys):
+        """
+        This method removes entries from the cache.
+
+        Parameters
+        ----------
+        keys : list
+            a list of cache keys
+
+        Returns
+        -------
+        none
+        """
+        if len(keys) == 0:
+            return
+        with self.lock:
+            self.db.executemany('DELETE FROM entries WHERE key = ?', [(key,) for key in keys])
+            self.db.commit()
+        for key in keys:
+            try:
+                os.remove(self.get_entry_file(key))
+            except OSError:
+                pass
+
+    def log_stats(self, logger):
+        """
+        This method logs number of cache hits and misses.
+
+        Parameters
+        ----------
+        logger : Logger
+            logger instance
+
+        Returns
+        -------
+        none
+        """
+        logger.info('result cache: %d hits, %d misses' % (self.hits, self.misses))
+
+    def close(self):
+        """
+        This method closes the cache index.
+
+        Returns
+        -------
+        none
+        """
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# #########################################################################
+# Copyright (c) 2016, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2016. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+
+"""
+Please make sure the installation :ref:`pre-requisite-reference-label` are met.
+
+This module provides a scheduler running periodic polling jobs, such as polling of monitored directories, in a single
+long lived thread. Each job has its own polling interval. The interval grows when a poll finds no activity, and drops
+to the minimum when activity is found, so an idle directory is polled rarely and a burst of files is picked up fast.
+The jobs are scheduled against their planned times, so the polling does not drift. The scheduler keeps the number of
+polls and the poll durations of each job.
+
+"""
+
+import time
+import heapq
+import itertools
+from threading import Thread, Condition
+
+__author__ = "Barbara Frosik"
+__copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
+__docformat__ = 'restructuredtext en'
+__all__ = ['PollJob',
+           'PollScheduler',
+           'get_scheduler']
+
+
+class PollJob():
+    """
+    This class holds a polling job, its interval and metrics.
+    """
+
+    def __init__(self, name, function, interval, min_interval=None, max_interval=None, backoff=2.0):
+        """
+        constructor
+
+        Parameters
+        ----------
+        name : str
+            name of the job, i.e. the polled directory
+
+        function : function
+            a function called on each poll; returns a number indicating activity found, 0 if none
+
+        interval : float
+            initial number of seconds between polls
+
+        min_interval : float
+            number of seconds between polls when activity is found; defaults to the interval
+
+        max_interval : float
+            maximum number of seconds between polls when there is no activity; defaults to the interval
+
+        backoff : float
+            factor the interval grows by after a poll without activity
+        """
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.min_interval = interval if min_interval is None else min_interval
+        self.max_interval = interval if max_interval is None else max_interval
+        self.backoff = backoff
+        self.active = True
+        self.polls = 0
+        self.activity = 0
+        self.total_time = 0.0
+        self.last_time = 0.0
+        self.max_time = 0.0
+
+    def adjust(self, activity):
+        """
+        This method adjusts the interval after a poll.
+
+        Parameters
+        ----------
+        activity : int
+            a number indicating activity found by the poll
+
+        Returns
+        -------
+        none
+        """
+        if activity:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+
+    def get_metrics(self):
+        """
+        This method returns the poll metrics of the job.
+
+        Returns
+        -------
+        metrics : dict
+            number of polls, activity found, current interval, and the mean, last and maximum poll duration
+        """
+        mean = self.total_time / self.polls if self.polls > 0 else 0.0
+        return {'polls': self.polls, 'activity': self.activity, 'interval': self.interval,
+                'mean_time': mean, 'last_time': self.last_time, 'max_time': self.max_time}
+
+
+class PollScheduler():
+    """
+    This class runs polling jobs in one thread.
+
+    The jobs are kept in a heap ordered by the time of the next poll. The thread is started with the first job, and
+    sleeps until the next poll is due or a job is added.
+    """
+
+    def __init__(self, logger=None):
+        """
+        constructor
+
+        Parameters
+        ----------
+        logger : Logger
+            optional, logger instance used to report failed polls
+        """
+        self.logger = logger
+        self.heap = []
+        self.counter = itertools.count()
+        self.condition = Condition()
+        self.thread = None
+        self.done = False
+
+    def add(self, name, function, interval, min_interval=None, max_interval=None, backoff=2.0):
+        """
+        This method adds a polling job. The first poll is after the interval.
+
+        Parameters
+        ----------
+        name : str
+            name of the job, i.e. the polled directory
+
+        function : function
+            a function called on each poll; returns a number indicating activity found, 0 if none
+
+        interval : float
+            initial number of seconds between polls
+
+        min_interval : float
+            number of seconds between polls when activity is found
+
+        max_interval : float
+            maximum number of seconds between polls when there is no activity
+
+        backoff : float
+            factor the interval grows by after a poll without activity
+
+        Returns
+        -------
+        job : PollJob
+            the added job
+        """
+        job = PollJob(name, function, interval, min_interval, max_interval, backoff)
+        with self.condition:
+            self.done = False
+            heapq.heappush(self.heap, (time.time() + interval, next(self.counter), job))
+            if self.thread is None:
+                self.thread = Thread(target=self.run)
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+        return job
+
+    def remove(self, job):
+        """
+        This method removes a polling job. A poll in progress is completed.
+
+        Parameters
+        ----------
+        job : PollJob
+            the job to remove
+
+        Returns
+        -------
+        none
+        """
+        with self.condition:
+            job.active = False
+            self.heap = [entry for entry in self.heap if entry[2] is not job]
+            heapq.heapify(self.heap)
+            self.condition.notify()
+
+    def run(self):
+        """
+        This method is the scheduler thread loop.
+
+        Returns
+        -------
+        none
+        """
+        while True:
+            with self.condition:
+                while not self.done:
+                    if len(self.heap) == 0:
+                        self.condition.wait()
+                        continue
+                    due = self.heap[0][0]
+                    now = time.time()
+                    if due <= now:
+                        break
+                    self.condition.wait(due - now)
+                if self.done:
+                    self.thread = None
+                    return
+                due, seq, job = heapq.heappop(self.heap)
+
+            start = time.time()
+            try:
+                activity = job.function()
+            except Exception as e:
+                activity = 0
+                if self.logger is not None:
+                    self.logger.error('poll of %s failed: %s' % (job.name, str(e)))
+            end = time.time()
+
+            job.polls += 1
+            job.last_time = end - start
+            job.total_time += job.last_time
+            job.max_time = max(job.max_time, job.last_time)
+            if activity:
+                job.activity += 1
+            job.adjust(activity)
+
+            with self.condition:
+                if job.active:
+                    # the next poll is planned from the planned time of this poll, unless the poll is late
+                    heapq.heappush(self.heap, (max(due + job.interval, end), next(self.counter), job))
+
+    def stop(self):
+        """
+        This method stops the scheduler thread. The jobs are dropped.
+
+        Returns
+        -------
+        none
+        """
+        with self.condition:
+            self.done = True
+            self.heap = []
+            self.condition.notify()
+
+
+scheduler = PollScheduler()
+
+
+def get_scheduler():
+    """
+    This function returns the scheduler shared by all monitors of the process.
+
+    Returns
+    -------
+    scheduler : PollScheduler
+        the scheduler instance
+    """
+    return scheduler
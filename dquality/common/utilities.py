@@ -51,12 +51,23 @@ This file is a suite of utility functions.
 
 """
 import os
+import sys
+import time
 import struct as st
+import atexit
+import signal
 import logging
+import multiprocessing
 from configobj import ConfigObj
 import pytz
 import datetime
+from threading import Lock, Thread
+from collections import OrderedDict
 import dquality.common.constants as const
+if sys.version[0] == '2':
+    import Queue as queue
+else:
+    import queue as queue
 
 
 __author__ = "Barbara Frosik"
@@ -69,8 +80,12 @@ __all__ = ['lt',
            'gt',
            'get_config',
            'get_logger',
+           'LogFormatter',
+           'LogQueueHandler',
            'get_directory',
            'get_file',
+           'HdfIndex',
+           'get_hdf_layout',
            'get_data_hdf',
            'copy_list',
            'key_list']
@@ -201,11 +216,208 @@ def get_config(config):
     return ConfigObj(config)
 
 
+class LogFormatter(logging.Formatter):
+    """
+    This class formats the log records with the time stamp in the configured time zone.
+    """
+    def __init__(self, fmt, datefmt, timezone):
+        logging.Formatter.__init__(self, fmt, datefmt)
+        self.timezone = timezone
+
+    def converter(self, timestamp):
+        return datetime.datetime.fromtimestamp(timestamp, pytz.timezone(self.timezone))
+
+    def formatTime(self, record, datefmt=None):
+        dt = self.converter(record.created)
+        if datefmt:
+            s = dt.strftime(datefmt)
+        else:
+            t = dt.strftime(self.default_time_format)
+            s = self.default_msec_format % (t, record.msecs)
+        return s
+
+
+class LogQueueHandler(logging.Handler):
+    """
+    This class is a logging handler passing the log records to the log writer through a bounded queue.
+
+    The handler never blocks; when the queue is full the record is dropped and counted. The number of dropped records
+    is logged as a warning when the queue accepts records again, at most once per LOG_DROP_REPORT_PERIOD.
+    """
+    def __init__(self, log_queue, lfile):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        log_queue : Queue
+            a queue read by the log writer
+
+        lfile : str
+            the log file name, identifying the writer
+        """
+        logging.Handler.__init__(self)
+        self.queue = log_queue
+        self.lfile = lfile
+        self.dropped = 0
+        self.reported = 0
+        self.last_report = 0
+
+    def prepare(self, record):
+        # the message is merged with the arguments, and the traceback is formatted, so the record can be pickled
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def report_dropped(self, name, block=False):
+        """
+        This function logs the number of records dropped so far as a warning.
+
+        Parameters
+        ----------
+        name : str
+            name of the logger
+
+        block : boolean
+            if True, waits for space in the queue, otherwise raises Full if the queue is full
+
+        Returns
+        -------
+        none
+        """
+        self.queue.put(logging.makeLogRecord(
+            {'name': name, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+             'msg': str(self.dropped) + ' log records dropped, the log writer did not keep up'}), block,
+            const.LOG_WRITER_JOIN_TIMEOUT)
+        self.reported = self.dropped
+        self.last_report = time.time()
+
+    def emit(self, record):
+        try:
+            if self.dropped > self.reported and time.time() - self.last_report >= const.LOG_DROP_REPORT_PERIOD:
+                self.report_dropped(record.name)
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+
+def write_log(log_queue, lfile, formatter):
+    """
+    This function writes the log records from the queue to the log file, until it dequeues None.
+
+    Parameters
+    ----------
+    log_queue : Queue
+        a queue of log records
+
+    lfile : str
+        the log file name
+
+    formatter : Formatter
+        formatter of the log records
+
+    Returns
+    -------
+    none
+    """
+    handler = logging.FileHandler(lfile)
+    handler.setFormatter(formatter)
+    while True:
+        record = log_queue.get()
+        if record is None:
+            break
+        handler.handle(record)
+    handler.close()
+
+
+def run_log_writer(log_queue, lfile, formatter):
+    # the writer finishes the queue when the verifier is interrupted
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    write_log(log_queue, lfile, formatter)
+
+
+# log file : (queue, writer), one writer process is shared by all loggers and child processes
+log_writers = {}
+log_writers_lock = Lock()
+# logger name : handler
+log_handlers = {}
+
+
+def stop_log_writers():
+    """
+    This function stops the log writers after the queued records are written.
+
+    Returns
+    -------
+    none
+    """
+    with log_writers_lock:
+        for name in log_handlers:
+            handler = log_handlers[name]
+            if handler.dropped > handler.reported and handler.lfile in log_writers:
+                try:
+                    handler.report_dropped(name, True)
+                except queue.Full:
+                    pass
+        for lfile in list(log_writers.keys()):
+            log_queue, writer = log_writers.pop(lfile)
+            log_queue.put(None)
+            writer.join(const.LOG_WRITER_JOIN_TIMEOUT)
+
+
+atexit.register(stop_log_writers)
+
+
+def get_log_queue(lfile, formatter, queue_size):
+    """
+    This function returns the queue of the log writer of the log file. The writer is started on first use.
+
+    The writer is a process, so the file I/O does not stall the verifier. It is a thread, if the current process is
+    a daemon that cannot start processes.
+
+    Parameters
+    ----------
+    lfile : str
+        the log file name
+
+    formatter : Formatter
+        formatter of the log records
+
+    queue_size : int
+        maximum number of records waiting for the writer
+
+    Returns
+    -------
+    log_queue : Queue
+        the queue read by the log writer
+    """
+    lfile = os.path.abspath(lfile)
+    with log_writers_lock:
+        if lfile not in log_writers:
+            log_queue = multiprocessing.Queue(queue_size)
+            if multiprocessing.current_process().daemon:
+                writer = Thread(target=write_log, args=(log_queue, lfile, formatter))
+            else:
+                writer = multiprocessing.Process(target=run_log_writer, args=(log_queue, lfile, formatter))
+            writer.daemon = True
+            writer.start()
+            log_writers[lfile] = (log_queue, writer)
+        return log_writers[lfile][0]
+
+
 def get_logger(name, conf):
     """
     This function initializes logger. If logger is not configured or the logging directory does not exist,
     the logging messages will be added into default.log file.
 
+    The records are passed through a bounded queue to a log writer process shared by all loggers of the log file, so
+    logging does not block on the file I/O. The records that do not fit in the queue are dropped and counted.
+
     Parameters
     ----------
     name : str
@@ -237,25 +449,27 @@ def get_logger(name, conf):
     except KeyError:
         timezone = 'America/Chicago'
 
-    tz = pytz.timezone(timezone)
-
-    class Formatter(logging.Formatter):
-        def converter(self, timestamp):
-            return datetime.datetime.fromtimestamp(timestamp, tz)
+    try:
+        queue_size = int(conf['log_queue_size'])
+    except KeyError:
+        queue_size = const.LOG_QUEUE_SIZE
 
-        def formatTime(self, record, datefmt=None):
-            dt = self.converter(record.created)
-            if datefmt:
-                s = dt.strftime(datefmt)
-            else:
-                t = dt.strftime(self.default_time_format)
-                s = self.default_msec_format % (t, record.msecs)
-            return s
+    formatter = LogFormatter("%(asctime)s:  %(levelname)s:  %(name)s:  %(message)s", "%Y-%m-%dT%H:%M:%S%z", timezone)
+    log_queue = get_log_queue(lfile, formatter, queue_size)
 
     logger = logging.getLogger(name)
-    handler = logging.FileHandler(lfile)
-    handler.setFormatter(Formatter("%(asctime)s:  %(levelname)s:  %(name)s:  %(message)s", "%Y-%m-%dT%H:%M:%S%z"))
-    logger.addHandler(handler)
+    # the logger is initialized again by each verification, the handler is added once, and replaced if the writer
+    # was stopped
+    for handler in list(logger.handlers):
+        if isinstance(handler, LogQueueHandler) and handler.lfile == os.path.abspath(lfile):
+            if handler.queue is log_queue:
+                break
+            logger.removeHandler(handler)
+    else:
+        handler = LogQueueHandler(log_queue, os.path.abspath(lfile))
+        logger.addHandler(handler)
+        with log_writers_lock:
+            log_handlers[name] = handler
     logger.setLevel(logging.DEBUG)
     return logger
 
@@ -297,12 +511,85 @@ def get_file(conf, config_name, logger, log_error=True):
     return file
 
 
-def get_data_hdf(file):
-    import h5py
+class HdfIndex():
+    """
+    This class is a lazy index of data sets in an open hdf file.
+
+    It can be used as the dictionary of data set names keyed by the names, that used to be built by traversing the
+    file. A name is resolved by direct lookup when requested. The file is traversed only when all names are requested
+    (i.e. iterating over the index), and then once. The resolved names are recorded in a layout, that is reused by
+    indexes of the same file, or of files with the same structure.
+    """
+
+    def __init__(self, file_h5, layout):
+        """
+        constructor
+
+        Parameters
+        ----------
+        file_h5 : h5py.File
+            an open hdf file
+
+        layout : dict
+            a layout the resolved names are recorded in; a dictionary with 'resolved' dictionary of name : boolean
+            indicating whether the name is a data set, and 'names' list of all data set names, or None if not known
+        """
+        self.file_h5 = file_h5
+        self.layout = layout
+
+    def is_dataset(self, name):
+        import h5py
+
+        resolved = self.layout['resolved']
+        if name not in resolved:
+            resolved[name] = isinstance(self.file_h5.get(name), h5py.Dataset)
+        return resolved[name]
+
+    def get_names(self):
+        import h5py
+
+        if self.layout['names'] is None:
+            names = []
+
+            def func(name, dset):
+                if isinstance(dset, h5py.Dataset):
+                    names.append(dset.name)
+
+            self.file_h5.visititems(func)
+            self.layout['names'] = names
+        return self.layout['names']
+
+    def __getitem__(self, name):
+        if self.is_dataset(name):
+            return name
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        return self.is_dataset(name)
 
+    def get(self, name, default=None):
+        if self.is_dataset(name):
+            return name
+        return default
+
+    def __iter__(self):
+        return iter(self.get_names())
+
+    def __len__(self):
+        return len(self.get_names())
+
+    def keys(self):
+        return list(self.get_names())
+
+
+# layouts of hdf files keyed by file identity, the least recently used are evicted
+hdf_layouts = OrderedDict()
+hdf_layouts_lock = Lock()
+
+
+def get_hdf_layout(file):
     """
-    This function takes a file of HDF format, traverses through tags,
-    finds "shape" data sets and returns the sets in a dictionary.
+    This function returns a layout of hdf file data sets, cached by the file identity.
 
     Parameters
     ----------
@@ -311,20 +598,56 @@ def get_data_hdf(file):
 
     Returns
     -------
-    data : dictionary
-        A dictionary of data sets with the tag keys
+    layout : dict
+        a layout used by HdfIndex; the same instance is returned for the file until it is modified
+    """
+    st = os.stat(file)
+    key = (os.path.abspath(file), st.st_size, st.st_mtime)
+    with hdf_layouts_lock:
+        layout = hdf_layouts.pop(key, None)
+        if layout is None:
+            layout = {'resolved': {}, 'names': None}
+        hdf_layouts[key] = layout
+        while len(hdf_layouts) > const.HDF_LAYOUT_CACHE_SIZE:
+            hdf_layouts.popitem(last=False)
+    return layout
+
+
+def get_data_hdf(file, template=None, **kwargs):
+    import h5py
+
     """
-    data = {}
+    This function takes a file of HDF format, and returns the open file and a lazy index of data sets, that can be
+    used as a dictionary of the data set names.
 
-    def func(name, dset):
-        if not hasattr(dset, 'shape'):
-            return  # not array, can't be image
-        if isinstance(dset, h5py.Dataset):
-            data[dset.name] = dset.name
+    The data sets are resolved on demand, and the index is cached by the file identity (path, size, modification
+    time), so repeated opens of the same file do not look up the data sets again. If a template file is given, the
+    layout learned from the template is used, so a series of files with the same structure is indexed once.
 
-    file_h5 = h5py.File(file, 'r')
-    file_h5.visititems(func)
-    return file_h5, data
+    Parameters
+    ----------
+    file : str
+        File Name
+
+    template : str
+        optional, name of a file with the same structure as the file
+
+    kwargs : dict
+        optional parameters passed to h5py.File, i.e. chunk cache settings
+
+    Returns
+    -------
+    file_h5 : h5py.File
+        the open file
+
+    data : HdfIndex
+        An index of data sets with the tag keys
+    """
+    if template is None:
+        template = file
+    layout = get_hdf_layout(template)
+    file_h5 = h5py.File(file, 'r', **kwargs)
+    return file_h5, HdfIndex(file_h5, layout)
 
 
 def get_data_ge(logger, file):
@@ -59,21 +59,37 @@ quality check are returned back.
 import os.path
 import json
 import sys
+import time
+import h5py
 import numpy as np
 from multiprocessing import Queue, Process
+from threading import Thread
 import dquality.common.utilities as utils
 import dquality.handler as handler
 from dquality.common.containers import Data
 import dquality.common.report as report
 import dquality.common.constants as const
-import time
+import dquality.readers.file_reader as freader
+import dquality.common.pipeline as pipeline
+import dquality.common.result_cache as result_cache
+if sys.version[0] == '2':
+    import Queue as queue
+else:
+    import queue as queue
 
 __author__ = "Barbara Frosik"
 __copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
 __all__ = ['init',
+           'start_handler',
            'verify_file_hdf',
+           'verify_file_hdf_follow',
            'verify_file_ge',
+           'verify_file_ge_follow',
+           'verify_file_tif',
+           'save_metrics',
+           'report_aggregate',
+           'verify_file',
            'verify']
 
 
@@ -104,7 +120,7 @@ def init(config):
         a dictionary containing quality check functions ids
 
     file_type : int
-        data file type; currently supporting FILE_TYPE_HDF and FILE_TYPE_GE
+        data file type; currently supporting FILE_TYPE_HDF, FILE_TYPE_GE, and FILE_TYPE_TIF
 
     report_type : int
         report type; currently supporting 'none', 'error', and 'full'
@@ -115,6 +131,12 @@ def init(config):
     consumers : dict
         a dictionary containing consumer processes to run, and their parameters
 
+    cache : ResultCache
+        a cache of calculated results, or None if not configured
+
+    metrics_dir : str
+        a directory where calculated results are saved, or None if not configured
+
     """
 
     conf = utils.get_config(config)
@@ -172,17 +194,67 @@ def init(config):
         with open(consumersfile) as consumers_file:
             consumers = json.loads(consumers_file.read())
 
-    return logger, data_tags, limits, quality_checks, file_type, report_type, report_dir, consumers
+    cache = result_cache.get_cache(conf)
 
+    try:
+        metrics_dir = conf['metrics_dir']
+        if not os.path.isdir(metrics_dir):
+            os.makedirs(metrics_dir)
+    except KeyError:
+        metrics_dir = None
+
+    return logger, data_tags, limits, quality_checks, file_type, report_type, report_dir, consumers, cache, metrics_dir
 
-def verify_file_hdf(logger, file, data_tags, limits, quality_checks, report_type, report_dir, consumers):
+
+def start_handler(args, kwargs, threaded=False):
+    """
+    This function starts the handler verifying the data.
+
+    The handler runs in a new process, or in a thread if the caller is itself a worker process. The data queue is
+    bounded, so the frames are read as fast as the handler can process them.
+
+    Parameters
+    ----------
+    args : list
+        handler arguments: limits, quality checks, and optionally number of frames
+
+    kwargs : dict
+        handler keyword arguments
+
+    threaded : boolean
+        if True, the handler runs in a thread of this process
+
+    Returns
+    -------
+    dataq : Queue
+        a queue the data is delivered on to the handler
+
+    aggregateq : Queue
+        a queue the handler delivers aggregated results on
+    """
+    if threaded:
+        dataq = queue.Queue(const.DATA_QUEUE_SIZE)
+        aggregateq = queue.Queue()
+        t = Thread(target=handler.handle_data, args=(dataq, aggregateq, args, kwargs))
+        t.daemon = True
+        t.start()
+    else:
+        dataq = Queue(const.DATA_QUEUE_SIZE)
+        aggregateq = Queue()
+        p = Process(target=handler.handle_data, args=(dataq, aggregateq, args, kwargs))
+        p.start()
+    return dataq, aggregateq
+
+
+def verify_file_hdf(logger, file, data_tags, limits, quality_checks, report_type, report_dir, consumers, threaded=False,
+                    cache=None, cache_key=None, metrics_dir=None):
     """
     This method handles verification of data in hdf type file.
 
     This method creates and starts a new handler process. The handler is initialized with data queue,
     the data type, and a result queue. The data type can be 'data_dark', 'data_white' or 'data'.
     After starting the process the function enqueues queue slice by slice into data, until all data is
-    queued. The last enqueued element is end of the data marker.
+    queued. The datasets are read in chunk aligned blocks. The last enqueued element is end of the data marker.
 
     Parameters
     ----------
@@ -210,6 +282,18 @@ def verify_file_hdf(logger, file, data_tags, limits, quality_checks, report_type
     consumers : dict
         a dictionary containing consumer processes to run, and their parameters
 
+    threaded : boolean
+        if True, the handler runs in a thread of this process instead of a new process
+
+    cache : ResultCache
+        optional, a cache the calculated results are added to
+
+    cache_key : str
+        a key the results are cached with
+
+    metrics_dir : str
+        optional, a directory where the calculated results are saved
+
     Returns
     -------
     bad_indexes : dict
@@ -219,22 +303,24 @@ def verify_file_hdf(logger, file, data_tags, limits, quality_checks, report_type
     def process_data(data_type):
         data_tag = data_tags[data_type]
         dt = fp[data_tag]
-        for i in range(0,dt.shape[0]):
-            data = Data(const.DATA_STATUS_DATA, dt[i], data_type)
-            dataq.put(data)
+        # the blocks are read ahead into new arrays, so the frames can be queued without copying
+        blocks = prefetcher.map((dt, start, n) for start, n in reader.get_ranges(dt))
+        for item, block in blocks:
+            for frame in block:
+                data = Data(const.DATA_STATUS_DATA, frame, data_type)
+                dataq.put(data)
 
     def get_no_frames():
         return fp[data_tags['data']].shape[0] + fp[data_tags['data_white']].shape[0] +fp[data_tags['data_dark']].shape[0]
 
-    fp, tags = utils.get_data_hdf(file)
-    dataq = Queue()
-    aggregateq = Queue()
+    reader = freader.Hdf_fr()
+    fp, tags = utils.get_data_hdf(file, **reader.get_cache_settings())
+    prefetcher = pipeline.Prefetcher(lambda item: reader.read_block(*item))
 
     args = [limits, quality_checks, get_no_frames()]
     kwargs = {}
     kwargs['consumers'] = consumers
-    p = Process(target=handler.handle_data, args=(dataq, aggregateq, args, kwargs))
-    p.start()
+    dataq, aggregateq = start_handler(args, kwargs, threaded)
 
     # assume a fixed order of data types; this will determine indexes on the data
     if 'data_dark' in data_tags:
@@ -245,35 +331,115 @@ def verify_file_hdf(logger, file, data_tags, limits, quality_checks, report_type
         process_data('data')
 
     dataq.put(Data(const.DATA_STATUS_END))
+    prefetcher.close()
+    prefetcher.log_stats(logger, file)
+    fp.close()
 
+    # receive the results
+    aggregate = aggregateq.get()
+    save_metrics(file, aggregate, cache, cache_key, metrics_dir)
 
-    if report_type != const.REPORT_NONE:
-        if report_dir is None:
-            report_file = file.rsplit(".",)[0] + '.report'
-        else:
-            file = file.rsplit(".",)[0]
-            file_path = file.rsplit("/",)
-            report_file = report_dir + "/" + file_path[len(file_path-1)]+ '.report'
+    logger.info('data verifier evaluated ' + file + ' file')
+    return report_aggregate(logger, file, const.FILE_TYPE_HDF, aggregate, report_type, report_dir)
+
+
+def verify_file_hdf_follow(logger, file, data_tags, limits, quality_checks, report_type, report_dir, consumers,
+                           threaded=False, metrics_dir=None, poll_period=const.FOLLOW_POLL_PERIOD,
+                           idle_timeout=const.FOLLOW_IDLE_TIMEOUT):
+    """
+    This method handles verification of data in hdf type file that is being written.
+
+    The file is opened in SWMR read mode, and the frames are enqueued into the handler as they are appended to the
+    datasets, so the quality problems are reported during the acquisition. The progress is logged for each data type.
+    The file is considered complete when none of the datasets grew for the idle timeout. Unlike verify_file_hdf, the
+    bad indexes are indexes of frames in the data set of the data type, as the data types are appended concurrently.
+
+    Parameters
+    ----------
+    logger: Logger
+        Logger instance.
+
+    file : str
+        a filename including path that will be verified
+
+    data_tags : dict
+        a dictionary od data_type/hdf tag
+
+    limits : dict
+        a dictionary of limits values
+
+    quality_checks : dict
+        a dictinary specifying quality checks structure that will be applied to verify the data file
+
+    report_type : int
+        report type, currently supporting 'none', 'errors', and 'full'
+
+    report_dir : str
+        a directory where report files will be located
+
+    consumers : dict
+        a dictionary containing consumer processes to run, and their parameters
+
+    threaded : boolean
+        if True, the handler runs in a thread of this process instead of a new process
+
+    metrics_dir : str
+        optional, a directory where the calculated results are saved
+
+    poll_period : float
+        number of seconds between checks of the datasets extents
+
+    idle_timeout : float
+        number of seconds after which datasets that did not grow are considered complete
+
+    Returns
+    -------
+    bad_indexes : dict
+        a dictionary of bad indexes per data type
+
+    """
+    reader = freader.Hdf_fr()
+    fp = h5py.File(file, 'r', libver='latest', swmr=True, **reader.get_cache_settings())
+
+    # the number of frames is not known upfront, the results are aggregated for the report
+    args = [limits, quality_checks]
+    kwargs = {}
+    kwargs['consumers'] = consumers
+    kwargs['aggregate_limit'] = 0
+    dataq, aggregateq = start_handler(args, kwargs, threaded)
+
+    types = dict((data_tags[data_type], data_type) for data_type in ('data_dark', 'data_white', 'data')
+                 if data_type in data_tags)
+    progress = dict((data_type, 0) for data_type in types.values())
+    last_report = time.time()
+    for tag, start, block in reader.follow(fp, list(types.keys()), poll_period, idle_timeout):
+        data_type = types[tag]
+        for i in range(len(block)):
+            dataq.put(Data(const.DATA_STATUS_DATA, block[i], data_type, index=start + i))
+        progress[data_type] = start + len(block)
+        if time.time() - last_report >= const.FOLLOW_PROGRESS_PERIOD:
+            last_report = time.time()
+            logger.info('following ' + file + ', verified frames: ' + str(progress))
+    dataq.put(Data(const.DATA_STATUS_END))
+    fp.close()
 
     # receive the results
-    bad_indexes = {}
     aggregate = aggregateq.get()
+    save_metrics(file, aggregate, None, None, metrics_dir)
 
-    if report_file is not None:
-        report.report_results(logger, aggregate, None, report_file, report_type)
-    report.add_bad_indexes(aggregate, bad_indexes)
+    logger.info('data verifier evaluated ' + file + ' file, verified frames: ' + str(progress))
+    return report_aggregate(logger, file, const.FILE_TYPE_HDF, aggregate, report_type, report_dir)
 
-    logger.info('data verifier evaluated ' + file + ' file')
-    return bad_indexes
 
-
-def verify_file_ge(logger, file, limits, quality_checks, report_type, report_dir, consumers):
+def verify_file_ge(logger, file, limits, quality_checks, report_type, report_dir, consumers, threaded=False, cache=None,
+                   cache_key=None, metrics_dir=None):
     """
     This method handles verification of data in a ge file type.
     This method creates and starts a new handler process. The handler is initialized with data queue,
     the data type, which is 'data', and a result queue.
     After starting the process the function enqueues queue slice by slice into data, until all data is
-    queued. The last enqueued element is end of the data marker.
+    queued. The frames are memory mapped and read in batches; the data queue is bounded, so the reading
+    is paced by the handler. The last enqueued element is end of the data marker.
 
     Parameters
     ----------
@@ -298,6 +464,18 @@ def verify_file_ge(logger, file, limits, quality_checks, report_type, report_dir
     consumers : dict
         a dictionary containing consumer processes to run, and their parameters
 
+    threaded : boolean
+        if True, the handler runs in a thread of this process instead of a new process
+
+    cache : ResultCache
+        optional, a cache the calculated results are added to
+
+    cache_key : str
+        a key the results are cached with
+
+    metrics_dir : str
+        optional, a directory where the calculated results are saved
+
     Returns
     -------
     bad_indexes : dict
@@ -306,42 +484,366 @@ def verify_file_ge(logger, file, limits, quality_checks, report_type, report_dir
     """
     type = 'data'
 
-    fp, nframes, fsize = utils.get_data_ge(logger, file)
+    reader = freader.Ge_fr(logger)
+    frames = reader.get_frames(file)
     # data file is corrupted, error message is logged
-    if fp is None:
+    if frames is None:
         return None
 
-    dataq = Queue()
-    aggregateq = Queue()
+    args = [limits, quality_checks, frames.shape[0]]
+    kwargs = {}
+    kwargs['consumers'] = consumers
+    dataq, aggregateq = start_handler(args, kwargs, threaded)
+
+    # the batches are copied out of the memory map by the read-ahead threads
+    prefetcher = pipeline.Prefetcher(np.array)
+    for batch, frames_read in prefetcher.map(batch for start, batch in reader.get_batches(frames)):
+        for img in frames_read:
+            dataq.put(Data(const.DATA_STATUS_DATA, img, type))
+    dataq.put(Data(const.DATA_STATUS_END))
+    prefetcher.close()
+    prefetcher.log_stats(logger, file)
 
-    p = Process(target=handler.handle_data, args=(dataq, limits, aggregateq, quality_checks, consumers))
-    p.start()
+    # receive the results
+    aggregate = aggregateq.get()
+    save_metrics(file, aggregate, cache, cache_key, metrics_dir)
 
-    for i in range(0,nframes):
-        img = np.fromfile(fp,'uint16', fsize)
-        dataq.put(Data(const.DATA_STATUS_DATA, img, type))
-        time.sleep(.2)
+    logger.info('data verifier evaluated ' + file + ' file')
+    return report_aggregate(logger, file, const.FILE_TYPE_GE, aggregate, report_type, report_dir)
+
+
+def verify_file_ge_follow(logger, file, limits, quality_checks, report_type, report_dir, consumers, threaded=False,
+                          metrics_dir=None, poll_period=const.FOLLOW_POLL_PERIOD, idle_timeout=const.FOLLOW_IDLE_TIMEOUT):
+    """
+    This method handles verification of data in a ge file that is being written.
+
+    The frames are memory mapped and enqueued into the handler as they are completely written, so the quality problems
+    are reported during the acquisition. The progress is logged. The file is complete when the number of frames in the
+    header is reached, or when the file did not grow for the idle timeout.
+
+    Parameters
+    ----------
+    logger: Logger
+        Logger instance.
+
+    file : str
+        a filename including path that will be verified
+
+    limits : dict
+        a dictionary of limits values
+
+    quality_checks : dict
+        a dictinary specifying quality checks structure that will be applied to verify the data file
+
+    report_type : int
+        report type, currently supporting 'none', 'errors', and 'full'
+
+    report_dir : str
+        a directory where report files will be located
+
+    consumers : dict
+        a dictionary containing consumer processes to run, and their parameters
+
+    threaded : boolean
+        if True, the handler runs in a thread of this process instead of a new process
+
+    metrics_dir : str
+        optional, a directory where the calculated results are saved
+
+    poll_period : float
+        number of seconds between checks of the file size
+
+    idle_timeout : float
+        number of seconds after which a file that did not grow is considered closed
+
+    Returns
+    -------
+    bad_indexes : dict
+        a dictionary of bad indexes per data type
+
+    """
+    type = 'data'
+
+    reader = freader.Ge_fr(logger)
+
+    # the number of frames is not known upfront, the results are aggregated for the report
+    args = [limits, quality_checks]
+    kwargs = {}
+    kwargs['consumers'] = consumers
+    kwargs['aggregate_limit'] = 0
+    dataq, aggregateq = start_handler(args, kwargs, threaded)
+
+    progress = 0
+    last_report = time.time()
+    for start, batch in reader.follow(file, poll_period, idle_timeout):
+        for img in np.array(batch):
+            dataq.put(Data(const.DATA_STATUS_DATA, img, type))
+        progress = start + len(batch)
+        if time.time() - last_report >= const.FOLLOW_PROGRESS_PERIOD:
+            last_report = time.time()
+            logger.info('following ' + file + ', verified frames: ' + str(progress))
     dataq.put(Data(const.DATA_STATUS_END))
 
     # receive the results
-    bad_indexes = {}
     aggregate = aggregateq.get()
+    save_metrics(file, aggregate, None, None, metrics_dir)
+
+    logger.info('data verifier evaluated ' + file + ' file, verified frames: ' + str(progress))
+    return report_aggregate(logger, file, const.FILE_TYPE_GE, aggregate, report_type, report_dir)
+
+
+def verify_file_tif(logger, file, limits, quality_checks, report_type, report_dir, consumers, threaded=False, cache=None,
+                    cache_key=None, metrics_dir=None):
+    """
+    This method handles verification of data in a tiff file, including multi-page tiff stacks.
+
+    This method creates and starts a new handler process. The pages are read lazily in batches as memory mapped
+    views and enqueued frame by frame into the bounded data queue, so the stack is never loaded as a whole.
+    The last enqueued element is end of the data marker.
+
+    Parameters
+    ----------
+    logger: Logger
+        Logger instance.
+
+    file : str
+        a filename including path that will be verified
+
+    limits : dict
+        a dictionary of limits values
+
+    quality_checks : dict
+        a dictinary specifying quality checks structure that will be applied to verify the data file
+
+    report_type : int
+        report type, currently supporting 'none', 'errors', and 'full'
+
+    report_dir : str
+        a directory where report files will be located
+
+    consumers : dict
+        a dictionary containing consumer processes to run, and their parameters
+
+    threaded : boolean
+        if True, the handler runs in a thread of this process instead of a new process
+
+    cache : ResultCache
+        optional, a cache the calculated results are added to
+
+    cache_key : str
+        a key the results are cached with
+
+    metrics_dir : str
+        optional, a directory where the calculated results are saved
+
+    Returns
+    -------
+    bad_indexes : dict
+        a dictionary of bad indexes per data type
+
+    """
+    type = 'data'
+    reader = freader.Tif_stack_fr()
+
+    # the number of pages is not known upfront, the results are aggregated for the report
+    args = [limits, quality_checks]
+    kwargs = {}
+    kwargs['consumers'] = consumers
+    kwargs['aggregate_limit'] = 0
+    dataq, aggregateq = start_handler(args, kwargs, threaded)
+
+    # the pages are copied out of the memory map by the read-ahead threads
+    prefetcher = pipeline.Prefetcher(lambda batch: [np.array(img) for img in batch])
+    for batch, pages in prefetcher.map(reader.get_frames(file)):
+        for img in pages:
+            dataq.put(Data(const.DATA_STATUS_DATA, img, type))
+    dataq.put(Data(const.DATA_STATUS_END))
+    prefetcher.close()
+    prefetcher.log_stats(logger, file)
+
+    # receive the results
+    aggregate = aggregateq.get()
+    save_metrics(file, aggregate, cache, cache_key, metrics_dir)
+
+    logger.info('data verifier evaluated ' + file + ' file')
+    return report_aggregate(logger, file, const.FILE_TYPE_TIF, aggregate, report_type, report_dir)
+
+
+def save_metrics(file, aggregate, cache, cache_key, metrics_dir):
+    """
+    This function adds the calculated results delivered by the handler to the result cache and saves them in the
+    metrics directory, if configured.
+
+    The saved results can be evaluated against different limits without verifying the data again.
+
+    Parameters
+    ----------
+    file : str
+        a filename including path that was verified
+
+    aggregate : dict
+        results delivered by the handler
+
+    cache : ResultCache
+        a cache of calculated results, or None
+
+    cache_key : str
+        a key the results are cached with
+
+    metrics_dir : str
+        a directory where the calculated results are saved, or None
+
+    Returns
+    -------
+    none
+    """
+    if cache is None and metrics_dir is None:
+        return
+    metrics = result_cache.get_metrics(aggregate)
+    if cache is not None:
+        cache.put(cache_key, file, metrics)
+    if metrics_dir is not None:
+        result_cache.save_metrics(result_cache.get_metrics_file(file, metrics_dir), metrics, file)
+
+
+def report_aggregate(logger, file, file_type, aggregate, report_type, report_dir):
+    """
+    This function writes report of the results delivered by the handler and returns bad indexes.
+
+    Parameters
+    ----------
+    logger: Logger
+        Logger instance.
+
+    file : str
+        a filename including path that was verified
+
+    file_type : str
+        data file type; currently supporting FILE_TYPE_HDF, FILE_TYPE_GE, and FILE_TYPE_TIF
+
+    aggregate : dict
+        results delivered by the handler
+
+    report_type : int
+        report type, currently supporting 'none', 'errors', and 'full'
+
+    report_dir : str
+        a directory where report files will be located
+
+    Returns
+    -------
+    bad_indexes : dict
+        a dictionary of bad indexes per data type
+    """
+    bad_indexes = {}
     report.add_bad_indexes(aggregate, bad_indexes)
 
     if report_type != const.REPORT_NONE:
+        # the hdf report file replaces the file extension, and does not repeat the file name
+        if file_type == const.FILE_TYPE_HDF:
+            name = file.rsplit(".",)[0]
+            filename = None
+        else:
+            name = file
+            filename = file
         if report_dir is None:
-            report_file = file + '.report'
+            report_file = name + '.report'
         else:
-            file_path = file.rsplit("/",)
+            file_path = name.rsplit("/",)
             report_file = report_dir + "/" + file_path[len(file_path)-1]+ '.report'
 
-        report.report_results(logger, aggregate, file, report_file, report_type)
-
-    logger.info('data verifier evaluated ' + file + ' file')
+        report.report_results(logger, aggregate, filename, report_file, report_type)
 
     return bad_indexes
 
 
+def verify_file(logger, file, file_type, data_tags, limits, quality_checks, report_type, report_dir, consumers,
+                threaded=False, cache=None, metrics_dir=None, follow=False, idle_timeout=const.FOLLOW_IDLE_TIMEOUT):
+    """
+    This function verifies data in a given file with the verifier of the file type.
+
+    If a result cache is given, and it contains results of the file that did not change since verified with the same
+    quality checks, the cached results are evaluated against the limits, and the data is not read. If follow is True,
+    the hdf or ge file is verified while it is written, and the cache is not used.
+
+    Parameters
+    ----------
+    logger: Logger
+        Logger instance.
+
+    file : str
+        a filename including path that will be verified
+
+    file_type : str
+        data file type; currently supporting FILE_TYPE_HDF, FILE_TYPE_GE, and FILE_TYPE_TIF
+
+    data_tags : dict
+        a dictionary od data_type/hdf tag, used for hdf files
+
+    limits : dict
+        a dictionary of limits values
+
+    quality_checks : dict
+        a dictinary specifying quality checks structure that will be applied to verify the data file
+
+    report_type : int
+        report type, currently supporting 'none', 'errors', and 'full'
+
+    report_dir : str
+        a directory where report files will be located
+
+    consumers : dict
+        a dictionary containing consumer processes to run, and their parameters
+
+    threaded : boolean
+        if True, the handler runs in a thread of this process instead of a new process
+
+    cache : ResultCache
+        optional, a cache of calculated results
+
+    metrics_dir : str
+        optional, a directory where the calculated results are saved
+
+    follow : boolean
+        if True, the file is verified while it is written
+
+    idle_timeout : float
+        number of seconds after which a followed file that did not grow is considered complete
+
+    Returns
+    -------
+    bad_indexes : dict
+        a dictionary of bad indexes per data type
+    """
+    if follow and file_type == const.FILE_TYPE_HDF:
+        return verify_file_hdf_follow(logger, file, data_tags, limits, quality_checks, report_type, report_dir,
+                                      consumers, threaded, metrics_dir, idle_timeout=idle_timeout)
+    elif follow and file_type == const.FILE_TYPE_GE:
+        return verify_file_ge_follow(logger, file, limits, quality_checks, report_type, report_dir, consumers, threaded,
+                                     metrics_dir, idle_timeout=idle_timeout)
+
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.get_key(file, result_cache.get_config_key(quality_checks, limits, file_type, data_tags))
+        metrics = cache.get(cache_key)
+        if metrics is not None:
+            if metrics_dir is not None:
+                result_cache.save_metrics(result_cache.get_metrics_file(file, metrics_dir), metrics, file)
+            aggregate = result_cache.get_aggregate(metrics, limits, quality_checks)
+            logger.info('data verifier evaluated cached results of ' + file + ' file')
+            return report_aggregate(logger, file, file_type, aggregate, report_type, report_dir)
+
+    if file_type == const.FILE_TYPE_HDF:
+        return verify_file_hdf(logger, file, data_tags, limits, quality_checks, report_type, report_dir, consumers,
+                               threaded, cache, cache_key, metrics_dir)
+    elif file_type == const.FILE_TYPE_GE:
+        return verify_file_ge(logger, file, limits, quality_checks, report_type, report_dir, consumers, threaded,
+                              cache, cache_key, metrics_dir)
+    elif file_type == const.FILE_TYPE_TIF:
+        return verify_file_tif(logger, file, limits, quality_checks, report_type, report_dir, consumers, threaded,
+                               cache, cache_key, metrics_dir)
+
+
 def verify(conf, file):
     """
     This function verifies data in a given file.
@@ -371,14 +873,16 @@ def verify(conf, file):
         (i.e. data_dark, data_white,data)
     """
 
-    logger, data_tags, limits, quality_checks, file_type, report_type, report_dir, consumers  = init(conf)
+    logger, data_tags, limits, quality_checks, file_type, report_type, report_dir, consumers, cache, metrics_dir = \
+        init(conf)
     if not os.path.isfile(file):
         logger.error(
             'parameter error: file ' +
             file + ' does not exist')
         sys.exit(-1)
 
-    if file_type == const.FILE_TYPE_HDF:
-        return verify_file_hdf(logger, file, data_tags, limits, quality_checks, report_type, report_dir, consumers)
-    elif file_type == const.FILE_TYPE_GE:
-        return verify_file_ge(logger, file, limits, quality_checks, report_type, report_dir, consumers)
+    bad_indexes = verify_file(logger, file, file_type, data_tags, limits, quality_checks, report_type, report_dir,
+                              consumers, cache=cache, metrics_dir=metrics_dir)
+    if cache is not None:
+        cache.close()
+    return bad_indexes
@@ -44,14 +44,19 @@
 # LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
 # POSSIBILITY OF SUCH DAMAGE.                                             #
-# #########################################################################
 
 """
 Please make sure the installation :ref:`pre-requisite-reference-label` are met.
 
 This module feeds the data coming from detector to a process using queue.
+
+A single Feed can monitor several pvaccess NTNDArray channels. Each channel has its own limits, quality checks and
+aggregate, while the worker threads evaluating the frames and the ZeroMQ connection are shared by all channels.
 """
 
+import threading
+from collections import deque
+from multiprocessing.pool import ThreadPool
 import dquality.common.qualitychecks as ver
 import dquality.clients.fb_client.simple_feedback as fb
 import dquality.clients.zmq_client as zmq_client
@@ -63,90 +68,277 @@ import pvaccess
 __author__ = "Barbara Frosik"
 __copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
-__all__ = ['start_feed',
-           'stop_feed'
-           'on_change']
+__all__ = ['Channel',
+           'Feed']
 
 
-class Feed:
+class Channel:
     """
-    This class reads frames in a real time, and delivers to consumers.
+    This class holds the verification state of one monitored pvaccess channel.
+
+    The frames received on the channel are appended to the pending deque by the pvaccess callback and evaluated by
+    the shared workers. The lock serializes the evaluation, so the frames of one channel are checked in the order
+    they arrived, which keeps order dependent checks, such as diff_sat, correct.
     """
 
-    def __init__(self, logger, limits, quality_checks, feedback, zmq_snd_port, pva_name, detector):
+    def __init__(self, pva_name, limits, quality_checks, feedback_obj=None, data_type='data'):
         """
         Constructor
+
+        Parameters
+        ----------
+        pva_name : str
+            pvaccess channel name
+
+        limits : dict
+            a dictionary of limits keyed by data type
+
+        quality_checks : dict
+            a dictionary of quality checks lists keyed by data type
+
+        feedback_obj : Feedback
+            optional, a Feedback instance delivering results of this channel
+
+        data_type : str
+            data type of the frames received on this channel
         """
-        # for communication with pvaccess - receiving data
-        self.data_type = 'data'
         self.pva_name = pva_name
-        self.logger = logger
+        self.data_type = data_type
         self.limits = limits
-        self.qc = quality_checks
+        self.quality_checks = quality_checks
+        self.feedback_obj = feedback_obj
+        self.aggregate = containers.Aggregate(data_type, quality_checks[data_type])
+        self.pending = deque()
+        self.lock = threading.Lock()
+        self.last_frame = None
+        self.chan = None
+        self.dims = None
+
+
+class Feed:
+    """
+    This class reads frames in a real time from one or more pvaccess channels, verifies them, and delivers to
+    consumers.
+    """
+
+    def __init__(self, logger, channels, feedback, zmq_snd_port, detector, no_workers=2,
+                 update_period=const.FEEDBACK_UPDATE_PERIOD, summary_period=const.FEEDBACK_SUMMARY_PERIOD):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        logger : Logger
+            logger instance
+
+        channels : dict
+            a dictionary keyed by pvaccess channel name, the values are dictionaries with the channel 'limits' and
+            'quality_checks'
+
+        feedback : list
+            a list of configured feedback types
+
+        zmq_snd_port : int
+            a port used to send the verified data out, shared by all channels
+
+        detector : str
+            detector name
+
+        no_workers : int
+            number of threads evaluating the frames, shared by all channels
+
+        update_period : float
+            minimum number of seconds between updates of the feedback pvs
+
+        summary_period : float
+            number of seconds the failures are summarized over in the console and log feedback
+        """
+        self.logger = logger
         self.feedback = feedback
         self.zmq_snd_port = zmq_snd_port
         self.detector = detector
-        if not self.feedback is None:
-            self.feedback_obj = fb.Feedback(self.feedback, self.detector, self.quality_checks, self.logger)
-        if not self.zmq_snd_port is None:
+        self.cons = None
+        if self.zmq_snd_port is not None:
             self.cons = zmq_client.zmq_sen(self.zmq_snd_port)
-        self.aggregate = containers.Aggregate(self.data_type, self.quality_checks)
+        # zmq sockets are not thread safe, all channels send through this lock
+        self.cons_lock = threading.Lock()
 
-        self.chan = None
+        self.channels = {}
+        for pva_name in channels:
+            limits = channels[pva_name]['limits']
+            quality_checks = channels[pva_name]['quality_checks']
+            feedback_obj = None
+            if self.feedback is not None:
+                feedback_obj = fb.Feedback(self.feedback, self.detector, quality_checks, self.logger, update_period,
+                                           summary_period)
+            self.channels[pva_name] = Channel(pva_name, limits, quality_checks, feedback_obj)
+
+        self.pool = ThreadPool(int(no_workers))
+
+    def send_to_consumers(self, data):
+        """
+        This function sends data to the shared ZeroMQ connection, if one is configured.
+
+        Parameters
+        ----------
+        data : Data
+            a Data instance
+
+        Returns
+        -------
+        none
+        """
+        if self.cons is not None:
+            with self.cons_lock:
+                self.cons.send_to_zmq(data)
 
     def feed_data(self):
-        self.chan = pvaccess.Channel(self.pva_name)
+        """
+        This function connects to all configured channels, sends the frame dimensions to the consumer, and starts
+        monitoring the channels.
+
+        Parameters
+        ----------
+        none
+
+        Returns
+        -------
+        none
+        """
+        for pva_name in self.channels:
+            channel = self.channels[pva_name]
+            channel.chan = pvaccess.Channel(pva_name)
+
+            field = channel.chan.get('field()')
+            x, y = field['dimension']
+            channel.dims = (y['size'], x['size'])
+            #send the dimensions to client
+            data = containers.Data(const.DATA_STATUS_DIM)
+            data.dim_x = x
+            data.dim_y = y
+            data.channel = pva_name
+            self.send_to_consumers(data)
+
+            labels = [item['name'] for item in field['attribute']]
+            channel.theta_key = labels.index("SampleRotary")
+            channel.scan_delta_key = labels.index("ScanDelta")
+            channel.start_position_key = labels.index("StartPos")
+
+            channel.chan.subscribe('update', self.get_callback(channel))
+            channel.chan.startMonitor("value,attribute,uniqueId")
+
+    def get_callback(self, channel):
+        """
+        This function returns callback function bound to the given channel.
 
-        x, y = self.chan.get('field()')['dimension']
-        self.dims = (y['size'], x['size'])
-        print(self.dims)
-        #send the dimensions to client
-        data = containers.Data(const.DATA_STATUS_DIM)
-        data.dim_x = x
-        data.dim_y = y
-        self.cons.send_to_zmq(data)
+        Parameters
+        ----------
+        channel : Channel
+            a Channel instance
 
-        labels = [item['name'] for item in self.chan.get('field()')['attribute']]
-        self.theta_key = labels.index("SampleRotary")
-        self.scan_delta_key = labels.index("ScanDelta")
-        self.start_position_key = labels.index("StartPos")
+        Returns
+        -------
+        function
+            a callback function that takes the pvaccess update
+        """
+        def on_change(v):
+            self.on_change(channel, v)
+        return on_change
+
+    def on_change(self, channel, v):
+        """
+        This function is called by pvaccess on frame update.
+
+        It unpacks the frame from the update, appends it to the channel pending frames, and schedules evaluation on
+        the shared workers, so the pvaccess thread is not blocked by the quality checks.
 
-        self.chan.subscribe('update', self.on_change)
-        self.chan.startMonitor("value,attribute,uniqueId")
+        Parameters
+        ----------
+        channel : Channel
+            a Channel instance the update was received on
 
+        v : PvObject
+            the pvaccess update
 
-    def on_change(self, v):
+        Returns
+        -------
+        none
+        """
         uniqueId = v['uniqueId']
-        print('uniqueId: ', uniqueId)
 
         img = v['value'][0]['ushortValue']
-        scan_delta = v["attribute"][self.scan_delta_key]["value"][0]["value"]
-        start_position = v["attribute"][self.start_position_key]["value"][0]["value"]
+        scan_delta = v["attribute"][channel.scan_delta_key]["value"][0]["value"]
+        start_position = v["attribute"][channel.start_position_key]["value"][0]["value"]
         theta = (start_position + uniqueId * scan_delta) % 360.0
 
-        img = img.reshape(self.dims)
+        img = img.reshape(channel.dims)
+
+        data = containers.Data(const.DATA_STATUS_DATA, img, channel.data_type)
+        data.theta = theta
+        data.image_number = uniqueId
+        data.channel = channel.pva_name
+        channel.pending.append(data)
+        self.pool.apply_async(self.process_frames, (channel,))
 
-        data = containers.Data(const.DATA_STATUS_DATA, img, self.data_type)
-        frame_results = ver.run_quality_checks(data, uniqueId, self.aggregate, self.limits, self.quality_checks)
+    def process_frames(self, channel):
+        """
+        This function evaluates pending frames of the given channel in the order they were received.
 
-        if not self.feedback is None:
-            self.feedback_obj.deliver(frame_results)
+        Parameters
+        ----------
+        channel : Channel
+            a Channel instance
 
-        if not self.zmq_snd_port is None:
-            data.theta = theta
-            data.image_number = uniqueId
-            data.ver = not frame_results.failed
-            self.cons.send_to_zmq(data)
+        Returns
+        -------
+        none
+        """
+        with channel.lock:
+            while True:
+                try:
+                    data = channel.pending.popleft()
+                except IndexError:
+                    break
+                type = channel.data_type
+                frame_results = ver.run_quality_checks(data, data.image_number, channel.limits[type],
+                                                       channel.quality_checks[type], aggregate=channel.aggregate,
+                                                       last_frame=channel.last_frame)
+                channel.last_frame = data.slice
 
+                if channel.feedback_obj is not None:
+                    channel.feedback_obj.deliver(frame_results)
+
+                data.ver = not frame_results.failed
+                self.send_to_consumers(data)
 
     def stop_feed(self):
+        """
+        This function stops monitoring all channels, waits for the pending frames to be evaluated, and terminates the
+        consumer connection.
+
+        Parameters
+        ----------
+        none
+
+        Returns
+        -------
+        none
+        """
         # stop getting data
-        self.chan.stopMonitor()
-        self.chan.unsubscribe('update')
+        for pva_name in self.channels:
+            chan = self.channels[pva_name].chan
+            if chan is not None:
+                chan.stopMonitor()
+                chan.unsubscribe('update')
+
+        self.pool.close()
+        self.pool.join()
 
-        # nothing to do to terminate updating of feedback pvs (maybe zero them?)
+        # the failures summaries are reported, and the coalesced feedback pvs are updated with the final values
+        for pva_name in self.channels:
+            if self.channels[pva_name].feedback_obj is not None:
+                self.channels[pva_name].feedback_obj.flush()
 
         # terminate zmq connection
         data = containers.Data(const.DATA_STATUS_END)
-        self.cons.send_to_zmq(data)
-
+        self.send_to_consumers(data)
@@ -61,273 +61,31 @@ The results will be sent to an EPICS PV (printed on screen for now).
 import os
 import sys
 import argparse
-from multiprocessing import Queue
+from multiprocessing import Queue, Pool
 import json
 import dquality.common.utilities as utils
 import dquality.common.constants as const
 import dquality.common.containers as containers
 import dquality.common.qualitychecks as ver
-from threading import Timer
 import dquality.readers.file_reader as freader
-import stat
+import dquality.common.pipeline as pipeline
+from dquality.common.file_seek import FileSeek
+from dquality.common.journal import Journal
 
 
 __author__ = "Barbara Frosik"
 __copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
 __all__ = ['init',
+           'init_worker',
+           'get_frames',
+           'verify_file',
            'verify']
 
 INTERRUPT = 'interrupt'
 
-
-class FileSeek():
-    """
-    This class provides file discovery functionality.
-
-    An instance is initialized with parameters.
-    On the start the FileSeek checks for existing files. After that it periodically checks
-    for new files in monitored directory and subdirectories. Upon finding a new or updated file it
-    velidates the file and enqueues into the queue on success.
-    """
-
-    def __init__(self, q, polling_period, logger, file_type):
-        """
-        constructor
-
-        Parameters
-        ----------
-        q : Queue
-            a queue used to pass discovered files
-
-        polling_period : int
-            number of second defining polling period
-
-        logger : Logger
-            logger instance
-
-        file_type : int
-            a constant defining type of data file. Supporting FILE_TYPE_GE and FILE_TYPE_HDF
-        """
-        self.q = q
-        self.polling_period = polling_period
-        self.processed_files = None
-        self.logger = logger
-        self.file_type = file_type
-        self.done = False
-
-    def get_files(self, folder, ext, discovered_files=None):
-        """
-        Finds files in a given directory and subdirectories.
-
-        Parameters
-        ----------
-        folder : str
-            a folder name that will be checked for files
-
-        ext : list
-            list of file extensions that will be discovered
-
-        discovered_files : dict
-            a dictionary to add the discovered files to
-
-        Returns
-        -------
-        dict
-            a dictionary with keys as files in a monitored folder and subdirectories
-        """
-
-        current_files = discovered_files
-        if current_files is None:
-            current_files = {}
-        if os.path.isdir(folder):
-            files = os.listdir(folder)
-            for f in files:
-                full_path = os.path.join(folder, f)
-                if os.path.isfile(full_path):
-                    match = False
-                    for fext in ext:
-                        if f.endswith(fext):
-                            match = True
-                    if match:
-                        statResult = os.stat(full_path)
-                        file_info = {}
-                        file_info['fileSize'] = statResult[stat.ST_SIZE]
-                        file_info['fileModificationTime'] = statResult[stat.ST_MTIME]
-                        current_files[full_path] = file_info
-                elif os.path.isdir(full_path):
-                    current_files = self.get_files(full_path, ext, current_files)
-        return current_files
-
-    def notify(self, file_name):
-        """
-        This method performs action to notify stakeholders about a discovered file.
-
-        Currently the notification is done by using queue.
-        This method validates the file first. If file validated successfully, the full file name is enqueued.
-        The file might not validate if has been discovered before it is complete. In such situation, the file will
-        be discovered again when updated.
-
-        Parameters
-        ----------
-        file_name : str
-            a full name of a file
-
-        Returns
-        -------
-        none
-        """
-
-        if self.file_type == const.FILE_TYPE_GE:
-            validator = FileValidatorGe()
-            if validator.is_valid(file_name):
-                self.q.put(file_name)
-        else:
-            # the velidator is not implemented, so for now pass all discovered files
-            self.q.put(file_name)
-
-    def process_files(self, previous_files, current_files):
-        """
-        This method compares new latest discovered files with previously found files. The new files are reported
-        through notify to the stakeholders.
-
-        Parameters
-        ----------
-        previous_files : dict
-            a dictionary of previously found files
-
-        current_files : dict
-            a dictionary of currently found files
-
-        Returns
-        -------
-        none
-        """
-
-        for file_name in current_files.keys():
-            if not file_name in previous_files:
-                # new file, must be updated
-                self.notify(file_name)
-            else:
-                # old file, check timestamp
-                prev_file_info = previous_files.get(file_name)
-                prev_modification_time = prev_file_info.get('fileModificationTime', '')
-                file_info = current_files.get(file_name)
-                modification_time = file_info.get('fileModificationTime')
-                if modification_time != prev_modification_time:
-                    # file has been modified, need to process it
-                    self.notify(file_name)
-
-
-    def poll_file_system(self, folder, ext):
-        """
-        This method initiates for polling the file information off of the file system.
-
-        Parameters
-        ----------
-        folder : str
-            a folder name that will be checked for files
-
-        ext : list
-            list of file extensions that will be discovered
-
-        discovered_files : dict
-            a dictionary to add the discovered files to
-
-        Returns
-        -------
-        none
-        """
-
-        try:
-            current_files = self.get_files(folder, ext)
-            self.process_files(self.processed_files, current_files)
-            self.processed_files = current_files
-        except:
-            self.logger.error('Could not poll directory %s' % (folder))
-        self.start_observing(folder, ext)
-
-    def start_observing(self, folder, ext):
-        """
-        This method startss for polling the file information off of the file system.
-
-        Parameters
-        ----------
-        folder : str
-            a folder name that will be checked for files
-
-        ext : list
-            list of file extensions that will be discovered
-
-        discovered_files : dict
-            a dictionary to add the discovered files to
-
-        Returns
-        -------
-        none
-        """
-
-        if self.processed_files is None:
-            self.processed_files = self.get_files(folder, ext)
-        if self.done:
-            return
-
-        t = Timer(self.polling_period, self.poll_file_system, [folder, ext])
-        self.t = t
-        t.start()
-
-    def stop_observing(self):
-        """
-        This method stops the polling the file information off of the file system.
-
-        Parameters
-        ----------
-        none
-
-        Returns
-        -------
-        none
-        """
-
-        self.t.cancel()
-        self.done = True
-
-
-class FileValidatorGe():
-    """
-    This class is an interface to the concrete file verification functionality.
-    """
-    def is_valid(self, file):
-        """
-        This method checks if the ge file is compatible with the standards.
-
-        Parameters
-        ----------
-        file : str
-            file name
-
-        Returns
-        -------
-        True if validated, False otherwise
-        """
-
-        import struct as st
-
-        fp = open(file, 'rb')
-        offset = 8192
-
-        fp.seek(18)
-        size, nframes = st.unpack('<ih',fp.read(6))
-        if size != 2048:
-            return False
-
-        fsize = os.stat(str(fp).split("'")[1]).st_size
-        nframes_calc = (fsize - offset)/(2*size**2)
-
-        if nframes != nframes_calc:
-            return False
-
-        return True
+# verification parameters and readers of a worker process
+worker = {}
 
 
 def init(config):
@@ -371,6 +129,12 @@ def init(config):
     consumers : dict
         a dictionary containing consumer processes to run, and their parameters
 
+    no_workers : int
+        number of worker processes verifying files concurrently
+
+    journal_file : str
+        a name of the journal file recording verified files, None if not configured
+
     """
     conf = utils.get_config(config)
     if conf is None:
@@ -431,7 +195,117 @@ def init(config):
         feedback = conf['feedback_type']
     except KeyError:
         feedback = []
-    return logger, data_tags, limits, quality_checks, extensions, file_type, report_type, report_dir, feedback
+
+    try:
+        no_workers = int(conf['no_workers'])
+    except KeyError:
+        no_workers = 2
+
+    try:
+        journal_file = conf['journal_file']
+    except KeyError:
+        journal_file = None
+    return logger, data_tags, limits, quality_checks, extensions, file_type, report_type, report_dir, feedback, \
+        no_workers, journal_file
+
+
+def init_worker(file_type, limits, quality_checks):
+    """
+    This function initializes a worker process with the verification parameters.
+
+    Parameters
+    ----------
+    file_type : int
+        data file type; currently supporting FILE_TYPE_TIF and FILE_TYPE_GE
+
+    limits : dictionary
+        a dictionary containing limit values
+
+    quality_checks : dict
+        a dictionary containing quality check functions ids
+
+    Returns
+    -------
+    none
+    """
+    worker['args'] = (file_type, limits, quality_checks)
+    if file_type == const.FILE_TYPE_TIF:
+        worker['readers'] = (freader.Tif_fr(), freader.Tif_stack_fr())
+    else:
+        worker['readers'] = (freader.Ge_fr(),)
+
+
+def get_frames(file):
+    """
+    This generator returns frames of the file in a worker process.
+
+    A multi-page tiff stack is read lazily page by page.
+
+    Parameters
+    ----------
+    file : str
+        a full name of a file
+
+    Returns
+    -------
+    frame : numpy.ndarray
+        a frame
+    """
+    file_type = worker['args'][0]
+    if file_type == const.FILE_TYPE_TIF:
+        file_reader, stack_reader = worker['readers']
+        if stack_reader.is_stack(file):
+            for batch in stack_reader.get_frames(file):
+                for frame in batch:
+                    yield frame
+        else:
+            frame = file_reader.get_frame(file)
+            if frame is not None:
+                yield frame
+    else:
+        frames = worker['readers'][0].get_frames(file)
+        if frames is not None:
+            for frame in frames:
+                yield frame
+
+
+def verify_file(item):
+    """
+    This function verifies frames of a file in a worker process.
+
+    The checks comparing a frame with the preceding frame (diff_sat) use the last frame of the preceding file for the
+    first frame, so the result does not depend on which worker verified the preceding file.
+
+    Parameters
+    ----------
+    item : tuple
+        a full name of the file, and a full name of the preceding file or None
+
+    Returns
+    -------
+    failed, no_frames : tuple
+        True if any frame failed the checks, and number of frames in the file
+    """
+    file, previous = item
+    file_type, limits, quality_checks = worker['args']
+    last_frame = None
+    if previous is not None and 'diff_sat' in quality_checks['data']:
+        for last_frame in get_frames(previous):
+            pass
+
+    # a file without frames could not be read
+    failed = True
+    index = 0
+    for frame in get_frames(file):
+        if index == 0:
+            failed = False
+        data = containers.Data(const.DATA_STATUS_DATA, frame, 'data')
+        frame_results = ver.run_quality_checks(data, index, limits[data.type], quality_checks[data.type],
+                                               last_frame=last_frame)
+        last_frame = frame
+        index += 1
+        failed = failed or frame_results.failed
+    return failed, index
 
 
 def verify(conf, folder, num_files):
@@ -446,7 +320,10 @@ def verify(conf, folder, num_files):
 
     The function sets up the monitoring and starts
     a loop that reads the "*files*" queue. If there is any new file,
-    the file is dequeued and validated with data.verify function.
+    the file is dequeued, read ahead, and its frames are validated in a
+    pool of 'no_workers' worker processes. The files are verified
+    concurrently, and the results are reported in order the files were
+    discovered.
 
     The loop is interrupted when all expected files produced results.
 
@@ -468,56 +345,83 @@ def verify(conf, folder, num_files):
     bad_indexes : Dict
         A dictionary containing indexes of slices that did not pass quality check. The key is a file.
     """
-    logger, data_tags, limits, quality_checks, extensions, file_type, report_type, report_dir, feedback = init(conf)
+    logger, data_tags, limits, quality_checks, extensions, file_type, report_type, report_dir, feedback, no_workers, \
+        journal_file = init(conf)
     if not os.path.isdir(folder):
         print ('parameter error: directory ' + folder + ' does not exist')
         sys.exit(0)
     filesq = Queue()
 
-    # create notifier that will poll file system every 1 second for new files
-    notifier = FileSeek(filesq, 1, logger, file_type)
-    notifier.start_observing(folder, extensions)
+    # the worker processes are started before any thread, and are reused for all files
+    pool = Pool(no_workers, init_worker, (file_type, limits, quality_checks))
 
     file_count = 0
     interrupted = False
-    if file_type == const.FILE_TYPE_TIF:
-        file_reader = freader.Tif_fr()
-        last_frame = None
+    previous = None
+    if journal_file is None:
+        journal = None
+    else:
+        # resuming, the files verified before are counted, and the last one precedes the new files
+        journal = Journal(journal_file)
+        for previous in journal.get_processed(folder):
+            file_count += 1
+
+    # create notifier that will poll file system every 1 second for new files
+    notifier = FileSeek(filesq, 1, logger, file_type, journal=journal)
+    notifier.start_observing(folder, extensions)
+
+    # the files are read into the page cache ahead of the verification
+    prefetcher = pipeline.Prefetcher(pipeline.readahead)
+    # the files are verified concurrently, the results are returned in order of discovery
+    workers = pipeline.Prefetcher(verify_file, depth=2 * no_workers, pool=pool)
 
-    while not interrupted:
-        # checking the newFiles queue for new entries and starting verification
-        # processes for each new file
-        while not filesq.empty():
+    while True:
+        # checking the newFiles queue for new entries and submitting them to be read ahead
+        while not interrupted and not filesq.empty():
             file = filesq.get()
             if file.find('INTERRUPT') >= 0:
                 # the calling function may use a 'interrupt' command to stop the monitoring
-                # and processing.
+                # and processing. The files discovered before are processed.
                 interrupted = True
                 notifier.stop_observing()
-                break
             else:
-                frame = file_reader.get_frame(file)
-                data = containers.Data(const.DATA_STATUS_DATA, frame, 'data')
-                if file_type == const.FILE_TYPE_TIF:
-                    frame_results = ver.run_quality_checks(data, file_count, limits[data.type], quality_checks[data.type], last_frame=last_frame)
-                    last_frame = frame
-                else: # generic use
-                    frame_results = ver.run_quality_checks(data, limits, quality_checks)
-                file_count += 1
-
-                if frame_results.failed:
-                    s_result = 'failed'
-                else:
-                    s_result = 'passed'
-
-                if 'console' in feedback:
-                    print ('evaluated file ' + file + ' with result ' + s_result)
-                if 'log' in feedback:
-                    logger.info('evaluated file ' + file + ' with result ' + s_result)
+                prefetcher.put(file)
+
+        # the files read ahead are passed to the workers with the preceding file, so the frames can be compared
+        # with the last frame of the preceding file
+        while len(prefetcher) > 0 and (interrupted or prefetcher.ready()):
+            file, size = prefetcher.get()
+            workers.put((file, previous))
+            previous = file
+
+        while workers.ready(0.01) and not (int(num_files) != -1 and file_count >= int(num_files)):
+            (file, previous_file), (failed, no_frames) = workers.get()
+            file_count += 1
+
+            if failed:
+                s_result = 'failed'
+            else:
+                s_result = 'passed'
+
+            if 'console' in feedback:
+                print ('evaluated file ' + file + ' with result ' + s_result)
+            if 'log' in feedback:
+                logger.info('evaluated file ' + file + ' with result ' + s_result)
+            if journal is not None:
+                journal.record(file, s_result)
 
         if int(num_files) != -1 and file_count >= int(num_files):
-            interrupted = True
             notifier.stop_observing()
+            break
+        if interrupted and len(prefetcher) == 0 and len(workers) == 0:
+            break
+
+    prefetcher.close()
+    prefetcher.log_stats(logger, folder)
+    workers.close()
+    pool.terminate()
+    if journal is not None:
+        journal.close()
 
 
 def main(arg):
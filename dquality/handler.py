@@ -185,17 +185,24 @@ def handle_data(dataq, reportq, args, kwargs):
     """
     try:
         consumers = kwargs['consumers']
-        consumer_zmq = init_consumers(consumers)
+        if consumers is None:
+            consumer_zmq = None
+        else:
+            consumer_zmq = init_consumers(consumers)
     except KeyError:
         consumer_zmq = None
 
     limits = args[0]
     quality_checks = args[1]
+    if len(args) > 2 and 'aggregate_limit' not in kwargs:
+        # the number of frames is known, the results are aggregated for the report
+        kwargs['aggregate_limit'] = args[2]
     aggregates = {}
     types = quality_checks.keys()
     for type in types:
         aggregates[type] = Aggregate(type, quality_checks[type], **kwargs)
 
+    last_frames = {}
     interrupted = False
     index = 0
     while not interrupted:
@@ -216,8 +223,18 @@ def handle_data(dataq, reportq, args, kwargs):
 
             elif data.status == const.DATA_STATUS_DATA:
                 type = data.type
-                results = calc.run_quality_checks(data, index, aggregates[type], limits[type], quality_checks[type])
-                send_to_consumers(consumer_zmq, data, results)
+                # the frames of a file that is being written carry index in the data set
+                frame_index = getattr(data, 'index', index)
+                if hasattr(data, 'metrics'):
+                    # the results were calculated before, i.e. cached, and are only evaluated against the limits
+                    results = calc.evaluate_quality_checks(data.metrics, type, frame_index, limits[type],
+                                                           quality_checks[type])
+                else:
+                    results = calc.run_quality_checks(data, frame_index, limits[type], quality_checks[type],
+                                                      aggregate=aggregates[type], last_frame=last_frames.get(type))
+                if data.slice is not None:
+                    last_frames[type] = data.slice
+                    send_to_consumers(consumer_zmq, data, results)
                 try:
                     results.file_name = data.file_name
                 except:
@@ -59,7 +59,14 @@ not configured, it is assumed no file structure verification is requested.
 import sys
 import h5py
 import json
+import glob
+import pprint
+import fnmatch
+import logging
+import logging.handlers
 import os.path
+from collections import OrderedDict
+from multiprocessing import Pool, cpu_count
 
 import dquality.common.utilities as utils
 
@@ -69,9 +76,13 @@ __docformat__ = 'restructuredtext en'
 __all__ = ['init',
            'report_items',
            'verify',
+           'verify_files',
            'tags',
            'structure']
 
+# verification parameters of a worker process, set when the process starts
+worker = {}
+
 
 def init(config):
     """
@@ -91,6 +102,12 @@ def init(config):
     tags : dictionary
         a dictionary containing tag and attributes values read from the configured 'schema' file
 
+    type : str
+        verification type, 'hdf_structure' or 'hdf_tags'
+
+    no_workers : int
+        number of worker processes verifying files concurrently
+
     """
     conf = utils.get_config(config)
     if conf is None:
@@ -116,7 +133,12 @@ def init(config):
         logger.error('configured verification type ' + type + ' is not supported')
         sys.exit(-1)
 
-    return logger, tags, type
+    try:
+        no_workers = int(conf['no_workers'])
+    except KeyError:
+        no_workers = cpu_count()
+
+    return logger, tags, type, no_workers
 
 
 def report_items(list, text1, text2, logger):
@@ -151,12 +173,73 @@ def report_items(list, text1, text2, logger):
             logger.warning('    - ' + item)
 
 
+def is_wildcard(tag):
+    """
+    This function returns True if the tag is a pattern matching many tags, i.e. contains '*', '?' or '['.
+
+    Parameters
+    ----------
+    tag : str
+        an hdf tag
+
+    Returns
+    -------
+    boolean
+    """
+    return any(c in tag for c in '*?[')
+
+
+def find_datasets(file_h5, tags):
+    """
+    This function finds datasets of the given tags in an open hdf file.
+
+    The tags are looked up directly by the hdf path. The file is traversed only if some of the tags are wildcard
+    patterns, and then only once, for all the patterns.
+
+    Parameters
+    ----------
+    file_h5 : h5py.File
+        an open hdf file
+
+    tags : list
+        a list of hdf tags or patterns
+
+    Returns
+    -------
+    datasets : dict
+        a dictionary of lists of datasets keyed by tag; the list is empty if no dataset was found
+    """
+    datasets = {}
+    patterns = []
+    for tag in tags:
+        if is_wildcard(tag):
+            patterns.append(tag)
+            datasets[tag] = []
+        else:
+            dset = file_h5.get(tag)
+            if isinstance(dset, h5py.Dataset):
+                datasets[tag] = [dset]
+            else:
+                datasets[tag] = []
+
+    def func(name, dset):
+        if isinstance(dset, h5py.Dataset):
+            for pattern in patterns:
+                if fnmatch.fnmatchcase(dset.name, pattern):
+                    datasets[pattern].append(dset)
+
+    if len(patterns) > 0:
+        file_h5.visititems(func)
+    return datasets
+
+
 def structure(file, required_tags, logger):
     """
     This method is used when a file of hdf type is given.
     All tags and array dimensions are verified against a schema.
     (see :download:`schemas/tags.json <../../../config/default/schemas/tags.json>` 
-    example file).
+    example file). The tags are looked up directly; a tag can be a wildcard pattern
+    (i.e. "/exchange/data_*"), then all matching datasets are verified.
 
     Parameters
     ----------
@@ -171,7 +254,8 @@ def structure(file, required_tags, logger):
 
     Returns
     -------
-    None
+    True if verified
+    False if not verified
 
     """
     class Result():
@@ -197,55 +281,57 @@ def structure(file, required_tags, logger):
                   str(dset.shape) + ' but should be ' + str(required_dim))
             res.res = False
 
-    def func(name, dset):
-        if isinstance(dset, h5py.Dataset):
-            tag = dset.name
-            tag_attribs = required_tags.get(tag)
-            if tag_attribs is not None:
-                tag_list.remove(tag)
-                attrib_list = utils.key_list(tag_attribs)
-                for key in tag_attribs:
-                    if len(attrib_list) > 0:
-                        if key == 'dim':
-                            attrib_list.remove(key)
-                            check_dim(dset, tag_attribs)
-                        else:
-                            attr = dset.attrs.get(key)
-                            if attr is not None:
-                                attr_str = attr.decode('utf-8')
-                                if attr_str != tag_attribs.get(key):
-                                    logger.warning('incorrect attribute in ' +
-                                          tag + ': is ' +
-                                          key + ':' +
-                                          attr_str + ' but should be ' +
-                                          key + ':' +
-                                          tag_attribs.get(key))
-                                    res.res = False
-                                attrib_list.remove(key)
-                report_items(
-                    attrib_list,
-                    'the following attributes are missing in tag ',
-                    tag,
-                    logger)
+    def check(dset, tag_attribs):
+        tag = dset.name
+        attrib_list = utils.key_list(tag_attribs)
+        for key in tag_attribs:
+            if key == 'dim':
+                attrib_list.remove(key)
+                check_dim(dset, tag_attribs)
+            else:
+                attr = dset.attrs.get(key)
+                if attr is not None:
+                    if isinstance(attr, bytes):
+                        attr_str = attr.decode('utf-8')
+                    else:
+                        attr_str = str(attr)
+                    if attr_str != tag_attribs.get(key):
+                        logger.warning('incorrect attribute in ' +
+                              tag + ': is ' +
+                              key + ':' +
+                              attr_str + ' but should be ' +
+                              key + ':' +
+                              tag_attribs.get(key))
+                        res.res = False
+                    attrib_list.remove(key)
+        if len(attrib_list) > 0:
+            res.res = False
+        report_items(
+            attrib_list,
+            'the following attributes are missing in tag ',
+            tag,
+            logger)
 
     res = Result()
-    tag_list = utils.key_list(required_tags)
-    file_h5 = h5py.File(file, 'r')
-    file_h5.visititems(func)
-    if res.res:
-        return True
-    else:
-        report_items(tag_list, 'the following tags are missing: ', '', logger)
-        return False
+    tag_list = []
+    with h5py.File(file, 'r') as file_h5:
+        datasets = find_datasets(file_h5, utils.key_list(required_tags))
+        for tag in required_tags:
+            if len(datasets[tag]) == 0:
+                tag_list.append(tag)
+            for dset in datasets[tag]:
+                check(dset, required_tags[tag])
+
+    report_items(tag_list, 'the following tags are missing: ', '', logger)
+    return res.res and len(tag_list) == 0
 
 
 def tags(file, required_tags, logger):
     """
     This method is used when a file of hdf type is given.
-    All tags from the hdf file are added in the filetags list.
-    Then the schema is evaluated for tags. With each tag discovered
-    it checks whether there is matching tag in the filetags list.
-    If a tag is missing, the function exits with False.
+    Each tag from the schema is looked up in the hdf file. A tag can be a
+    wildcard pattern (i.e. "/exchange/data_*"), then at least one dataset
+    must match. If a tag is missing, the function exits with False.
     Otherwise, it will return True.
 
     Parameters
@@ -265,36 +351,159 @@ def tags(file, required_tags, logger):
     False if not verified
 
     """
+    result = True
+    with h5py.File(file, 'r') as file_h5:
+        datasets = find_datasets(file_h5, utils.key_list(required_tags))
+
+    for tag in required_tags:
+        if len(datasets[tag]) == 0:
+            logger.warning('tag ' + tag + ' not found')
+            result = False
+
+    return result
+
+
+def get_files(files):
+    """
+    This function returns a list of file names given as names or glob patterns.
 
-    tag_list = utils.key_list(required_tags)
+    Parameters
+    ----------
+    files : list or str
+        a file name or glob pattern, or a list of them
 
-    class Result:
+    Returns
+    -------
+    file_list : list
+        a list of file names
+    """
+    if isinstance(files, str):
+        files = [files]
+    file_list = []
+    for pattern in files:
+        names = sorted(glob.glob(pattern))
+        if len(names) == 0:
+            names = [pattern]
+        for name in names:
+            if name not in file_list:
+                file_list.append(name)
+    return file_list
+
+
+def init_worker(required_tags, type):
+    """
+    This function initializes a worker process verifying files.
 
-        def __init__(self):
-            self.result = True
+    The messages logged when verifying a file are kept, so they can be returned to the main process.
 
-        def missing_tag(self):
-            self.result = False
+    Parameters
+    ----------
+    required_tags : dict
+        a dictionary containing tag and attributes values read from the configured 'schema' file
 
-        def is_verified(self):
-            return self.result
+    type : str
+        verification type, 'hdf_structure' or 'hdf_tags'
 
-    result = Result()
-    filetags = []
+    Returns
+    -------
+    none
+    """
+    logger = logging.getLogger(__name__ + '.worker')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = logging.handlers.BufferingHandler(sys.maxsize)
+    logger.addHandler(handler)
+    worker['logger'] = logger
+    worker['handler'] = handler
+    worker['required_tags'] = required_tags
+    worker['type'] = type
+
+
+def verify_file(file):
+    """
+    This function verifies a file in a worker process.
 
-    def func(name, dset):
-        if isinstance(dset, h5py.Dataset):
-            filetags.append(dset.name)
+    Parameters
+    ----------
+    file : str
+        File Name to verify including path
 
-    file_h5 = h5py.File(file, 'r')
-    file_h5.visititems(func)
+    Returns
+    -------
+    file : str
+        File Name
 
-    for tag in tag_list:
-        if tag not in filetags:
-            logger.warning('tag ' + tag + ' not found')
-            result.missing_tag()
+    ret : boolean
+        True if verified, False otherwise
+
+    messages : list
+        a list of messages logged when verifying the file
+    """
+    logger = worker['logger']
+    worker['handler'].flush()
+    try:
+        if worker['type'] == 'hdf_structure':
+            ret = structure(file, worker['required_tags'], logger)
+        else:
+            ret = tags(file, worker['required_tags'], logger)
+    except (IOError, OSError):
+        logger.error('cannot read file ' + file)
+        ret = False
+    messages = [record.getMessage() for record in worker['handler'].buffer]
+    return file, ret, messages
+
+
+def verify_files(conf, files, report_file=None):
+    """
+    This function verifies structure of many files in parallel worker processes.
+
+    The files are verified as configured for the verify function. The number of worker processes is configured with
+    'no_workers'. The messages of all files are reported in a combined report, in the order of the files.
+
+    Parameters
+    ----------
+    conf : str
+        configuration file name, including path
+
+    files : list or str
+        a file name or glob pattern, or a list of them
+
+    report_file : str
+        optional, a file the combined report is written to
 
-    return result.is_verified()
+    Returns
+    -------
+    results : dict
+        a dictionary of verification results keyed by file name
+    """
+    logger, required_tags, type, no_workers = init(conf)
+    file_list = get_files(files)
+
+    results = OrderedDict()
+    report = OrderedDict()
+    pool = Pool(min(no_workers, max(len(file_list), 1)), init_worker, (required_tags, type))
+    try:
+        for file, ret, messages in pool.imap(verify_file, file_list):
+            results[file] = ret
+            if not ret:
+                report[file] = messages
+                for message in messages:
+                    logger.warning(file + ': ' + message)
+    finally:
+        pool.close()
+        pool.join()
+
+    failed = len(report)
+    logger.info('verified ' + str(len(file_list)) + ' files, ' + str(failed) + ' not verified')
+    if report_file is not None:
+        try:
+            with open(report_file, 'w') as rf:
+                rf.write('verified ' + str(len(file_list)) + ' files, ' + str(failed) + ' not verified\n')
+                pprint.pprint(dict(report), rf)
+        except IOError:
+            logger.warning('Cannot open report file')
+
+    return results
 
 
 def verify(conf, file):
@@ -316,7 +525,7 @@ def verify(conf, file):
     boolean
     """
 
-    logger, required_tags, type = init(conf)
+    logger, required_tags, type, no_workers = init(conf)
     if not os.path.isfile(file):
         logger.error(
             'parameter error: file ' +
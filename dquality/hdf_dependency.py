@@ -69,6 +69,9 @@ __copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
 __all__ = ['init',
            'verify',
+           'get_plan',
+           'find_values',
+           'verify_relation',
            'verify_list',
            'find_value']
 
@@ -111,19 +114,6 @@ def init(config):
     return logger, dep
 
 
-class TagValue:
-    value = 0
-
-    def __init__(self, tag):
-        self.tag = tag
-
-    def set_value(self, value):
-        self.value = value
-
-    def get_value(self):
-        return self.value
-
-
 def find_value(tag, dset):
     """
     This function takes tag parameter and a corresponding dataset from
@@ -133,7 +123,8 @@ def find_value(tag, dset):
     dimension), and a parameter (i.e. numeric index). In the case of a
     simple hd5 tag the function returns a value of this member.
     In the second case the function returns decoded value, in the
-    case of "dim" category, it returns the indexed dimension.
+    case of "dim" category, it returns the indexed dimension, without
+    reading the data.
 
     Parameters
     ----------
@@ -150,37 +141,93 @@ def find_value(tag, dset):
 
     tag_def = tag.split()
     if len(tag_def) == 1:
-        return dset.value
+        return dset[()]
     else:
         if tag_def[1] == 'dim':
             axis = tag_def[2]
             return dset.shape[int(axis)]
 
-def verify_list(file, list, relation, logger):
+
+def get_plan(dependencies):
     """
-    This function takes an hd5 file, a list of tags (can be extended)
-    and a relation between the list members. First the method creates
-    a tags dictionary from the list of tags. The key is a simple hd5
-    tag, and the value is a newly created TagValue instance that
-    contains extended tag (or simple tag if simple tag was in the
-    list), and a placeholder for the value. The first tag from the
-    list is retained as an anchor.
-
-    The function travers through all tags in the given file. If the
-    tag name is found in the tags dictionary, the ```find_value```
-    method is called to retrieve a defined valueu referenced by the
-    tag. The value is then added to the TagValue instance for this tag.
-
-    When all tags are processed the function iterates over the tags
-    dictionary to find if the relation between anchor value and other
-    values can be verified. If any relation is not true, a report is
-    printed for this tag, and the function will return ```False```.
-    Otherwise the function returns ```True```.
+    This function compiles the dependency rules into a plan.
+
+    The plan lists each of the extended or simple tags used by any of the
+    rules once, so the value of a tag is found once, even if the tag is
+    used by many rules.
 
     Parameters
     ----------
-    file : file
-        an hd5 file to be verified
+    dependencies : dict
+        a dictionary of lists of tag lists keyed by relation, as read from
+        the "*dependencies*" file
+
+    Returns
+    -------
+    tags : list
+        a list of extended or simple hd5 tags used by the rules
+
+    rules : list
+        a list of tuples of relation and a list of tags the relation applies to
+    """
+    tags = []
+    rules = []
+    for relation in dependencies:
+        for tag_list in dependencies[relation]:
+            rules.append((relation, tag_list))
+            for tag in tag_list:
+                if tag not in tags:
+                    tags.append(tag)
+    return tags, rules
+
+
+def find_values(file_h5, tags, logger):
+    """
+    This function finds values of the given tags in an open hd5 file.
+
+    The datasets are accessed directly by the hd5 path, the file is not
+    traversed.
+
+    Parameters
+    ----------
+    file_h5 : h5py.File
+        an open hd5 file
+
+    tags : list
+        a list of extended or simple hd5 tags
+
+    logger : Logger
+        a Logger instance
+
+    Returns
+    -------
+    values : dict
+        a dictionary of values keyed by tag; the tags that are not found
+        in the file are not included
+    """
+    values = {}
+    for tag in tags:
+        dset = file_h5.get(tag.split()[0])
+        if isinstance(dset, h5py.Dataset):
+            values[tag] = find_value(tag, dset)
+        else:
+            logger.warning('the ' + tag.split()[0] + ' dataset does not exist')
+    return values
+
+
+def verify_relation(values, list, relation, logger):
+    """
+    This function verifies that the relation applies to the values of tags
+    in the list. The first tag from the list is an anchor; values of other
+    tags are compared to the anchor value. If any relation is not true, or
+    any of the values is missing, a report is printed for this tag, and the
+    function will return ```False```. Otherwise the function returns
+    ```True```.
+
+    Parameters
+    ----------
+    values : dict
+        a dictionary of values keyed by tag, as returned by find_values
 
     list : list
         list of extended or simple hd5 tags
@@ -195,44 +242,57 @@ def verify_list(file, list, relation, logger):
     -------
     boolean
     """
-    # create dictionary of tag : tag with parameters for fast lookup
-    anchor_tag = TagValue(list[0])
-    tags = {}
-    for long_tag in list:
-        tags[long_tag.split()[0]] = TagValue(long_tag)
-
-    def func(name, dset):
-        if len(list) != 0 and isinstance(dset, h5py.Dataset):
-            tag = dset.name
-            try:
-                full_tag = tags[tag].tag
-                list.remove(full_tag)
-                value = find_value(full_tag, dset)
-                tags[tag].set_value(value)
-                if full_tag == anchor_tag.tag:
-                    anchor_tag.set_value(value)
-                    del tags[tag]
-
-            except KeyError:
-                pass
-
-    file_h5 = h5py.File(file, 'r')
-    file_h5.visititems(func)
+    anchor_tag = list[0]
+    if anchor_tag not in values:
+        logger.warning('the ' + anchor_tag + ' value cannot be found')
+        return False
 
     res = True
-    for tag in tags:
-        if not function_mapper[relation](
-                tags.get(tag).get_value(),
-                anchor_tag.get_value()):
+    for tag in list[1:]:
+        if tag not in values:
+            logger.warning('the ' + tag + ' value cannot be found')
+            res = False
+        elif not function_mapper[relation](values[tag], values[anchor_tag]):
             logger.warning('the ' + tag + ' value is ' +
-                           str(tags.get(tag).get_value()) +
+                           str(values[tag]) +
                            ' but should be ' + relation +
-                           ' ' + str(anchor_tag.get_value()))
+                           ' ' + str(values[anchor_tag]))
             res = False
 
     return res
 
 
+def verify_list(file, list, relation, logger):
+    """
+    This function takes an hd5 file, a list of tags (can be extended)
+    and a relation between the list members, and verifies that the
+    relation applies to the values of the tags. The first tag from the
+    list is an anchor; values of other tags are compared to the anchor
+    value.
+
+    Parameters
+    ----------
+    file : file
+        an hd5 file to be verified
+
+    list : list
+        list of extended or simple hd5 tags
+
+    relation : str
+        a string specifying the relation between tags in the list
+
+    logger : Logger
+        a Logger instance
+
+    Returns
+    -------
+    boolean
+    """
+    with h5py.File(file, 'r') as file_h5:
+        values = find_values(file_h5, list, logger)
+    return verify_relation(values, list, relation, logger)
+
+
 def verify(conf, file):
     """
     This function reads the json "*dependencies*" file from the 
@@ -283,14 +343,15 @@ def verify(conf, file):
             file + ' does not exist')
         sys.exit(-1)
 
-    res = True
-    i = 0
+    # the values of all tags used by the rules are found at once, with the file opened once
+    tags, rules = get_plan(dependencies)
+    with h5py.File(file, 'r') as file_h5:
+        values = find_values(file_h5, tags, logger)
 
-    for relation in dependencies:
-        batch = dependencies[relation]
-        for tag_list in batch:
-            if not verify_list(file, tag_list, relation, logger):
-                res = False
+    res = True
+    for relation, tag_list in rules:
+        if not verify_relation(values, tag_list, relation, logger):
+            res = False
 
     if res:
         logger.info('All dependecies are satisfied')
@@ -60,271 +60,29 @@ The results will be sent to an EPICS PV (printed on screen for now).
 
 import os
 import sys
-from multiprocessing import Queue
+from multiprocessing import Queue, Pool
 import json
 import dquality.common.utilities as utils
 import dquality.common.constants as const
 import dquality.data as dataver
-from threading import Timer
-import stat
+import dquality.common.pipeline as pipeline
+from dquality.common.file_seek import FileSeek
+from dquality.common.journal import Journal
 
 
 __author__ = "Barbara Frosik"
 __copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
 __all__ = ['init',
+           'init_worker',
+           'verify_file',
+           'get_status',
            'verify']
 
 INTERRUPT = 'interrupt'
 
-
-class FileSeek():
-    """
-    This class provides file discovery functionality.
-
-    An instance is initialized with parameters.
-    On the start the FileSeek checks for existing files. After that it periodically checks
-    for new files in monitored directory and subdirectories. Upon finding a new or updated file it
-    velidates the file and enqueues into the queue on success.
-    """
-
-    def __init__(self, q, polling_period, logger, file_type):
-        """
-        constructor
-
-        Parameters
-        ----------
-        q : Queue
-            a queue used to pass discovered files
-
-        polling_period : int
-            number of second defining polling period
-
-        logger : Logger
-            logger instance
-
-        file_type : int
-            a constant defining type of data file. Supporting FILE_TYPE_GE and FILE_TYPE_HDF
-        """
-        self.q = q
-        self.polling_period = polling_period
-        self.processed_files = None
-        self.logger = logger
-        self.file_type = file_type
-        self.done = False
-
-    def get_files(self, folder, ext, discovered_files=None):
-        """
-        Finds files in a given directory and subdirectories.
-
-        Parameters
-        ----------
-        folder : str
-            a folder name that will be checked for files
-
-        ext : list
-            list of file extensions that will be discovered
-
-        discovered_files : dict
-            a dictionary to add the discovered files to
-
-        Returns
-        -------
-        dict
-            a dictionary with keys as files in a monitored folder and subdirectories
-        """
-
-        current_files = discovered_files
-        if current_files is None:
-            current_files = {}
-        if os.path.isdir(folder):
-            files = os.listdir(folder)
-            for f in files:
-                full_path = os.path.join(folder, f)
-                if os.path.isfile(full_path):
-                    match = False
-                    for fext in ext:
-                        if f.endswith(fext):
-                            match = True
-                    if match:
-                        statResult = os.stat(full_path)
-                        file_info = {}
-                        file_info['fileSize'] = statResult[stat.ST_SIZE]
-                        file_info['fileModificationTime'] = statResult[stat.ST_MTIME]
-                        current_files[full_path] = file_info
-                elif os.path.isdir(full_path):
-                    current_files = self.get_files(full_path, ext, current_files)
-        return current_files
-
-    def notify(self, file_name):
-        """
-        This method performs action to notify stakeholders about a discovered file.
-
-        Currently the notification is done by using queue.
-        This method validates the file first. If file validated successfully, the full file name is enqueued.
-        The file might not validate if has been discovered before it is complete. In such situation, the file will
-        be discovered again when updated.
-
-        Parameters
-        ----------
-        file_name : str
-            a full name of a file
-
-        Returns
-        -------
-        none
-        """
-
-        if self.file_type == const.FILE_TYPE_GE:
-            validator = FileValidatorGe()
-            if validator.is_valid(file_name):
-                self.q.put(file_name)
-        else:
-            # the velidator is not implemented, so for now pass all discovered files
-            self.q.put(file_name)
-
-    def process_files(self, previous_files, current_files):
-        """
-        This method compares new latest discovered files with previously found files. The new files are reported
-        through notify to the stakeholders.
-
-        Parameters
-        ----------
-        previous_files : dict
-            a dictionary of previously found files
-
-        current_files : dict
-            a dictionary of currently found files
-
-        Returns
-        -------
-        none
-        """
-
-        for file_name in current_files.keys():
-            if not file_name in previous_files:
-                # new file, must be updated
-                self.notify(file_name)
-            else:
-                # old file, check timestamp
-                prev_file_info = previous_files.get(file_name)
-                prev_modification_time = prev_file_info.get('fileModificationTime', '')
-                file_info = current_files.get(file_name)
-                modification_time = file_info.get('fileModificationTime')
-                if modification_time != prev_modification_time:
-                    # file has been modified, need to process it
-                    self.notify(file_name)
-
-
-    def poll_file_system(self, folder, ext):
-        """
-        This method initiates for polling the file information off of the file system.
-
-        Parameters
-        ----------
-        folder : str
-            a folder name that will be checked for files
-
-        ext : list
-            list of file extensions that will be discovered
-
-        discovered_files : dict
-            a dictionary to add the discovered files to
-
-        Returns
-        -------
-        none
-        """
-
-        try:
-            current_files = self.get_files(folder, ext)
-            self.process_files(self.processed_files, current_files)
-            self.processed_files = current_files
-        except:
-            self.logger.error('Could not poll directory %s' % (folder))
-        self.start_observing(folder, ext)
-
-    def start_observing(self, folder, ext):
-        """
-        This method startss for polling the file information off of the file system.
-
-        Parameters
-        ----------
-        folder : str
-            a folder name that will be checked for files
-
-        ext : list
-            list of file extensions that will be discovered
-
-        discovered_files : dict
-            a dictionary to add the discovered files to
-
-        Returns
-        -------
-        none
-        """
-
-        if self.processed_files is None:
-            self.processed_files = self.get_files(folder, ext)
-        if self.done:
-            return
-
-        t = Timer(self.polling_period, self.poll_file_system, [folder, ext])
-        self.t = t
-        t.start()
-
-    def stop_observing(self):
-        """
-        This method stops the polling the file information off of the file system.
-
-        Parameters
-        ----------
-        none
-
-        Returns
-        -------
-        none
-        """
-
-        self.t.cancel()
-        self.done = True
-
-
-class FileValidatorGe():
-    """
-    This class is an interface to the concrete file verification functionality.
-    """
-    def is_valid(self, file):
-        """
-        This method checks if the ge file is compatible with the standards.
-
-        Parameters
-        ----------
-        file : str
-            file name
-
-        Returns
-        -------
-        True if validated, False otherwise
-        """
-
-        import struct as st
-
-        fp = open(file, 'rb')
-        offset = 8192
-
-        fp.seek(18)
-        size, nframes = st.unpack('<ih',fp.read(6))
-        if size != 2048:
-            return False
-
-        fsize = os.stat(str(fp).split("'")[1]).st_size
-        nframes_calc = (fsize - offset)/(2*size**2)
-
-        if nframes != nframes_calc:
-            return False
-
-        return True
+# verification parameters of a worker process
+worker = {}
 
 
 def init(config):
@@ -368,6 +126,18 @@ def init(config):
     consumers : dict
         a dictionary containing consumer processes to run, and their parameters
 
+    no_workers : int
+        number of worker processes verifying files concurrently
+
+    journal_file : str
+        a name of the journal file recording verified files, None if not configured
+
+    follow : boolean
+        if True, the files are verified while they are written
+
+    idle_timeout : float
+        number of seconds after which a followed file that did not grow is considered complete
+
     """
     conf = utils.get_config(config)
     if conf is None:
@@ -431,7 +201,119 @@ def init(config):
         with open(consumersfile) as consumers_file:
             consumers = json.loads(consumers_file.read())
 
-    return logger, data_tags, limits, quality_checks, extensions, file_type, report_type, report_dir, consumers
+    try:
+        no_workers = int(conf['no_workers'])
+    except KeyError:
+        no_workers = 2
+
+    try:
+        journal_file = conf['journal_file']
+    except KeyError:
+        journal_file = None
+
+    try:
+        follow = conf['follow']
+    except KeyError:
+        follow = False
+
+    try:
+        idle_timeout = float(conf['follow_idle_timeout'])
+    except KeyError:
+        idle_timeout = const.FOLLOW_IDLE_TIMEOUT
+
+    return logger, data_tags, limits, quality_checks, extensions, file_type, report_type, report_dir, consumers, \
+        no_workers, journal_file, follow, idle_timeout
+
+
+def init_worker(logger, file_type, data_tags, limits, quality_checks, report_type, report_dir, consumers,
+                follow=False, idle_timeout=const.FOLLOW_IDLE_TIMEOUT):
+    """
+    This function initializes a worker process with the verification parameters.
+
+    Parameters
+    ----------
+    logger : Logger
+        logger instance
+
+    file_type : int
+        data file type; currently supporting FILE_TYPE_HDF and FILE_TYPE_GE
+
+    data_tags : dict
+        a dictionary od data_type/hdf tag
+
+    limits : dictionary
+        a dictionary containing limit values
+
+    quality_checks : dict
+        a dictionary containing quality check functions ids
+
+    report_type : int
+        report type; currently supporting 'none', 'error', and 'full'
+
+    report_dir : str
+        a directory where report files will be located
+
+    consumers : dict
+        a dictionary containing consumer processes to run, and their parameters
+
+    follow : boolean
+        if True, the files are verified while they are written
+
+    idle_timeout : float
+        number of seconds after which a followed file that did not grow is considered complete
+
+    Returns
+    -------
+    none
+    """
+    worker['args'] = (logger, file_type, data_tags, limits, quality_checks, report_type, report_dir, consumers, follow,
+                      idle_timeout)
+
+
+def verify_file(file):
+    """
+    This function verifies a file in a worker process.
+
+    The handler runs in a thread of the worker, so no process is started per file.
+
+    Parameters
+    ----------
+    file : str
+        a full name of a file
+
+    Returns
+    -------
+    bad_indexes : dict
+        a dictionary of bad indexes per data type
+    """
+    logger, file_type, data_tags, limits, quality_checks, report_type, report_dir, consumers, follow, idle_timeout = \
+        worker['args']
+    if file_type != const.FILE_TYPE_GE:
+        file_type = const.FILE_TYPE_HDF
+    return dataver.verify_file(logger, file, file_type, data_tags, limits, quality_checks, report_type, report_dir,
+                               consumers, True, follow=follow, idle_timeout=idle_timeout)
+
+
+def get_status(bad_indexes):
+    """
+    This function returns the verification outcome of a file.
+
+    Parameters
+    ----------
+    bad_indexes : dict
+        a dictionary of bad indexes per data type, None if the file could not be verified
+
+    Returns
+    -------
+    status : str
+        'failed' if the file could not be verified or has bad frames, 'passed' otherwise
+    """
+    if bad_indexes is None:
+        return 'failed'
+    for type in bad_indexes:
+        if len(bad_indexes[type]) > 0:
+            return 'failed'
+    return 'passed'
 
 
 def verify(conf, folder, num_files):
@@ -446,7 +328,10 @@ def verify(conf, folder, num_files):
 
     The function sets up the monitoring and starts
     a loop that reads the "*files*" queue. If there is any new file,
-    the file is dequeued and validated with data.verify function.
+    the file is dequeued, read ahead, and validated with data.verify_file
+    function in a pool of 'no_workers' worker processes. The files are
+    verified concurrently, and the results are reported in order the
+    files were discovered.
 
     The loop is interrupted when all expected files produced results.
 
@@ -468,43 +353,78 @@ def verify(conf, folder, num_files):
     bad_indexes : Dict
         A dictionary containing indexes of slices that did not pass quality check. The key is a file.
     """
-    logger, data_tags, limits, quality_checks, extensions, file_type, report_type, report_dir, consumers = init(conf)
+    logger, data_tags, limits, quality_checks, extensions, file_type, report_type, report_dir, consumers, no_workers, \
+        journal_file, follow, idle_timeout = init(conf)
     if not os.path.isdir(folder):
         logger.error('parameter error: directory ' + folder + ' does not exist')
         sys.exit(-1)
     filesq = Queue()
 
-    # create notifier that will poll file system every 1 second for new files
-    notifier = FileSeek(filesq, 1, logger, file_type)
-    notifier.start_observing(folder, extensions)
+    # the worker processes are started before any thread, and are reused for all files
+    pool = Pool(no_workers, init_worker,
+                (logger, file_type, data_tags, limits, quality_checks, report_type, report_dir, consumers, follow,
+                 idle_timeout))
+
     bad_indexes = {}
     file_count = 0
     interrupted = False
+    if journal_file is None:
+        journal = None
+    else:
+        # resuming, the results of files verified before are taken from the journal
+        journal = Journal(journal_file)
+        for file, (status, file_bad_indexes) in journal.get_processed(folder).items():
+            bad_indexes[file] = file_bad_indexes
+            file_count += 1
 
-    while not interrupted:
-        # checking the newFiles queue for new entries and starting verification
-        # processes for each new file
-        while not filesq.empty():
+    # create notifier that will poll file system every 1 second for new files
+    notifier = FileSeek(filesq, 1, logger, file_type, journal=journal, follow=follow)
+    notifier.start_observing(folder, extensions)
+    # the files are read into the page cache ahead of the verification
+    prefetcher = pipeline.Prefetcher(pipeline.readahead)
+    # the files are verified concurrently, the results are returned in order of discovery
+    workers = pipeline.Prefetcher(verify_file, depth=2 * no_workers, pool=pool)
+
+    while True:
+        # checking the newFiles queue for new entries and submitting them to be read ahead
+        while not interrupted and not filesq.empty():
             file = filesq.get()
             if file.find('INTERRUPT') >= 0:
                 # the calling function may use a 'interrupt' command to stop the monitoring
-                # and processing.
+                # and processing. The files discovered before are processed.
                 interrupted = True
                 notifier.stop_observing()
-                break
+            elif follow:
+                # the file is being written, it is read by the worker as the frames are appended
+                workers.put(file)
             else:
-                file_count += 1
-                if file_type == const.FILE_TYPE_GE:
-                    bad_indexes[file] = dataver.verify_file_ge(logger, file, limits, quality_checks, report_type, report_dir, consumers)
-                else:
-                    bad_indexes[file] = dataver.verify_file_hdf(logger, file, data_tags, limits, quality_checks, report_type, report_dir, consumers)
-                print (file)
-                print ('bad indexes: ', bad_indexes[file])
-                logger.info('monitor evaluated ' + file + ' file')
-
-        if file_count == num_files:
-            interrupted = True
+                prefetcher.put(file)
+
+        # the files read ahead are passed to the workers
+        while len(prefetcher) > 0 and (interrupted or prefetcher.ready()):
+            file, size = prefetcher.get()
+            workers.put(file)
+
+        while workers.ready(0.01) and not (num_files != -1 and file_count >= num_files):
+            file, file_bad_indexes = workers.get()
+            bad_indexes[file] = file_bad_indexes
+            file_count += 1
+            if journal is not None:
+                journal.record(file, get_status(file_bad_indexes), file_bad_indexes)
+            print (file)
+            print ('bad indexes: ', bad_indexes[file])
+            logger.info('monitor evaluated ' + file + ' file')
+
+        if num_files != -1 and file_count >= num_files:
             notifier.stop_observing()
-
+            break
+        if interrupted and len(prefetcher) == 0 and len(workers) == 0:
+            break
+
+    prefetcher.close()
+    prefetcher.log_stats(logger, folder)
+    workers.close()
+    pool.terminate()
+    if journal is not None:
+        journal.close()
     return bad_indexes
-
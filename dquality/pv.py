@@ -51,6 +51,9 @@ Please make sure the installation :ref:`pre-requisite-reference-label` are met.
 
 This module verifies that each of the PVs listed in the configuration
 file exist and their values are set within the predefined range.
+All PVs are connected concurrently, and the connections are kept for the
+following checks. In the continuous mode the PVs are monitored, and the
+conditions are evaluated on each change.
 
 The results will be reported in a file (printed on screen for now).
 An error will be reported back to UI via PV.
@@ -59,8 +62,11 @@ An error will be reported back to UI via PV.
 
 import sys
 import json
+import time
+from threading import Lock
 from epics import PV
 import dquality.common.utilities as utils
+import dquality.common.constants as const
 from dquality.common.utilities import lt, le, eq, ge, gt
 
 
@@ -70,8 +76,17 @@ __docformat__ = 'restructuredtext en'
 __all__ = ['init',
            'verify',
            'read',
+           'read_pvs',
+           'evaluate',
+           'PvMonitor',
+           'monitor',
            'state']
 
+# PV name : PV, the connections are reused by the following checks
+connections = {}
+connections_lock = Lock()
+
+
 def init(config):
     """
     This function initializes global variables. It gets values from the configuration file, evaluates and processes
@@ -90,6 +105,9 @@ def init(config):
     pvs : dictionary
         a dictionary containing pvs values and attributes read from the configured 'pv_file' file
 
+    timeout : float
+        number of seconds to connect and read all PVs
+
     """
     conf = utils.get_config(config)
     if conf is None:
@@ -105,7 +123,36 @@ def init(config):
     with open(pvfile) as file:
         pvs = json.loads(file.read())['required_pvs']
 
-    return logger, pvs
+    try:
+        timeout = float(conf['pv_timeout'])
+    except KeyError:
+        timeout = const.PV_TIMEOUT
+
+    return logger, pvs, timeout
+
+
+def get_pvs(names):
+    """
+    This function returns PV objects of the given names from the connections pool.
+
+    The PVs that are not in the pool are created, which starts the connection in the background, so the PVs are
+    connected concurrently.
+
+    Parameters
+    ----------
+    names : list
+        names of the PVs
+
+    Returns
+    -------
+    pvs : list
+        a list of PV objects
+    """
+    with connections_lock:
+        for name in names:
+            if name not in connections:
+                connections[name] = PV(name)
+        return [connections[name] for name in names]
 
 
 def read(pv_str):
@@ -122,11 +169,49 @@ def read(pv_str):
     -------
     PV value
     """
-    pv = PV(pv_str).get()
+    pv = get_pvs([pv_str])[0].get()
 
     return pv
 
 
+def read_pvs(names, timeout=const.PV_TIMEOUT):
+    """
+    This function reads values of many Process Variables (PV) concurrently.
+
+    The PVs are connected concurrently, and each PV is read as soon as it connects. The PVs that did not connect
+    within the timeout, which applies to all the PVs, have None value.
+
+    Parameters
+    ----------
+    names : list
+        names of the PVs
+
+    timeout : float
+        number of seconds to connect and read all PVs
+
+    Returns
+    -------
+    values : dict
+        a dictionary of PV name : (value, latency), where latency is number of seconds until the PV was read
+    """
+    start = time.time()
+    deadline = start + timeout
+    pending = dict(zip(names, get_pvs(names)))
+    values = {}
+    while True:
+        for name in list(pending.keys()):
+            pv = pending[name]
+            if pv.connected:
+                values[name] = (pv.get(timeout=max(deadline - time.time(), 0)), time.time() - start)
+                del pending[name]
+        if len(pending) == 0 or time.time() >= deadline:
+            break
+        time.sleep(const.PV_POLL_PERIOD)
+    for name in pending:
+        values[name] = (None, time.time() - start)
+    return values
+
+
 def state(value, limit):
     """
     This function takes boolean "*value*" parameter and string "limit"
@@ -152,6 +237,75 @@ def state(value, limit):
         return False
 
 
+function_mapper = {
+    'less_than': lt,
+    'less_or_equal': le,
+    'equal': eq,
+    'greater_or_equal': ge,
+    'greater_than': gt,
+    'state': state}
+
+
+def evaluate(logger, pv, pv_value, pv_attr):
+    """
+    This function checks the PV value against the conditions configured for the PV.
+
+    Any missing PV, i.e. with None value, and any condition that is not met are logged as warnings.
+
+    Parameters
+    ----------
+    logger : Logger
+        logger instance
+
+    pv : str
+        name of the PV
+
+    pv_value : object
+        value of the PV, None if the PV cannot be read
+
+    pv_attr : dict
+        a dictionary of the PV attributes, i.e. description and conditions
+
+    Returns
+    -------
+    boolean
+        True if the PV was read and meets the conditions, False otherwise
+    """
+    if pv_value is None:
+        logger.warning('PV ' + pv + ' cannot be read.')
+        return False
+
+    failed = get_failed(pv_value, pv_attr)
+    for attr in failed:
+        logger.warning('PV ' +
+                       pv + ' has value out of range. ' +
+                       'The value is ' +
+                       str(pv_value) + ' but should be ' +
+                       attr + ' ' +
+                       str(pv_attr[attr]))
+    return len(failed) == 0
+
+
+def get_failed(pv_value, pv_attr):
+    """
+    This function returns the conditions configured for the PV that the value does not meet.
+
+    Parameters
+    ----------
+    pv_value : object
+        value of the PV
+
+    pv_attr : dict
+        a dictionary of the PV attributes, i.e. description and conditions
+
+    Returns
+    -------
+    failed : list
+        a list of the failed conditions
+    """
+    return [attr for attr in pv_attr if attr != 'description' and not function_mapper[attr](pv_value, pv_attr[attr])]
+
+
 def verify(conf):
     """
     This function reads the :download:`schemas/pvs.json <../../../config/default/schemas/pvs.json>`
@@ -169,6 +323,8 @@ def verify(conf):
     - "*greater_than*" - the PV value must be greater than attribute value
     - "*state*" - to support boolean PVs. The defined value must be "True" or "False".
 
+    The PVs are connected and read concurrently, within the 'pv_timeout' for all
+    PVs, and the read latency of each PV is logged.
     Any missing PV (i.e. it can't be read) is an error that is reported
     (printed for now). Any PV value that is out of limit is an error that
     is reported (printed for now). The function returns True if no
@@ -184,40 +340,182 @@ def verify(conf):
     boolean
     """
 
-    logger, required_pvs = init(conf)
+    logger, required_pvs, timeout = init(conf)
 
     logger.info('verifying process variables')
-    function_mapper = {
-        'less_than': lt,
-        'less_or_equal': le,
-        'equal': eq,
-        'greater_or_equal': ge,
-        'greater_than': gt,
-        'state': state}
+    values = read_pvs(list(required_pvs.keys()), timeout)
 
     res = True
-
     for pv in required_pvs:
-        # possible the read pv needs try statement
-        pv_value = read(pv)
-
-        if pv_value is None:
+        pv_value, latency = values[pv]
+        logger.debug('PV ' + pv + ' read in ' + str(round(latency, 3)) + ' s')
+        if not evaluate(logger, pv, pv_value, required_pvs[pv]):
             res = False
-            logger.warning('PV ' + pv + ' cannot be read.')
-        else:
-            pv_attr = required_pvs[pv]
-            for attr in pv_attr:
-                if attr == 'description':
-                    descriprtion = pv_attr['description']
-                else:
-                    if not function_mapper[attr](pv_value, pv_attr[attr]):
-                        res = False
-                        logger.warning('PV ' +
-                                       pv + ' has value out of range. ' +
-                                       'The value is ' +
-                                       str(pv_value) + ' but should be ' +
-                                       attr + ' ' +
-                                       str(pv_attr[attr]))
+    if len(values) > 0:
+        slowest = max(values, key=lambda pv: values[pv][1])
+        logger.info('read ' + str(len(values)) + ' PVs, the slowest ' + slowest + ' in ' +
+                    str(round(values[slowest][1], 3)) + ' s')
+
     if res:
         logger.info('All PVs listed in pvs.json exist and meet conditions')
     return res
+
+
+class PvMonitor():
+    """
+    This class monitors the required PVs, and evaluates the PVs conditions on each change.
+
+    The PVs are subscribed with monitors, so the values are sent when they change, and nothing is polled. The feedback
+    is given only on transitions, i.e. when a PV starts or stops meeting the conditions, or disconnects. The callbacks
+    are called from the channel access threads.
+    """
+
+    def __init__(self, required_pvs, logger, feedback=None):
+        """
+        constructor
+
+        Parameters
+        ----------
+        required_pvs : dict
+            a dictionary of PV name : PV attributes, as read from the configured 'pv_file' file
+
+        logger : Logger
+            logger instance
+
+        feedback : function
+            optional, a function called on each transition with the PV name, value, and True if the PV meets the
+            conditions
+        """
+        self.required_pvs = required_pvs
+        self.logger = logger
+        self.feedback = feedback
+        # PV name : True if the PV meets the conditions
+        self.status = {}
+        self.callbacks = []
+        self.lock = Lock()
+
+    def start(self):
+        """
+        This method subscribes to the PVs. The PVs that are connected are evaluated immediately.
+
+        Returns
+        -------
+        none
+        """
+        for pv in get_pvs(list(self.required_pvs.keys())):
+            pv.connection_callbacks.append(self.on_connection)
+            self.callbacks.append((pv, pv.add_callback(self.on_change, run_now=True)))
+
+    def stop(self):
+        """
+        This method removes the subscriptions. The PVs stay connected, to be reused.
+
+        Returns
+        -------
+        none
+        """
+        for pv, index in self.callbacks:
+            pv.remove_callback(index)
+            if self.on_connection in pv.connection_callbacks:
+                pv.connection_callbacks.remove(self.on_connection)
+        self.callbacks = []
+
+    def on_change(self, pvname=None, value=None, **kws):
+        self.update(pvname, value)
+
+    def on_connection(self, pvname=None, conn=None, **kws):
+        # the value is evaluated when the monitor delivers it after reconnecting
+        if not conn:
+            self.update(pvname, None)
+
+    def update(self, pv, value):
+        """
+        This method evaluates a new value of the PV, and gives the feedback if the PV status changed.
+
+        Parameters
+        ----------
+        pv : str
+            name of the PV
+
+        value : object
+            new value of the PV, None if the PV disconnected
+
+        Returns
+        -------
+        none
+        """
+        pv_attr = self.required_pvs[pv]
+        ok = value is not None and len(get_failed(value, pv_attr)) == 0
+        with self.lock:
+            if self.status.get(pv) == ok:
+                return
+            self.status[pv] = ok
+        if ok:
+            self.logger.info('PV ' + pv + ' meets conditions. The value is ' + str(value))
+        else:
+            evaluate(self.logger, pv, value, pv_attr)
+        if self.feedback is not None:
+            self.feedback(pv, value, ok)
+
+    def check_missing(self):
+        """
+        This method reports the PVs that did not deliver any value as not readable.
+
+        Returns
+        -------
+        none
+        """
+        for pv in self.required_pvs:
+            if pv not in self.status:
+                self.update(pv, None)
+
+    def is_ok(self):
+        """
+        This method returns True if all PVs were received and meet the conditions.
+
+        Returns
+        -------
+        boolean
+        """
+        with self.lock:
+            return len(self.status) == len(self.required_pvs) and all(self.status.values())
+
+
+def monitor(conf, duration=None):
+    """
+    This function monitors the PVs listed in the configured 'pv_file' file until interrupted.
+
+    The PVs conditions are evaluated as in the verify function on each change of a PV value, and a warning is logged
+    when a PV stops meeting the conditions or disconnects. The recovery is logged as info. The PVs that did not
+    connect within the 'pv_timeout' are reported as not readable.
+
+    Parameters
+    ----------
+    conf : str
+        configuration file name, including path
+
+    duration : float
+        optional, number of seconds to monitor the PVs; if None, the PVs are monitored until keyboard interrupt
+
+    Returns
+    -------
+    boolean
+        True if all PVs meet the conditions when the monitoring ends, False otherwise
+    """
+    logger, required_pvs, timeout = init(conf)
+
+    logger.info('monitoring process variables')
+    pv_monitor = PvMonitor(required_pvs, logger)
+    pv_monitor.start()
+    start = time.time()
+    checked = False
+    try:
+        while duration is None or time.time() - start < duration:
+            if not checked and time.time() - start >= timeout:
+                pv_monitor.check_missing()
+                checked = True
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        pass
+    pv_monitor.stop()
+    return pv_monitor.is_ok()
@@ -56,17 +56,21 @@ The results is a detail report of calculated values. The indexes of slices that
 quality check are returned back.
 
 """
+import os
+import time
 import numpy as np
 import struct as st
 import array as ar
+import dquality.common.constants as const
 
 __author__ = "Barbara Frosik"
 __copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
-__all__ = ['init',
-           'verify_file_hdf',
-           'verify_file_ge',
-           'verify']
+__all__ = ['File_reader',
+           'Tif_fr',
+           'Ge_fr',
+           'Tif_stack_fr',
+           'Hdf_fr']
 
 
 class File_reader:
@@ -74,11 +78,287 @@ class File_reader:
         pass
 
 
+class Ge_fr(File_reader):
+    """
+    This class reads frames from GE detector files.
+
+    The frame region that follows the 8192 bytes header is memory mapped, so the frames are returned as views into
+    the file and nothing is copied until the frame is used.
+    """
+    offset = 8192
+    dtype = np.dtype('<u2')
+
+    def __init__(self, logger=None):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        logger : Logger
+            optional, logger instance used to report corrupted files
+        """
+        self.logger = logger
+
+    def error(self, msg):
+        if self.logger is not None:
+            self.logger.error(msg)
+        else:
+            print(msg)
+
+    def get_frames(self, filename):
+        """
+        This function memory maps all frames in the GE file.
+
+        The header is verified first; the image size must be 2048 and the number of frames in the header must agree
+        with the file size.
+
+        Parameters
+        ----------
+        filename : str
+            file name
+
+        Returns
+        -------
+        frames : numpy.memmap
+            a read only array of shape (number of frames, size, size), or None if the file is corrupted
+        """
+        with open(filename, 'rb') as fp:
+            fp.seek(18)
+            size, nframes = st.unpack('<ih', fp.read(6))
+        if size != 2048:
+            self.error('GE image size unexpected: ' + str(size))
+            return None
+
+        fsize = os.stat(filename).st_size
+        frame_bytes = self.dtype.itemsize * size * size
+        if (fsize - self.offset) % frame_bytes != 0 or nframes != (fsize - self.offset) // frame_bytes:
+            self.error('GE number frames unexpected: ' + str(nframes))
+            return None
+
+        return np.memmap(filename, dtype=self.dtype, mode='r', offset=self.offset, shape=(nframes, size, size))
+
+    def is_complete(self, filename):
+        """
+        This function checks whether the GE file is completely written.
+
+        The file is complete when the number of frames in the header agrees with the file size. No error is reported,
+        so the function can be used to probe files that are being written.
+
+        Parameters
+        ----------
+        filename : str
+            file name
+
+        Returns
+        -------
+        True if the file is complete, False otherwise
+        """
+        try:
+            with open(filename, 'rb') as fp:
+                fp.seek(18)
+                size, nframes = st.unpack('<ih', fp.read(6))
+            fsize = os.stat(filename).st_size
+        except (IOError, OSError, st.error):
+            return False
+        if size <= 0:
+            return False
+        frame_bytes = self.dtype.itemsize * size * size
+        return nframes > 0 and fsize == self.offset + nframes * frame_bytes
+
+    def get_frame(self, filename, index=0):
+        """
+        This function returns a single frame from the GE file as a view.
+
+        Parameters
+        ----------
+        filename : str
+            file name
+
+        index : int
+            frame index
+
+        Returns
+        -------
+        frame : numpy.ndarray
+            a 2D view of the frame, or None if the file is corrupted
+        """
+        frames = self.get_frames(filename)
+        if frames is None:
+            return None
+        return frames[index]
+
+    def get_batches(self, frames, batch_size=16):
+        """
+        This generator slices the memory mapped frames in batches.
+
+        Parameters
+        ----------
+        frames : numpy.memmap
+            frames returned by get_frames
+
+        batch_size : int
+            number of frames in a batch
+
+        Returns
+        -------
+        start, batch : int, numpy.ndarray
+            index of the first frame in the batch, and a 3D view of the batch
+        """
+        for start in range(0, frames.shape[0], batch_size):
+            yield start, frames[start:start + batch_size]
+
+    def get_header(self, filename):
+        """
+        This function reads the image size and the number of frames from the GE file header.
+
+        Parameters
+        ----------
+        filename : str
+            file name
+
+        Returns
+        -------
+        size, nframes : int, int
+            the image size and the number of frames in the header, or None if the header is not written yet
+        """
+        try:
+            with open(filename, 'rb') as fp:
+                fp.seek(18)
+                size, nframes = st.unpack('<ih', fp.read(6))
+        except (IOError, OSError, st.error):
+            return None
+        if size <= 0:
+            return None
+        return size, nframes
+
+    def follow(self, filename, poll_period=const.FOLLOW_POLL_PERIOD, idle_timeout=const.FOLLOW_IDLE_TIMEOUT,
+               batch_size=16):
+        """
+        This generator memory maps frames of a GE file that is being written, as they are appended.
+
+        The file size is checked every poll period, and the frames that were completely written since the last check
+        are mapped and returned in batches. The header is read again when the file grows, as the writer may update
+        the number of frames. The generator finishes when the number of frames in the header is reached, or when the
+        file did not grow for the idle timeout, i.e. the writer closed the file. A partially written last frame is
+        reported as an error.
+
+        Parameters
+        ----------
+        filename : str
+            file name
+
+        poll_period : float
+            number of seconds between checks of the file size
+
+        idle_timeout : float
+            number of seconds after which a file that did not grow is considered closed
+
+        batch_size : int
+            maximum number of frames in a batch
+
+        Returns
+        -------
+        start, batch : int, numpy.memmap
+            index of the first frame in the batch, and a 3D view of the batch
+        """
+        read = 0
+        fsize = 0
+        header = None
+        last_change = time.time()
+        while True:
+            current = os.stat(filename).st_size
+            if current != fsize:
+                fsize = current
+                last_change = time.time()
+                header = self.get_header(filename)
+            if header is not None and fsize >= self.offset:
+                size, nframes = header
+                if size != 2048:
+                    self.error('GE image size unexpected: ' + str(size))
+                    return
+                frame_bytes = self.dtype.itemsize * size * size
+                complete = (fsize - self.offset) // frame_bytes
+                if nframes > 0:
+                    complete = min(complete, nframes)
+                if complete > read:
+                    frames = np.memmap(filename, dtype=self.dtype, mode='r', offset=self.offset + read * frame_bytes,
+                                       shape=(complete - read, size, size))
+                    for start in range(0, complete - read, batch_size):
+                        yield read + start, frames[start:start + batch_size]
+                    read = complete
+                if nframes > 0 and read == nframes:
+                    return
+            if time.time() - last_change >= idle_timeout:
+                if header is None or fsize != self.offset + read * self.dtype.itemsize * header[0] ** 2:
+                    self.error('GE file ' + filename + ' closed with incomplete frame after ' + str(read) + ' frames')
+                elif header[1] > 0:
+                    self.error('GE number frames unexpected: ' + str(header[1]) + ', closed after ' + str(read))
+                return
+            time.sleep(poll_period)
+
+
 class Tif_fr(File_reader):
+    """
+    This class reads frames from detector tiff files.
 
-    def get_frame(self, filename):
-        image = None
-        File = open(filename, 'rb')
+    The layout of the image in the file (offset, data type, shape, byte order) is determined from the tiff header.
+    The layouts are cached by the detector signature, i.e. the file size and the raw bytes of the header and image file
+    directory, so consecutive files from the same detector skip the header parsing. The pixels are memory mapped and
+    returned as views in the detector data type; float images are not converted to integers.
+    """
+    # detector signature : layout
+    layouts = {}
+
+    def get_signature(self, File):
+        """
+        This function reads the raw tiff header and the first image file directory.
+
+        Parameters
+        ----------
+        File : file
+            tiff file opened for binary reading
+
+        Returns
+        -------
+        signature : tuple
+            a tuple of the file size, raw header and raw image file directory bytes, or None if not a tiff file
+        """
+        head = File.read(8)
+        if len(head) < 8:
+            return None
+        if head[0:2] == b'II':
+            byteOrd = '<'
+        elif head[0:2] == b'MM':
+            byteOrd = '>'
+        else:
+            return None
+        ifd_offset = st.unpack(byteOrd + 'i', head[4:8])[0]
+        File.seek(ifd_offset)
+        ned = File.read(2)
+        if len(ned) < 2:
+            return None
+        raw_ifd = File.read(12 * st.unpack(byteOrd + 'h', ned)[0])
+        File.seek(0, os.SEEK_END)
+        return File.tell(), head, raw_ifd
+
+    def get_layout(self, filename, File):
+        """
+        This function parses tiff header and determines the image layout.
+
+        Parameters
+        ----------
+        filename : str
+            file name
+
+        File : file
+            tiff file opened for binary reading
+
+        Returns
+        -------
+        layout : dict
+            a dictionary with the image 'offset', 'dtype', 'shape', optional 'scale', or 'pil' if the image cannot be
+            memory mapped; None if the file is not a known detector tiff file
+        """
         dataType = 5
         try:
             Meta = open(filename + '.metadata', 'r')
@@ -91,6 +371,7 @@ class Tif_fr(File_reader):
         except IOError:
             print('no metadata file found - will try to read file anyway')
 
+        File.seek(0)
         tag = File.read(2)
         if 'bytes' in str(type(tag)):
             tag = tag.decode('latin-1')
@@ -129,161 +410,574 @@ class Tif_fr(File_reader):
                 Value = st.unpack(byteOrd + nVal * 'f', File.read(nVal * 4))
             IFD[Tag] = [Type, nVal, Value]
         sizexy = [IFD[256][2][0], IFD[257][2][0]]
-        [nx, ny] = sizexy
-        Npix = nx * ny
+        shape = (sizexy[1], sizexy[0])
+        layout = None
         if 34710 in IFD:
             print('MAR CCD tiff format not supported')
             return None
         elif nSlice > 1:  # CheMin multislice tif file!
-            try:
-                import Image as Im
-            except ImportError:
-                try:
-                    from PIL import Image as Im
-                except ImportError:
-                    print("PIL/pillow Image module not present. This TIF cannot be read without this")
-                    print('not a detector tiff file')
-                    return None
-
-            tifType = 'CheMin'
-            image = np.flipud(np.array(Im.open(filename))) * 10.
+            layout = {'pil': True}
         elif 272 in IFD:
             ifd = IFD[272]
             File.seek(ifd[2][0])
             S = File.read(ifd[1])
             if b'PILATUS' in S:
-                tifType = 'Pilatus'
-                dataType = 0
-                File.seek(4096)
                 print('Read Pilatus tiff file: ' + filename)
-                image = np.array(np.frombuffer(File.read(4 * Npix), dtype=np.int32), dtype=np.int32)
+                layout = {'offset': 4096, 'dtype': np.int32}
             else:
                 if IFD[258][2][0] == 16:
                     if sizexy == [3888, 3072] or sizexy == [3072, 3888]:
-                        tifType = 'Dexela'
                         print('Read Dexela detector tiff file: ' + filename)
                     else:
-                        tifType = 'GE'
                         print('Read GE-detector tiff file: ' + filename)
-                    File.seek(8)
-                    image = np.array(np.frombuffer(File.read(2 * Npix), dtype=np.uint16), dtype=np.int32)
+                    layout = {'offset': 8, 'dtype': np.uint16}
                 elif IFD[258][2][0] == 32:
                     # includes CHESS & Pilatus files from Area Detector
-                    tifType = 'CHESS'
-                    File.seek(8)
                     print('Read as 32-bit unsigned (CHESS) tiff file: ' + filename)
-                    image = np.array(ar.array('I', File.read(4 * Npix)), dtype=np.uint32)
+                    layout = {'offset': 8, 'dtype': np.uint32}
         elif 270 in IFD:
             File.seek(IFD[270][2][0])
             S = File.read(IFD[273][2][0] - IFD[270][2][0])
             if b'ImageJ' in S:
-                tifType = 'ImageJ'
-                dataType = 0
-                File.seek(IFD[273][2][0])
                 print('Read ImageJ tiff file: ' + filename)
                 if IFD[258][2][0] == 32:
-                    image = File.read(4 * Npix)
-                    image = np.array(np.frombuffer(image, dtype=byteOrd + 'i4'), dtype=np.int32)
+                    layout = {'offset': IFD[273][2][0], 'dtype': byteOrd + 'i4'}
                 elif IFD[258][2][0] == 16:
-                    image = File.read(2 * Npix)
-                    image = np.array(np.frombuffer(image, dtype=byteOrd + 'u2'), dtype=np.int32)
+                    layout = {'offset': IFD[273][2][0], 'dtype': byteOrd + 'u2'}
             else:  # gain map from  11-ID-C?
-                tifType = 'Gain map'
-                image = File.read(4 * Npix)
-                image = np.array(np.frombuffer(image, dtype=byteOrd + 'f4') * 1000, dtype=np.int32)
+                layout = {'offset': IFD[273][2][0], 'dtype': byteOrd + 'f4', 'scale': 1000}
 
         elif 262 in IFD and IFD[262][2][0] > 4:
-            tifType = 'DND'
-            File.seek(512)
             print('Read DND SAX/WAX-detector tiff file: ' + filename)
-            image = np.array(np.frombuffer(File.read(2 * Npix), dtype=np.uint16), dtype=np.int32)
+            layout = {'offset': 512, 'dtype': np.uint16}
         elif sizexy == [1536, 1536]:
-            tifType = 'APS Gold'
-            File.seek(64)
             print('Read Gold tiff file:' + filename)
-            image = np.array(np.frombuffer(File.read(2 * Npix), dtype=np.uint16), dtype=np.int32)
+            layout = {'offset': 64, 'dtype': np.uint16}
         elif sizexy == [2048, 2048] or sizexy == [1024, 1024] or sizexy == [3072, 3072]:
             if IFD[273][2][0] == 8:
                 if IFD[258][2][0] == 32:
-                    tifType = 'PE'
-                    File.seek(8)
                     print('Read APS PE-detector tiff file: ' + filename)
                     if dataType == 5:
-                        image = np.array(np.frombuffer(File.read(4 * Npix), dtype=np.float32),
-                                         dtype=np.int32)  # fastest
+                        layout = {'offset': 8, 'dtype': np.float32}
                     else:
-                        image = np.array(np.frombuffer(File.read(4 * Npix), dtype=np.int32), dtype=np.int32)
+                        layout = {'offset': 8, 'dtype': np.int32}
                 elif IFD[258][2][0] == 16:
-                    tifType = 'MedOptics D1'
-                    File.seek(8)
                     print('Read MedOptics D1 tiff file: ' + filename)
-                    image = np.array(np.frombuffer(File.read(2 * Npix), dtype=np.uint16), dtype=np.int32)
+                    layout = {'offset': 8, 'dtype': np.uint16}
 
         elif IFD[273][2][0] == 4096:
-            if sizexy[0] == 3072:
-                tifType = 'MAR225'
-            else:
-                tifType = 'MAR325'
-            File.seek(4096)
             print('Read MAR CCD tiff file: ' + filename)
-            image = np.array(np.frombuffer(File.read(2 * Npix), dtype=np.uint16), dtype=np.int32)
+            layout = {'offset': 4096, 'dtype': np.uint16}
         elif IFD[273][2][0] == 512:
-            tifType = '11-ID-C'
-            File.seek(512)
             print('Read 11-ID-C tiff file: ' + filename)
-            image = np.array(np.frombuffer(File.read(2 * Npix), dtype=np.uint16), dtype=np.int32)
+            layout = {'offset': 512, 'dtype': np.uint16}
 
         elif sizexy == [4096, 4096]:
             if IFD[273][2][0] == 8:
                 if IFD[258][2][0] == 16:
-                    tifType = 'scanCCD'
-                    File.seek(8)
                     print('Read APS scanCCD tiff file: ' + filename)
-                    image = np.array(ar.array('H', File.read(2 * Npix)), dtype=np.int32)
+                    layout = {'offset': 8, 'dtype': np.uint16}
                 elif IFD[258][2][0] == 32:
-                    tifType = 'PE4k'
-                    File.seek(8)
                     print('Read PE 4Kx4K tiff file: ' + filename)
-                    image = np.array(np.frombuffer(File.read(4 * Npix), dtype=np.float32) / 2. ** 4, dtype=np.int32)
+                    layout = {'offset': 8, 'dtype': np.float32, 'scale': 1. / 2. ** 4}
             elif IFD[273][2][0] == 4096:
-                tifType = 'Rayonix'
-                File.seek(4096)
                 print('Read Rayonix MX300HE tiff file: ' + filename)
-                image = np.array(np.frombuffer(File.read(2 * Npix), dtype=np.uint16), dtype=np.int32)
+                layout = {'offset': 4096, 'dtype': np.uint16}
         elif sizexy == [391, 380]:
-            File.seek(8)
-            image = np.array(np.frombuffer(File.read(2 * Npix), dtype=np.int16), dtype=np.int32)
+            layout = {'offset': 8, 'dtype': np.int16}
         elif sizexy == [380, 391]:
-            File.seek(110)
-            image = np.array(np.frombuffer(File.read(Npix), dtype=np.uint8), dtype=np.int32)
+            layout = {'offset': 110, 'dtype': np.uint8}
         elif sizexy == [825, 830]:
-            File.seek(8)
-            image = np.array(np.frombuffer(File.read(Npix), dtype=np.uint8), dtype=np.int32)
+            layout = {'offset': 8, 'dtype': np.uint8}
         elif sizexy == [1800, 1800]:
-            File.seek(110)
-            image = np.array(np.frombuffer(File.read(Npix), dtype=np.uint8), dtype=np.int32)
+            layout = {'offset': 110, 'dtype': np.uint8}
         elif sizexy == [2880, 2880]:
-            File.seek(8)
-            dt = np.dtype(np.float32)
-            dt = dt.newbyteorder(byteOrd)
-            image = np.array(np.frombuffer(File.read(Npix * 4), dtype=dt), dtype=np.int32)
+            layout = {'offset': 8, 'dtype': byteOrd + 'f4'}
         elif sizexy == [3070, 1102]:
             print('Read Dectris Eiger 1M tiff file: ' + filename)
-            File.seek(8)
-            dt = np.dtype(np.float32)
-            dt = dt.newbyteorder(byteOrd)
-            image = np.array(np.frombuffer(File.read(Npix * 4), dtype=np.uint32), dtype=np.int32)
+            layout = {'offset': 8, 'dtype': np.uint32}
 
-        if image is None:
+        if layout is None:
             print('not a known detector tiff file')
             return None
 
-        if sizexy[1] * sizexy[0] != image.size:  # test is resize is allowed
+        layout['shape'] = shape
+        return layout
+
+    def get_frame(self, filename):
+        """
+        This function reads image from a detector tiff file.
+
+        Parameters
+        ----------
+        filename : str
+            file name
+
+        Returns
+        -------
+        image : numpy.ndarray
+            2D image, memory mapped in the detector data type, or None if the file is not a known detector tiff file
+        """
+        with open(filename, 'rb') as File:
+            signature = self.get_signature(File)
+            if signature is None:
+                print('not a detector tiff file')
+                return None
+            layout = self.layouts.get(signature)
+            if layout is None:
+                layout = self.get_layout(filename, File)
+                if layout is None:
+                    return None
+                self.layouts[signature] = layout
+
+        if 'pil' in layout:
+            # image in multiple strips, the PIL is used only if the strips cannot be mapped
+            image = next(Tif_stack_fr().get_pages(filename), None)
+            if image is not None:
+                return np.flipud(image) * np.float32(10.)
+            try:
+                import Image as Im
+            except ImportError:
+                try:
+                    from PIL import Image as Im
+                except ImportError:
+                    print("PIL/pillow Image module not present. This TIF cannot be read without this")
+                    print('not a detector tiff file')
+                    return None
+            image = np.flipud(np.array(Im.open(filename)))
+            return image * np.float32(10.)
+
+        dtype = np.dtype(layout['dtype'])
+        shape = layout['shape']
+        if layout['offset'] + dtype.itemsize * shape[0] * shape[1] > signature[0]:
             print('not a known detector tiff file')
             return None
 
-        image = np.reshape(image, (sizexy[1], sizexy[0]))
-
-        File.close()
-        #        print('image', image.shape)
+        image = np.memmap(filename, dtype=dtype, mode='r', offset=layout['offset'], shape=shape)
+        if 'scale' in layout:
+            # scaled images stay in the float data type of the detector
+            image = image * image.dtype.type(layout['scale'])
         return image
+
+
+class Tif_stack_fr(File_reader):
+    """
+    This class reads multi-page tiff stacks.
+
+    The chain of image file directories is walked lazily, one page at a time. The file is memory mapped once and the
+    pages stored in contiguous strips are returned as views in the data type of the image, so the stack is never
+    loaded into memory as a whole. Compressed pages are not supported.
+    """
+    # tiff field type : (struct format, size)
+    field_types = {1: ('B', 1), 2: ('c', 1), 3: ('H', 2), 4: ('I', 4), 6: ('b', 1), 8: ('h', 2), 9: ('i', 4),
+                   11: ('f', 4), 12: ('d', 8), 16: ('Q', 8)}
+    # sample format : numpy kind
+    sample_formats = {1: 'u', 2: 'i', 3: 'f'}
+
+    def read_ifd(self, buf, byteOrd, offset):
+        """
+        This function parses one image file directory.
+
+        Parameters
+        ----------
+        buf : numpy.memmap
+            the file memory mapped as bytes
+
+        byteOrd : str
+            byte order, '<' or '>'
+
+        offset : int
+            offset of the image file directory
+
+        Returns
+        -------
+        tags : dict
+            a dictionary of tag : tuple of values
+
+        next_offset : int
+            offset of the next image file directory, 0 if this is the last page
+        """
+        ned = st.unpack(byteOrd + 'H', buf[offset:offset + 2].tobytes())[0]
+        entries = buf[offset + 2:offset + 2 + 12 * ned].tobytes()
+        tags = {}
+        for i in range(ned):
+            tag, type, count = st.unpack(byteOrd + 'HHI', entries[12 * i:12 * i + 8])
+            if type not in self.field_types:
+                continue
+            fmt, size = self.field_types[type]
+            if count * size <= 4:
+                raw = entries[12 * i + 8:12 * i + 8 + count * size]
+            else:
+                value_offset = st.unpack(byteOrd + 'I', entries[12 * i + 8:12 * i + 12])[0]
+                raw = buf[value_offset:value_offset + count * size].tobytes()
+            tags[tag] = st.unpack(byteOrd + str(count) + fmt, raw)
+        next_pos = offset + 2 + 12 * ned
+        next_offset = st.unpack(byteOrd + 'I', buf[next_pos:next_pos + 4].tobytes())[0]
+        return tags, next_offset
+
+    def get_page(self, buf, byteOrd, tags):
+        """
+        This function returns image of a page described by the tags.
+
+        Parameters
+        ----------
+        buf : numpy.memmap
+            the file memory mapped as bytes
+
+        byteOrd : str
+            byte order, '<' or '>'
+
+        tags : dict
+            a dictionary of tag : tuple of values of the page
+
+        Returns
+        -------
+        image : numpy.ndarray
+            2D image, a view of the file if the page strips are contiguous, or None if the page is not supported
+        """
+        if tags.get(259, (1,))[0] != 1 or tags.get(277, (1,))[0] != 1:
+            # compressed or multi sample pages
+            return None
+        nx = tags[256][0]
+        ny = tags[257][0]
+        bits = tags.get(258, (8,))[0]
+        kind = self.sample_formats.get(tags.get(339, (1,))[0], 'u')
+        dtype = np.dtype(byteOrd + kind + str(bits // 8))
+        nbytes = nx * ny * dtype.itemsize
+
+        offsets = tags[273]
+        counts = tags.get(279, (nbytes,))
+        contiguous = all(offsets[i] + counts[i] == offsets[i + 1] for i in range(len(offsets) - 1))
+        if offsets[0] + nbytes > buf.shape[0]:
+            return None
+        if contiguous:
+            image = buf[offsets[0]:offsets[0] + nbytes]
+        else:
+            image = np.concatenate([buf[offsets[i]:offsets[i] + counts[i]] for i in range(len(offsets))])[0:nbytes]
+        return image.view(dtype).reshape(ny, nx)
+
+    def get_pages(self, filename):
+        """
+        This generator walks the pages of a tiff file.
+
+        Parameters
+        ----------
+        filename : str
+            file name
+
+        Returns
+        -------
+        image : numpy.ndarray
+            2D image of the next page, or None if the page is not supported
+        """
+        buf = np.memmap(filename, dtype=np.uint8, mode='r')
+        head = buf[0:8].tobytes()
+        if head[0:2] == b'II':
+            byteOrd = '<'
+        elif head[0:2] == b'MM':
+            byteOrd = '>'
+        else:
+            print('not a tiff file')
+            return
+        offset = st.unpack(byteOrd + 'I', head[4:8])[0]
+        while offset != 0 and offset < buf.shape[0]:
+            tags, offset = self.read_ifd(buf, byteOrd, offset)
+            yield self.get_page(buf, byteOrd, tags)
+
+    def get_frames(self, filename, batch_size=16):
+        """
+        This generator reads pages of a tiff stack in batches.
+
+        Parameters
+        ----------
+        filename : str
+            file name
+
+        batch_size : int
+            maximum number of pages in a batch
+
+        Returns
+        -------
+        batch : list
+            a list of 2D images
+        """
+        batch = []
+        for image in self.get_pages(filename):
+            if image is None:
+                print('not supported tiff page in file: ' + filename)
+                continue
+            batch.append(image)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if len(batch) > 0:
+            yield batch
+
+    def is_stack(self, filename):
+        """
+        This function checks whether the tiff file has more than one page.
+
+        Only the first image file directory is read.
+
+        Parameters
+        ----------
+        filename : str
+            file name
+
+        Returns
+        -------
+        True if the file has more than one page, False otherwise
+        """
+        if os.path.getsize(filename) < 8:
+            return False
+        buf = np.memmap(filename, dtype=np.uint8, mode='r')
+        head = buf[0:8].tobytes()
+        if head[0:2] == b'II':
+            byteOrd = '<'
+        elif head[0:2] == b'MM':
+            byteOrd = '>'
+        else:
+            return False
+        offset = st.unpack(byteOrd + 'I', head[4:8])[0]
+        if offset + 2 > len(buf):
+            return False
+        tags, next_offset = self.read_ifd(buf, byteOrd, offset)
+        return next_offset != 0
+
+    def is_complete(self, filename):
+        """
+        This function checks whether the tiff file is completely written.
+
+        The chain of image file directories is walked, and the file is complete when the chain ends and the strips
+        of all pages are within the file. No error is reported, so the function can be used to probe files that are
+        being written.
+
+        Parameters
+        ----------
+        filename : str
+            file name
+
+        Returns
+        -------
+        True if the file is complete, False otherwise
+        """
+        try:
+            if os.path.getsize(filename) < 8:
+                return False
+            buf = np.memmap(filename, dtype=np.uint8, mode='r')
+            head = buf[0:8].tobytes()
+            if head[0:2] == b'II':
+                byteOrd = '<'
+            elif head[0:2] == b'MM':
+                byteOrd = '>'
+            else:
+                return False
+            offset = st.unpack(byteOrd + 'I', head[4:8])[0]
+            pages = 0
+            visited = set()
+            while offset != 0:
+                if offset + 2 > buf.shape[0] or offset in visited:
+                    return False
+                visited.add(offset)
+                tags, offset = self.read_ifd(buf, byteOrd, offset)
+                if 273 not in tags:
+                    return False
+                counts = tags.get(279, (0,) * len(tags[273]))
+                for strip_offset, count in zip(tags[273], counts):
+                    if strip_offset + count > buf.shape[0]:
+                        return False
+                pages += 1
+            return pages > 0
+        except (IOError, OSError, ValueError, KeyError, st.error):
+            return False
+
+
+class Hdf_fr(File_reader):
+    """
+    This class streams frames from a hdf dataset.
+
+    The dataset is read in blocks of frames aligned with the dataset chunks, so every chunk is read and decompressed
+    once. The blocks are read with read_direct into a buffer that is reused for all blocks, so the frames returned by
+    this reader are views that are valid only until the next block is read; a consumer that keeps a frame longer must
+    copy it.
+    """
+
+    def __init__(self, block_bytes=64 * 2 ** 20):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        block_bytes : int
+            maximum size of a block in bytes; a block holds at least one chunk
+        """
+        self.block_bytes = int(block_bytes)
+
+    def get_cache_settings(self):
+        """
+        This function returns the chunk cache parameters for h5py.File.
+
+        The cache holds a block, so chunks shared by two blocks are not decompressed twice.
+
+        Returns
+        -------
+        dict
+            keyword parameters for h5py.File
+        """
+        return {'rdcc_nbytes': self.block_bytes, 'rdcc_nslots': 10007}
+
+    def get_block_size(self, dset):
+        """
+        This function returns number of frames in a block.
+
+        Parameters
+        ----------
+        dset : h5py.Dataset
+            a dataset with frames along the first axis
+
+        Returns
+        -------
+        int
+            number of frames, a multiple of the chunk size along the first axis
+        """
+        frame_bytes = max(1, dset.dtype.itemsize * int(np.prod(dset.shape[1:])))
+        frames = max(1, self.block_bytes // frame_bytes)
+        if dset.chunks is not None:
+            chunk_frames = dset.chunks[0]
+            frames = max(chunk_frames, frames - frames % chunk_frames)
+        return min(frames, max(1, dset.shape[0]))
+
+    def get_ranges(self, dset):
+        """
+        This generator returns chunk aligned ranges of frames of the dataset.
+
+        Parameters
+        ----------
+        dset : h5py.Dataset
+            a dataset with frames along the first axis
+
+        Returns
+        -------
+        start, n : int, int
+            index of the first frame in the block, and number of frames in the block
+        """
+        nframes = dset.shape[0]
+        block_size = self.get_block_size(dset)
+        for start in range(0, nframes, block_size):
+            yield start, min(block_size, nframes - start)
+
+    def read_block(self, dset, start, n):
+        """
+        This function reads a block of frames into a new array.
+
+        Unlike the blocks returned by get_blocks, the array is not reused, so the blocks can be read ahead.
+
+        Parameters
+        ----------
+        dset : h5py.Dataset
+            a dataset with frames along the first axis
+
+        start : int
+            index of the first frame in the block
+
+        n : int
+            number of frames in the block
+
+        Returns
+        -------
+        block : numpy.ndarray
+            the frames
+        """
+        block = np.empty((n,) + dset.shape[1:], dtype=dset.dtype)
+        dset.read_direct(block, np.s_[start:start + n], np.s_[0:n])
+        return block
+
+    def get_blocks(self, dset):
+        """
+        This generator reads the dataset in chunk aligned blocks.
+
+        Parameters
+        ----------
+        dset : h5py.Dataset
+            a dataset with frames along the first axis
+
+        Returns
+        -------
+        start, block : int, numpy.ndarray
+            index of the first frame in the block, and a view of the reused buffer holding the block
+        """
+        nframes = dset.shape[0]
+        if nframes == 0:
+            return
+        buf = np.empty((self.get_block_size(dset),) + dset.shape[1:], dtype=dset.dtype)
+        for start, n in self.get_ranges(dset):
+            dset.read_direct(buf, np.s_[start:start + n], np.s_[0:n])
+            yield start, buf[0:n]
+
+    def get_frames(self, dset):
+        """
+        This generator returns frames of the dataset one by one.
+
+        Parameters
+        ----------
+        dset : h5py.Dataset
+            a dataset with frames along the first axis
+
+        Returns
+        -------
+        frame : numpy.ndarray
+            a view of the frame in the reused buffer
+        """
+        for start, block in self.get_blocks(dset):
+            for frame in block:
+                yield frame
+
+    def follow(self, file_h5, tags, poll_period=const.FOLLOW_POLL_PERIOD, idle_timeout=const.FOLLOW_IDLE_TIMEOUT):
+        """
+        This generator reads frames of datasets that are being appended to, as they are appended.
+
+        The file should be opened in SWMR read mode. The extents of the datasets are refreshed every poll period, and
+        the new frames are read in blocks of frames. The generator finishes when none of the datasets grew for the
+        idle timeout. If the file is not opened in SWMR mode, the datasets are read once.
+
+        Parameters
+        ----------
+        file_h5 : h5py.File
+            an open hdf file
+
+        tags : list
+            a list of the datasets tags
+
+        poll_period : float
+            number of seconds between checks of the datasets extents
+
+        idle_timeout : float
+            number of seconds after which datasets that did not grow are considered complete
+
+        Returns
+        -------
+        tag, start, block : str, int, numpy.ndarray
+            the dataset tag, index of the first frame in the block, and a new array holding the block
+        """
+        read = dict((tag, 0) for tag in tags)
+        last_change = time.time()
+        while True:
+            grown = False
+            for tag in tags:
+                dset = file_h5[tag]
+                if file_h5.swmr_mode:
+                    dset.refresh()
+                nframes = dset.shape[0]
+                if nframes > read[tag]:
+                    block_size = self.get_block_size(dset)
+                    for start in range(read[tag], nframes, block_size):
+                        yield tag, start, self.read_block(dset, start, min(block_size, nframes - start))
+                    read[tag] = nframes
+                    grown = True
+            now = time.time()
+            if grown:
+                last_change = now
+            elif not file_h5.swmr_mode or now - last_change >= idle_timeout:
+                return
+            else:
+                time.sleep(poll_period)
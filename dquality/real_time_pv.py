@@ -114,6 +114,12 @@ class RT:
         consumers : dict
             a dictionary parsed from json file representing consumers
 
+        update_period : float
+            minimum number of seconds between updates of the feedback pvs
+
+        summary_period : float
+            number of seconds the failures are summarized over in the console and log feedback
+
         """
         conf = utils.get_config(config)
         if conf is None:
@@ -196,7 +202,17 @@ class RT:
         except KeyError:
             report_type = const.REPORT_FULL
 
-        return feed_args, feed_kwargs, feedback, decor_map, logger, report_type
+        try:
+            update_period = float(conf['feedback_update_period'])
+        except KeyError:
+            update_period = const.FEEDBACK_UPDATE_PERIOD
+
+        try:
+            summary_period = float(conf['feedback_summary_period'])
+        except KeyError:
+            summary_period = const.FEEDBACK_SUMMARY_PERIOD
+
+        return feed_args, feed_kwargs, feedback, decor_map, logger, report_type, update_period, summary_period
 
 
     def verify(self, config, report_file=None, sequence = None):
@@ -223,14 +239,15 @@ class RT:
         boolean
 
         """
-        feed_args, feed_kwargs, feedback, decor_map, logger, report_type = self.init(config)
+        feed_args, feed_kwargs, feedback, decor_map, logger, report_type, update_period, summary_period = \
+            self.init(config)
 
         # init the pv feedback
         if not feedback is None:
             feedbackq = Queue()
             feedback_pvs = utils.get_feedback_pvs(feed_args[1])
-            fb_args = {'feedback_pvs':feedback_pvs, 'detector':feed_kwargs['detector']}
-            feedback_obj = fb.Feedback(feedbackq, feedback, **fb_args)
+            fb_args = {'feedback_pvs':feedback_pvs, 'detector':feed_kwargs['detector'], 'update_period':update_period}
+            feedback_obj = fb.Feedback(feedbackq, feedback, summary_period, **fb_args)
             # put the logger to args
             if const.FEEDBACK_LOG in feedback:
                 feedback_obj.set_logger(logger)
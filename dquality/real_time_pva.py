@@ -54,6 +54,10 @@ plug in of area detector. The read of frame data from channel access happens on
 The change is detected with a callback. The data is passed to the consuming process.
 This module requires configuration file with the following parameters:
 'detector', a string defining the first prefix in area detector.
+'pva_name', a pvaccess channel name, or a list of channel names
+'pva_channels', optional, a json file keyed by channel name with the channel specific 'limits' and 'quality_checks'
+files
+'no_workers', optional, number of threads verifying frames, shared by all channels
 'no_frames', number of frames that will be fed
 'args', optional, list of process specific parameters, they need to be parsed to the desired format in the wrapper
 """
@@ -62,6 +66,7 @@ import json
 import signal
 import sys
 import dquality.common.utilities as utils
+import dquality.common.constants as const
 from dquality.feeds.pva_feed import Feed
 
 
@@ -90,12 +95,6 @@ def init(config):
     logger : Logger
         logger instance
 
-    limits : dictionary
-        a dictionary containing limit values read from the configured 'limit' file
-
-    quality_checks : dict
-        a dictionary containing quality check functions ids
-
     feedback : list
         a list of strings defining real time feedback of quality checks errors. Currently supporting 'PV', 'log', and
         'console'
@@ -103,12 +102,22 @@ def init(config):
     zmq_snd_port : int
         a port used to send the verified data out
 
-    pva_name : str
-        pvaccess name
+    channels : dict
+        a dictionary keyed by pvaccess channel name, the values are dictionaries with the channel 'limits' and
+        'quality_checks'
 
     detector : str
         detector name
 
+    no_workers : int
+        number of threads evaluating frames, shared by all channels
+
+    update_period : float
+        minimum number of seconds between updates of the feedback pvs
+
+    summary_period : float
+        number of seconds the failures are summarized over in the console and log feedback
+
     """
     conf = utils.get_config(config)
     if conf is None:
@@ -156,7 +165,45 @@ def init(config):
         print ('detector parameter not configured.')
         detector = None
 
-    return logger, limits, quality_checks, feedback, zmq_snd_port, pva_name, detector
+    try:
+        no_workers = int(conf['no_workers'])
+    except KeyError:
+        no_workers = 2
+
+    try:
+        update_period = float(conf['feedback_update_period'])
+    except KeyError:
+        update_period = const.FEEDBACK_UPDATE_PERIOD
+
+    try:
+        summary_period = float(conf['feedback_summary_period'])
+    except KeyError:
+        summary_period = const.FEEDBACK_SUMMARY_PERIOD
+
+    # the pva_name may be a single channel or a list of channels; by default all channels share the limits and
+    # quality checks, the optional 'pva_channels' file overrides them per channel
+    if not isinstance(pva_name, list):
+        pva_name = [pva_name]
+    channels = {}
+    for name in pva_name:
+        channels[name] = {'limits': limits, 'quality_checks': quality_checks}
+
+    channelsfile = utils.get_file(conf, 'pva_channels', logger, False)
+    if channelsfile is not None:
+        with open(channelsfile) as channels_file:
+            channels_conf = json.loads(channels_file.read())
+        for name in channels_conf:
+            channel = {'limits': limits, 'quality_checks': quality_checks}
+            channel_conf = channels_conf[name]
+            if 'limits' in channel_conf:
+                with open(channel_conf['limits']) as limits_file:
+                    channel['limits'] = json.loads(limits_file.read())
+            if 'quality_checks' in channel_conf:
+                with open(channel_conf['quality_checks']) as qc_file:
+                    channel['quality_checks'] = json.loads(qc_file.read())
+            channels[name] = channel
+
+    return logger, feedback, zmq_snd_port, channels, detector, no_workers, update_period, summary_period
 
 
 class RT:
@@ -175,9 +222,10 @@ class RT:
         none
 
         """
-        logger, limits, quality_checks, feedback, zmq_snd_port, pva_name, detector = init(config)
+        logger, feedback, zmq_snd_port, channels, detector, no_workers, update_period, summary_period = init(config)
 
-        self.feed = Feed(logger, limits, quality_checks, feedback, zmq_snd_port, pva_name, detector)
+        self.feed = Feed(logger, channels, feedback, zmq_snd_port, detector, no_workers, update_period,
+                         summary_period)
         self.feed.feed_data()
 
 
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# #########################################################################
+# Copyright (c) 2016, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2016. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+
+"""
+Please make sure the installation :ref:`pre-requisite-reference-label` are met.
+
+This module evaluates saved results of quality checks against limits. The data verifier and accumulator save the per
+frame results of the verified files in the configured 'metrics_dir' directory. This module applies a limits file to
+the saved results, without reading the data, and reports the indexes of frames that do not pass. The results of all
+frames are evaluated at once for each quality check, so changed limits can be tuned on large data sets.
+
+The results of statistical quality checks depend on which of the previous frames passed when the data was verified;
+they are evaluated as saved.
+
+"""
+
+import os
+import sys
+import json
+import glob
+import numpy as np
+import dquality.common.utilities as utils
+import dquality.common.constants as const
+import dquality.common.qualitychecks as calc
+import dquality.common.report as report
+import dquality.common.result_cache as result_cache
+
+__author__ = "Barbara Frosik"
+__copyright__ = "Copyright (c) 2016, UChicago Argonne, LLC."
+__docformat__ = 'restructuredtext en'
+__all__ = ['init',
+           'evaluate',
+           'verify']
+
+
+def init(config):
+    """
+    This function initializes variables according to configuration.
+
+    It gets values from the configuration file, evaluates and processes the values. If mandatory file or directory
+    is missing, the script logs an error and exits.
+
+    Parameters
+    ----------
+    config : str
+        configuration file name, including path
+
+    Returns
+    -------
+    logger : Logger
+        logger instance
+
+    limits : dictionary
+        a dictionary containing limit values read from the configured 'limit' file
+
+    quality_checks : dict
+        a dictionary containing quality check functions ids
+
+    """
+    conf = utils.get_config(config)
+    if conf is None:
+        print ('configuration file is missing')
+        exit(-1)
+
+    logger = utils.get_logger(__name__, conf)
+
+    limitsfile = utils.get_file(conf, 'limits', logger)
+    if limitsfile is None:
+        sys.exit(-1)
+
+    with open(limitsfile) as limits_file:
+        limits = json.loads(limits_file.read())
+
+    qcfile = utils.get_file(conf, 'quality_checks', logger)
+    if qcfile is None:
+        sys.exit(-1)
+
+    with open(qcfile) as qc_file:
+        quality_checks = json.loads(qc_file.read())
+
+    return logger, limits, quality_checks
+
+
+def evaluate(logger, metrics, limits, quality_checks):
+    """
+    This function evaluates calculated results against limits and returns indexes of frames that did not pass.
+
+    Parameters
+    ----------
+    logger : Logger
+        logger instance
+
+    metrics : dict
+        a dictionary of Metrics keyed by data type
+
+    limits : dictionary
+        a dictionary of limits keyed by data type
+
+    quality_checks : dict
+        a dictionary of quality checks lists keyed by data type
+
+    Returns
+    -------
+    bad_indexes : dict
+        a dictionary of bad indexes lists keyed by data type
+    """
+    bad_indexes = {}
+    for type in metrics:
+        if type not in quality_checks:
+            continue
+        values = metrics[type].values
+        failed = np.zeros(len(metrics[type].indexes), dtype=bool)
+        for qc in quality_checks[type]:
+            if qc not in values:
+                logger.warning('no saved results of ' + qc + ' quality check for ' + type)
+                continue
+            failed |= calc.evaluate_metrics(values[qc], limits[type][calc.limits_mapper[qc]]) != const.NO_ERROR
+        bad_indexes[type] = metrics[type].indexes[failed].tolist()
+    return bad_indexes
+
+
+def verify(conf, folder, report_file=None):
+    """
+    This function evaluates results saved in a folder against configured limits.
+
+    The bad indexes are reported by the verified file, in the order of the file names.
+
+    Parameters
+    ----------
+    conf : str
+        configuration file name, including path
+
+    folder : str
+        a directory containing saved results, i.e. the configured 'metrics_dir'
+
+    report_file : str
+        optional, a file the bad indexes are reported to
+
+    Returns
+    -------
+    bad_indexes : dict
+        a dictionary of bad indexes by data type keyed by the verified file
+    """
+    logger, limits, quality_checks = init(conf)
+    if not os.path.isdir(folder):
+        logger.error(
+            'parameter error: directory ' +
+            folder + ' does not exist')
+        sys.exit(-1)
+
+    bad_indexes = {}
+    metrics_files = sorted(glob.glob(os.path.join(folder, '*.metrics.npz')))
+    for metrics_file in metrics_files:
+        try:
+            metrics, file = result_cache.load_metrics(metrics_file)
+        except (IOError, OSError, ValueError, KeyError):
+            logger.error('cannot read results from file ' + metrics_file)
+            continue
+        if file is None:
+            file = metrics_file
+        bad_indexes[file] = evaluate(logger, metrics, limits, quality_checks)
+
+    logger.info('evaluated results of ' + str(len(metrics_files)) + ' files')
+    if report_file is not None:
+        try:
+            with open(report_file, 'w') as rf:
+                report.report_bad_indexes(bad_indexes, rf)
+        except IOError:
+            logger.warning('Cannot open report file')
+
+    return bad_indexes
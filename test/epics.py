@@ -1,9 +1,45 @@
 # stub for testing
 
 class PV:
+    # PV name : value, the PVs that are not listed have value 4.0, and the PVs with None value do not connect
+    values = {}
+    created = 0
 
     def __init__(self, name):
         self.name = name
+        self.connected = self.values.get(name, 4.0) is not None
+        self.callbacks = {}
+        self.connection_callbacks = []
+        PV.created += 1
 
-    def get(self):
-        return 4.0
+    def get(self, timeout=None):
+        return self.values.get(self.name, 4.0)
+
+    def add_callback(self, callback, run_now=False):
+        index = len(self.callbacks) + 1
+        self.callbacks[index] = callback
+        if run_now and self.connected:
+            callback(pvname=self.name, value=self.get())
+        return index
+
+    def remove_callback(self, index):
+        self.callbacks.pop(index, None)
+
+    def put(self, value):
+        # the monitors are called as if the value changed in the ioc
+        PV.values[self.name] = value
+        for callback in list(self.callbacks.values()):
+            callback(pvname=self.name, value=value)
+
+    def set_connected(self, conn):
+        self.connected = conn
+        for callback in self.connection_callbacks:
+            callback(pvname=self.name, conn=conn)
+
+
+# pv name, value of the puts, in order
+puts = []
+
+
+def caput(pvname, value, wait=False):
+    puts.append((pvname, value))
@@ -148,3 +148,41 @@ def test_no_limit():
     time.sleep(1)
     assert res.is_text_in_file(logfile, 'configuration error: file test/schemas/limitsx.json does not exist')
     clean()
+
+
+def test_read_files_blocks():
+    import logging
+    import tempfile
+    import threading
+    import queue
+    import h5py
+    import numpy as np
+
+    dir = tempfile.mkdtemp()
+    file = os.path.join(dir, 'blocks.h5')
+    data = np.arange(10 * 4 * 4, dtype='u2').reshape(10, 4, 4)
+    with h5py.File(file, 'w') as fp:
+        fp.create_dataset('/exchange/data_white', data=data, chunks=(1, 4, 4))
+
+    filesq = queue.Queue()
+    blockq = queue.Queue(1)
+    reader = threading.Thread(target=acc.read_files,
+                              args=(logging.getLogger(__name__), filesq, blockq, data_type, 3 * data[0].nbytes))
+    reader.start()
+    filesq.put(file)
+    filesq.put(file + 'x')
+    filesq.put(None)
+
+    blocks = []
+    while True:
+        block = blockq.get()
+        if block is None:
+            break
+        blocks.append(block)
+    reader.join()
+    shutil.rmtree(dir)
+
+    assert [b[2] for b in blocks[:-1]] == [0, 3, 6, 9]
+    assert np.array_equal(np.concatenate([b[3] for b in blocks[:-1]]), data)
+    assert blocks[-1][0] == file + 'x'
+    assert blocks[-1][3] is None
@@ -0,0 +1,57 @@
+import sys
+import time
+import logging
+import test.epics
+
+# the feedback is verified with the epics stub, if pyepics is not installed
+sys.modules.setdefault('epics', test.epics)
+import dquality.common.constants as const
+import dquality.clients.fb_client.simple_feedback as fb
+from dquality.common.containers import Result, Results
+from dquality.clients.fb_client.summary import FailureSummary
+
+
+def failed(index, res):
+    return Results('data', index, True, {'mean': Result(res, 'mean', -1)})
+
+
+def test_pv_coalesced():
+    del test.epics.puts[:]
+    feedback = fb.Feedback([const.FEEDBACK_PV], 'det', {'data': ['mean']}, logging.getLogger(__name__),
+                           update_period=0.2)
+    assert test.epics.puts == [('det:data_mean_ctr', 0)]
+    del test.epics.puts[:]
+    # the first failure is written, the following ones are coalesced until the update period passes
+    for index in range(100):
+        feedback.deliver(failed(index, index))
+    assert test.epics.puts == [('det:data_mean_res', 0), ('det:data_mean_ctr', 1)]
+    time.sleep(0.4)
+    assert test.epics.puts[2:] == [('det:data_mean_res', 99), ('det:data_mean_ctr', 100)]
+    feedback.deliver(failed(100, 100))
+    feedback.flush()
+    assert test.epics.puts[-2:] == [('det:data_mean_res', 100), ('det:data_mean_ctr', 101)]
+    assert len(test.epics.puts) == 6
+
+
+def test_summary():
+    messages = []
+    summary = FailureSummary(messages.append, period=5)
+    # the first failure is reported immediately
+    summary.add('data', 1200, 'mean', 1.0, now=100.0)
+    assert messages == ['failed frame 1200 result of mean is 1.0']
+    for index in range(1201, 2012):
+        summary.add('data', index, 'mean', 2.0, now=101.0)
+    summary.add('data', 7, 'st_dev', 3.0, now=101.0)
+    summary.check(now=104.0)
+    assert len(messages) == 2
+    summary.check(now=105.0)
+    assert messages[2] == 'data mean failed on 812 frames in last 5 s, idx 1200-2011, last result is 2.0'
+    # the continuing failure is summarized in the next window
+    summary.add('data', 2012, 'mean', 2.0, now=106.0)
+    summary.check(now=110.0)
+    assert messages[3].startswith('data mean failed on 1 frames')
+    summary.check(now=120.0, force=True)
+    assert len(messages) == 4
+    # the check did not fail in the last window, the next failure is reported immediately
+    summary.add('data', 3000, 'mean', 2.0, now=121.0)
+    assert messages[4] == 'failed frame 3000 result of mean is 2.0'
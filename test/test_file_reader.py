@@ -0,0 +1,257 @@
+import os
+import time
+import threading
+import multiprocessing
+import struct as st
+import numpy as np
+import dquality.readers.file_reader as freader
+
+
+def write_ge(file, frames, nframes=None):
+    if nframes is None:
+        nframes = frames.shape[0]
+    with open(file, 'wb') as f:
+        header = bytearray(8192)
+        header[18:24] = st.pack('<ih', frames.shape[1], nframes)
+        f.write(header)
+        f.write(frames.astype('<u2').tobytes())
+
+
+def test_ge_frames(tmpdir):
+    file = os.path.join(str(tmpdir), 'test.ge4')
+    frames = np.arange(3 * 2048 * 2048, dtype=np.uint32).reshape(3, 2048, 2048).astype(np.uint16)
+    write_ge(file, frames)
+
+    reader = freader.Ge_fr()
+    mapped = reader.get_frames(file)
+    assert mapped.shape == (3, 2048, 2048)
+    assert mapped.dtype == np.uint16
+    assert np.array_equal(reader.get_frame(file, 2), frames[2])
+
+    batches = list(reader.get_batches(mapped, 2))
+    assert [start for start, batch in batches] == [0, 2]
+    assert batches[1][1].shape == (1, 2048, 2048)
+    assert np.array_equal(batches[0][1], frames[0:2])
+
+
+def test_ge_corrupted(tmpdir):
+    file = os.path.join(str(tmpdir), 'test.ge4')
+    frames = np.zeros((2, 2048, 2048), dtype=np.uint16)
+    write_ge(file, frames, nframes=3)
+
+    assert freader.Ge_fr().get_frames(file) is None
+
+
+def write_tif(file, image):
+    # minimal little endian tiff as written by the GE detector: pixels at offset 8, directory after the pixels
+    ny, nx = image.shape
+    pixels = image.astype('<u2').tobytes()
+    software = b'GE detector\x00'
+    ifd_offset = 8 + len(pixels) + len(software)
+    entries = [(256, 4, 1, st.pack('<i', nx)),
+               (257, 4, 1, st.pack('<i', ny)),
+               (258, 3, 1, st.pack('<hh', 16, 0)),
+               (272, 2, len(software), st.pack('<i', 8 + len(pixels))),
+               (273, 4, 1, st.pack('<i', 8))]
+    with open(file, 'wb') as f:
+        f.write(b'II' + st.pack('<hi', 42, ifd_offset))
+        f.write(pixels)
+        f.write(software)
+        f.write(st.pack('<h', len(entries)))
+        for tag, type, count, value in entries:
+            f.write(st.pack('<Hhi', tag, type, count) + value)
+        f.write(st.pack('<i', 0))
+
+
+def test_tif_layout_cache(tmpdir):
+    reader = freader.Tif_fr()
+    reader.layouts.clear()
+    images = []
+    for i in range(2):
+        file = os.path.join(str(tmpdir), 'test_' + str(i) + '.tif')
+        image = (np.arange(64 * 32) + i).reshape(32, 64).astype(np.uint16)
+        write_tif(file, image)
+        images.append((file, image))
+
+    for file, image in images:
+        frame = reader.get_frame(file)
+        assert frame.dtype == np.uint16
+        assert frame.shape == (32, 64)
+        assert np.array_equal(frame, image)
+    # both files have the same detector signature
+    assert len(reader.layouts) == 1
+
+
+def test_tif_truncated(tmpdir):
+    file = os.path.join(str(tmpdir), 'test.tif')
+    write_tif(file, np.zeros((32, 64), dtype=np.uint16))
+    with open(file, 'r+b') as f:
+        f.truncate(100)
+    assert freader.Tif_fr().get_frame(file) is None
+
+
+def write_stack(file, images, strips=1):
+    # little endian multi-page tiff, each page stored in strips followed by its directory
+    with open(file, 'wb') as f:
+        f.write(b'II' + st.pack('<hI', 42, 0))
+        next_pos = 4
+        for image in images:
+            ny, nx = image.shape
+            rows = ny // strips
+            offsets = []
+            counts = []
+            for i in range(strips):
+                # a gap between strips, so they are not contiguous
+                f.write(b'\x00\x00')
+                offsets.append(f.tell())
+                strip = image[i * rows:(i + 1) * rows].astype('<u2').tobytes()
+                counts.append(len(strip))
+                f.write(strip)
+            if strips > 1:
+                values_pos = f.tell()
+                f.write(st.pack('<' + str(strips) + 'I', *offsets))
+                f.write(st.pack('<' + str(strips) + 'I', *counts))
+                offsets_value = st.pack('<I', values_pos)
+                counts_value = st.pack('<I', values_pos + 4 * strips)
+            else:
+                offsets_value = st.pack('<I', offsets[0])
+                counts_value = st.pack('<I', counts[0])
+            entries = [(256, 4, 1, st.pack('<I', nx)),
+                       (257, 4, 1, st.pack('<I', ny)),
+                       (258, 3, 1, st.pack('<HH', 16, 0)),
+                       (259, 3, 1, st.pack('<HH', 1, 0)),
+                       (273, 4, strips, offsets_value),
+                       (279, 4, strips, counts_value)]
+            ifd_pos = f.tell()
+            f.seek(next_pos)
+            f.write(st.pack('<I', ifd_pos))
+            f.seek(ifd_pos)
+            f.write(st.pack('<H', len(entries)))
+            for tag, type, count, value in entries:
+                f.write(st.pack('<HHI', tag, type, count) + value)
+            next_pos = f.tell()
+            f.write(st.pack('<I', 0))
+
+
+def test_tif_stack(tmpdir):
+    file = os.path.join(str(tmpdir), 'stack.tif')
+    images = [(np.arange(40 * 30) * (i + 1)).reshape(30, 40).astype(np.uint16) for i in range(5)]
+    write_stack(file, images)
+
+    reader = freader.Tif_stack_fr()
+    assert reader.is_stack(file)
+    batches = list(reader.get_frames(file, batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    frames = [frame for batch in batches for frame in batch]
+    for frame, image in zip(frames, images):
+        assert frame.dtype == np.uint16
+        assert np.array_equal(frame, image)
+
+
+def test_tif_stack_strips(tmpdir):
+    file = os.path.join(str(tmpdir), 'strips.tif')
+    image = np.arange(40 * 30).reshape(30, 40).astype(np.uint16)
+    write_stack(file, [image], strips=3)
+
+    reader = freader.Tif_stack_fr()
+    assert not reader.is_stack(file)
+    frames = [frame for batch in reader.get_frames(file) for frame in batch]
+    assert len(frames) == 1
+    assert np.array_equal(frames[0], image)
+
+
+def test_hdf_blocks(tmpdir):
+    import h5py
+    file = os.path.join(str(tmpdir), 'test.h5')
+    frames = np.arange(10 * 16 * 16).reshape(10, 16, 16).astype(np.uint16)
+    with h5py.File(file, 'w') as f:
+        f.create_dataset('/exchange/data', data=frames, chunks=(3, 16, 16), compression='gzip')
+
+    # a block of 7 frames is rounded down to 2 chunks
+    reader = freader.Hdf_fr(block_bytes=7 * 16 * 16 * 2)
+    with h5py.File(file, 'r', **reader.get_cache_settings()) as f:
+        dset = f['/exchange/data']
+        assert reader.get_block_size(dset) == 6
+        starts = [start for start, block in reader.get_blocks(dset)]
+        assert starts == [0, 6]
+        read = [frame.copy() for frame in reader.get_frames(dset)]
+        assert list(reader.get_ranges(dset)) == [(0, 6), (6, 4)]
+        block = reader.read_block(dset, 6, 4)
+    assert np.array_equal(np.array(read), frames)
+    assert np.array_equal(block, frames[6:])
+
+
+def write_swmr(file, frames, types, ready, delay=0.02):
+    import h5py
+    with h5py.File(file, 'w', libver='latest') as f:
+        dsets = [f.create_dataset('/exchange/' + type, shape=(0,) + frames.shape[1:], maxshape=(None,) + frames.shape[1:],
+                                  dtype=frames.dtype, chunks=(1,) + frames.shape[1:]) for type in types]
+        f.swmr_mode = True
+        ready.set()
+        for i in range(len(frames)):
+            for dset in dsets:
+                dset.resize(i + 1, axis=0)
+                dset[i] = frames[i]
+                dset.flush()
+            time.sleep(delay)
+
+
+def test_hdf_follow(tmpdir):
+    import h5py
+    file = os.path.join(str(tmpdir), 'test.h5')
+    frames = np.arange(20 * 8 * 8).reshape(20, 8, 8).astype(np.uint16)
+
+    # the frames are appended by another process while the file is followed
+    ready = multiprocessing.Event()
+    writer = multiprocessing.Process(target=write_swmr, args=(file, frames, ['data'], ready))
+    writer.start()
+    ready.wait()
+    reader = freader.Hdf_fr()
+    read = []
+    with h5py.File(file, 'r', libver='latest', swmr=True) as f:
+        for tag, start, block in reader.follow(f, ['/exchange/data'], poll_period=0.01, idle_timeout=0.5):
+            assert start == len(read)
+            read.extend(block)
+    writer.join()
+    assert np.array_equal(np.array(read), frames)
+
+    # a file that is not written in SWMR mode is read once
+    with h5py.File(file, 'r') as f:
+        blocks = list(reader.follow(f, ['/exchange/data'], poll_period=0.01, idle_timeout=10))
+    assert sum(len(block) for tag, start, block in blocks) == len(frames)
+
+
+def test_ge_follow(tmpdir):
+    file = os.path.join(str(tmpdir), 'test.ge4')
+    frames = np.arange(4 * 2048 * 2048, dtype=np.uint32).reshape(4, 2048, 2048).astype(np.uint16)
+    write_ge(file, frames[0:0], 4)
+
+    def append():
+        # the frames are written in parts
+        for frame in frames:
+            data = frame.astype('<u2').tobytes()
+            with open(file, 'ab') as f:
+                f.write(data[:1000])
+            time.sleep(0.02)
+            with open(file, 'ab') as f:
+                f.write(data[1000:])
+
+    writer = threading.Thread(target=append)
+    writer.start()
+    reader = freader.Ge_fr()
+    read = []
+    for start, batch in reader.follow(file, poll_period=0.005, idle_timeout=5):
+        assert start == len(read)
+        read.extend(np.array(batch))
+    writer.join()
+    # the follow finished when the number of frames in the header was reached
+    assert np.array_equal(np.array(read), frames)
+
+    # a file closed with an incomplete frame is finished after the idle timeout
+    write_ge(file, frames[0:1], 3)
+    with open(file, 'ab') as f:
+        f.write(b'x' * 10)
+    messages = []
+    reader.error = messages.append
+    assert len(list(reader.follow(file, poll_period=0.01, idle_timeout=0.1))) == 1
+    assert 'incomplete frame' in messages[0]
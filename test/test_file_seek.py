@@ -0,0 +1,221 @@
+import os
+import time
+import shutil
+import numpy as np
+import dquality.common.constants as const
+from dquality.common.file_seek import DirectoryIndex, CompletionTracker, FileSeek, FileValidatorHdf, \
+    FileValidatorTif, get_validator
+from test.test_file_reader import write_ge, write_stack
+
+
+def write(file, data=b'x'):
+    with open(file, 'ab') as f:
+        f.write(data)
+
+
+def age(path, t=1500000000):
+    # pretend the path was modified in the past, so it is settled
+    os.utime(path, (t, t))
+
+
+def test_incremental_scan(tmpdir):
+    folder = str(tmpdir)
+    sub = os.path.join(folder, 'sub')
+    os.makedirs(sub)
+    write(os.path.join(folder, 'a.h5'))
+    write(os.path.join(folder, 'a.txt'))
+    write(os.path.join(sub, 'b.h5'))
+    for path in (os.path.join(folder, 'a.h5'), os.path.join(sub, 'b.h5'), sub, folder):
+        age(path)
+
+    index = DirectoryIndex(['.h5'])
+    assert index.scan(folder) == [os.path.join(folder, 'a.h5'), os.path.join(sub, 'b.h5')]
+    assert len(index) == 2
+    assert len(index.watched) == 0
+
+    # nothing changed, the settled directories are not listed
+    listed = index.listed_dirs
+    assert index.scan(folder) == []
+    assert index.listed_dirs == listed
+    assert index.skipped_dirs == 2
+
+    # a new file changes the directory
+    new_file = os.path.join(sub, 'c.h5')
+    write(new_file)
+    assert index.scan(folder) == [new_file]
+    assert new_file in index.watched
+
+    # a file being written is found without listing the directory
+    age(sub)
+    index.dirs[sub] = (os.stat(sub).st_mtime, [])
+    write(new_file, b'more')
+    assert index.scan(folder) == [new_file]
+    assert index.scan(folder) == []
+
+
+def test_full_scan_finds_settled_change(tmpdir):
+    folder = str(tmpdir)
+    file = os.path.join(folder, 'a.h5')
+    write(file)
+    age(file)
+    age(folder)
+    index = DirectoryIndex(['.h5'])
+    index.scan(folder)
+
+    # a settled file is rewritten, the directory does not change
+    write(file, b'rewritten')
+    age(file, 1500000005)
+    age(folder)
+    assert index.scan(folder) == []
+    assert index.scan(folder, full=True) == [file]
+
+
+def test_removed_directory(tmpdir):
+    folder = str(tmpdir)
+    sub = os.path.join(folder, 'sub')
+    os.makedirs(sub)
+    write(os.path.join(sub, 'b.h5'))
+    index = DirectoryIndex(['.h5'])
+    index.scan(folder)
+    assert len(index) == 1
+
+    shutil.rmtree(sub)
+    assert index.scan(folder) == []
+    assert len(index) == 0
+    assert sub not in index.dirs
+    assert len(index.watched) == 0
+
+
+def test_completion_stable_window(tmpdir):
+    file = os.path.join(str(tmpdir), 'a.dat')
+    write(file)
+    tracker = CompletionTracker(stable_time=2.0)
+    tracker.add(file, now=100.0)
+    assert tracker.check(now=101.0) == []
+    # the file grows, the window restarts
+    write(file, b'more')
+    assert tracker.check(now=101.5) == []
+    assert tracker.check(now=103.0) == []
+    assert tracker.check(now=103.6) == [file]
+    # each version of the file is reported once
+    tracker.add(file, now=104.0)
+    assert tracker.check(now=110.0) == []
+    assert tracker.closed(file) == []
+
+
+def test_completion_probe(tmpdir):
+    file = os.path.join(str(tmpdir), 'a.ge4')
+    frames = np.zeros((2, 2048, 2048), dtype=np.uint16)
+    # the header announces two frames, only one is written
+    write_ge(file, frames[0:1], 2)
+    tracker = CompletionTracker(get_validator(const.FILE_TYPE_GE), stable_time=0, give_up_time=10.0)
+    assert tracker.closed(file) == []
+    assert tracker.check(now=time.time() + 1) == []
+    write(file, frames[1].tobytes())
+    assert tracker.closed(file) == [file]
+
+    # a file that never completes is dropped
+    bad = os.path.join(str(tmpdir), 'b.ge4')
+    write_ge(bad, frames[0:1], 2)
+    tracker.add(bad)
+    assert tracker.check(now=time.time() + 20) == []
+    assert bad not in tracker.pending
+
+
+def test_completion_validators(tmpdir):
+    import h5py
+    tif = os.path.join(str(tmpdir), 'a.tif')
+    write_stack(tif, [np.zeros((8, 8), dtype=np.uint16)] * 3)
+    assert FileValidatorTif().is_valid(tif)
+    size = os.path.getsize(tif)
+    with open(tif, 'r+b') as f:
+        f.truncate(size - 200)
+    assert not FileValidatorTif().is_valid(tif)
+
+    h5 = os.path.join(str(tmpdir), 'a.h5')
+    with h5py.File(h5, 'w') as f:
+        f.create_dataset('/exchange/data', data=np.zeros((4, 64, 64)))
+    assert FileValidatorHdf().is_valid(h5)
+    with open(h5, 'r+b') as f:
+        f.truncate(os.path.getsize(h5) // 2)
+    assert not FileValidatorHdf().is_valid(h5)
+
+
+def test_seek_close_write(tmpdir):
+    import logging
+    import queue
+    folder = str(tmpdir)
+    q = queue.Queue()
+    seek = FileSeek(q, 10, logging.getLogger(__name__), const.FILE_TYPE_TIF)
+    seek.start_observing(folder, ['.tif'])
+    try:
+        if seek.notifier is None:
+            return
+        file = os.path.join(folder, 'a.tif')
+        write_stack(file, [np.zeros((8, 8), dtype=np.uint16)] * 2)
+        # reported on close, before the polling period
+        assert q.get(timeout=5) == file
+        seek.poll_file_system(folder, ['.tif'])
+        time.sleep(0.2)
+        assert q.empty()
+    finally:
+        seek.stop_observing()
+
+
+def test_seek_polling(tmpdir):
+    import logging
+    import queue
+    folder = str(tmpdir)
+    q = queue.Queue()
+    seek = FileSeek(q, 0.1, logging.getLogger(__name__), const.FILE_TYPE_TIF, stable_time=0.2, use_inotify=False)
+    seek.start_observing(folder, ['.tif'])
+    try:
+        file = os.path.join(folder, 'a.tif')
+        write_stack(file, [np.zeros((8, 8), dtype=np.uint16)] * 2)
+        assert q.get(timeout=5) == file
+        assert seek.job.polls > 1
+        time.sleep(0.5)
+        assert q.empty()
+    finally:
+        seek.stop_observing()
+
+
+def test_seek_resume(tmpdir):
+    import logging
+    import queue
+    from dquality.common.journal import Journal
+    folder = os.path.join(str(tmpdir), 'data')
+    os.makedirs(folder)
+    files = [os.path.join(folder, name) for name in ('a.tif', 'b.tif')]
+    for file in files:
+        write_stack(file, [np.zeros((8, 8), dtype=np.uint16)])
+    journal = Journal(os.path.join(str(tmpdir), 'journal.db'))
+    journal.record(files[0], 'passed')
+
+    # the existing file not in the journal is reported on start
+    q = queue.Queue()
+    seek = FileSeek(q, 0.1, logging.getLogger(__name__), const.FILE_TYPE_TIF, stable_time=0.1, use_inotify=False,
+                    journal=journal)
+    seek.start_observing(folder, ['.tif'])
+    try:
+        assert q.get(timeout=5) == files[1]
+        time.sleep(0.5)
+        assert q.empty()
+    finally:
+        seek.stop_observing()
+        journal.close()
+
+
+def test_completion_follow(tmpdir):
+    import h5py
+    file = os.path.join(str(tmpdir), 'a.h5')
+    with h5py.File(file, 'w', libver='latest') as f:
+        f.create_dataset('/exchange/data', data=np.zeros((2, 8, 8)))
+    tracker = CompletionTracker(get_validator(const.FILE_TYPE_HDF, True), stable_time=2.0, follow=True)
+    # the file is reported without waiting until it is stable, and only once while it grows
+    tracker.add(file, now=100.0)
+    assert tracker.check(now=100.0) == [file]
+    write(file, b'more')
+    tracker.add(file, now=101.0)
+    assert tracker.check(now=110.0) == []
+    assert tracker.closed(file) == []
@@ -0,0 +1,31 @@
+import os
+import numpy as np
+import dquality.common.constants as const
+import dquality.frame_monitor_polling as fmonitor
+from test.test_file_reader import write_tif, write_stack
+
+
+limits = {'data': {'pix_sat': {'low_limit': 0, 'high_limit': 50},
+                   'diff_sat': {'low_limit': 0, 'high_limit': 0}}}
+quality_checks = {'data': ['diff_sat']}
+
+
+def test_diff_sat_across_workers(tmpdir):
+    files = [os.path.join(str(tmpdir), name) for name in ('a.tif', 'b.tif', 'c.tif')]
+    write_tif(files[0], np.zeros((8, 8), dtype=np.uint16))
+    write_tif(files[1], np.full((8, 8), 100, dtype=np.uint16))
+    write_stack(files[2], [np.full((8, 8), 100, dtype=np.uint16)] * 3)
+
+    fmonitor.init_worker(const.FILE_TYPE_TIF, limits, quality_checks)
+    # the first frame of a file is compared with the last frame of the preceding file
+    assert fmonitor.verify_file((files[1], files[0])) == (True, 1)
+    assert fmonitor.verify_file((files[2], files[1])) == (False, 3)
+    assert fmonitor.verify_file((files[1], None)) == (False, 1)
+
+
+def test_unreadable_file(tmpdir):
+    file = os.path.join(str(tmpdir), 'bad.tif')
+    with open(file, 'wb') as f:
+        f.write(b'II*\x00')
+    fmonitor.init_worker(const.FILE_TYPE_TIF, limits, quality_checks)
+    assert fmonitor.verify_file((file, None)) == (True, 0)
@@ -158,3 +158,43 @@ def test_struct_no_missing():
     assert res.is_text_in_file(logfile, 'All required tags exist and meet conditions')
     clean
 
+
+
+def write_hdf(file, theta_units):
+    import h5py
+    import numpy as np
+    with h5py.File(file, 'w') as fp:
+        for name in ('data', 'data_dark', 'data_white'):
+            dset = fp.create_dataset('/exchange/' + name, data=np.zeros((2, 4, 4), dtype='u2'))
+            dset.attrs['units'] = 'counts'
+        theta = fp.create_dataset('/exchange/theta', data=np.zeros(2))
+        theta.attrs['units'] = theta_units
+
+
+def test_verify_files():
+    import json
+    import tempfile
+    dir = tempfile.mkdtemp()
+    required_tags = {'/exchange/data*': {'dim': [2, 4, 4], 'units': 'counts'},
+                     '/exchange/theta': {'dim': [2], 'units': 'degrees'}}
+    with open(os.path.join(dir, 'tags.json'), 'w') as fp:
+        json.dump(required_tags, fp)
+    config = os.path.join(dir, 'dqconfig.ini')
+    with open(config, 'w') as fp:
+        fp.write("'schema' = " + os.path.join(dir, 'tags.json') + "\n")
+        fp.write("'verification_type' = hdf_structure\n")
+        fp.write("'no_workers' = 2\n")
+        fp.write("'log_file' = " + os.path.join(dir, 'default.log') + "\n")
+    for i in range(4):
+        write_hdf(os.path.join(dir, 'scan_%d.h5' % i), 'radians' if i == 2 else 'degrees')
+
+    report_file = os.path.join(dir, 'hdf.report')
+    results = hdf.verify_files(config, [os.path.join(dir, 'scan_*.h5'), os.path.join(dir, 'missing.h5')], report_file)
+    assert list(results.keys()) == [os.path.join(dir, 'scan_%d.h5' % i) for i in range(4)] + \
+        [os.path.join(dir, 'missing.h5')]
+    assert [results[file] for file in results] == [True, True, False, True, False]
+    with open(report_file) as fp:
+        report = fp.read()
+    assert 'should be units:degrees' in report
+    assert 'scan_1.h5' not in report
+    shutil.rmtree(dir)
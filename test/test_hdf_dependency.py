@@ -0,0 +1,57 @@
+import os
+import json
+import shutil
+import tempfile
+import logging
+import h5py
+import numpy as np
+import dquality.hdf_dependency as dep
+
+
+dependencies = {'equal': [['/exchange/data dim 2', '/exchange/data_dark dim 2',
+                           '/measurement/instrument/detector/dimension_x'],
+                          ['/exchange/data dim 0', '/exchange/theta dim 0']],
+                'less_or_equal': [['/exchange/data dim 2', '/measurement/instrument/detector/roi/x2']]}
+
+
+def write_file(dir, theta_len):
+    file = os.path.join(dir, 'test.h5')
+    with h5py.File(file, 'w') as fp:
+        fp.create_dataset('/exchange/data', data=np.zeros((4, 3, 8), dtype='u2'))
+        fp.create_dataset('/exchange/data_dark', data=np.zeros((2, 3, 8), dtype='u2'))
+        fp.create_dataset('/exchange/theta', data=np.zeros(theta_len))
+        fp.create_dataset('/measurement/instrument/detector/dimension_x', data=8)
+        fp.create_dataset('/measurement/instrument/detector/roi/x2', data=8)
+    return file
+
+
+def test_plan():
+    tags, rules = dep.get_plan(dependencies)
+    assert len(rules) == 3
+    # the tags shared by rules are found once
+    assert len(tags) == 6
+    assert tags.count('/exchange/data dim 2') == 1
+
+
+def test_verify():
+    dir = tempfile.mkdtemp()
+    config = os.path.join(dir, 'dqconfig.ini')
+    with open(os.path.join(dir, 'dependencies.json'), 'w') as fp:
+        json.dump(dependencies, fp)
+    with open(config, 'w') as fp:
+        fp.write("'dependencies' = " + os.path.join(dir, 'dependencies.json') + "\n")
+        fp.write("'log_file' = " + os.path.join(dir, 'default.log') + "\n")
+
+    assert dep.verify(config, write_file(dir, 4))
+    assert not dep.verify(config, write_file(dir, 5))
+    shutil.rmtree(dir)
+
+
+def test_missing_tag():
+    dir = tempfile.mkdtemp()
+    file = write_file(dir, 4)
+    logger = logging.getLogger(__name__)
+    assert dep.verify_list(file, ['/exchange/data dim 0', '/exchange/theta dim 0'], 'equal', logger)
+    assert not dep.verify_list(file, ['/exchange/data dim 0', '/exchange/missing dim 0'], 'equal', logger)
+    assert not dep.verify_list(file, ['/exchange/missing dim 0', '/exchange/data dim 0'], 'equal', logger)
+    shutil.rmtree(dir)
@@ -0,0 +1,48 @@
+import os
+from dquality.common.journal import Journal
+
+
+def write(file, data=b'x'):
+    with open(file, 'ab') as f:
+        f.write(data)
+
+
+def test_record(tmpdir):
+    folder = os.path.join(str(tmpdir), 'data')
+    os.makedirs(folder)
+    file = os.path.join(folder, 'a.h5')
+    write(file)
+    journal = Journal(os.path.join(str(tmpdir), 'journal.db'))
+    st = os.stat(file)
+    assert not journal.is_processed(file, st.st_size, st.st_mtime)
+    journal.record(file, 'failed', {'data': [0, 3]})
+    assert journal.is_processed(file, st.st_size, st.st_mtime)
+
+    # a rewritten file is not processed
+    write(file, b'more')
+    st = os.stat(file)
+    assert not journal.is_processed(file, st.st_size, st.st_mtime)
+    journal.close()
+
+
+def test_resume(tmpdir):
+    folder = os.path.join(str(tmpdir), 'data')
+    other = os.path.join(str(tmpdir), 'data2')
+    os.makedirs(folder)
+    os.makedirs(other)
+    files = [os.path.join(folder, name) for name in ('b.h5', 'a.h5')] + [os.path.join(other, 'c.h5')]
+    journal_file = os.path.join(str(tmpdir), 'journal.db')
+    journal = Journal(journal_file)
+    for file in files:
+        write(file)
+        journal.record(file, 'passed', {'data': []})
+    journal.close()
+
+    # the journal is read after restart; the results are in order of verification
+    journal = Journal(journal_file)
+    processed = journal.get_processed(folder)
+    assert list(processed.keys()) == files[0:2]
+    assert processed[files[0]] == ('passed', {'data': []})
+    st = os.stat(files[2])
+    assert journal.is_processed(files[2], st.st_size, st.st_mtime)
+    journal.close()
@@ -0,0 +1,84 @@
+import os
+import time
+import tempfile
+import threading
+import dquality.common.pipeline as pipeline
+
+
+def test_prefetch_order():
+    def load(item):
+        # later items are loaded faster, the order must be kept anyway
+        time.sleep(0.01 * (5 - item))
+        return item * 10
+
+    prefetcher = pipeline.Prefetcher(load, depth=3, no_workers=3)
+    results = list(prefetcher.map(range(5)))
+    prefetcher.close()
+    assert results == [(i, i * 10) for i in range(5)]
+    stats = prefetcher.get_stats()
+    assert stats['hits'] + stats['misses'] == 5
+
+
+def test_prefetch_depth():
+    loading = []
+    lock = threading.Lock()
+
+    def load(item):
+        with lock:
+            loading.append(item)
+        return item
+
+    prefetcher = pipeline.Prefetcher(load, depth=2, no_workers=2)
+    for i in range(6):
+        prefetcher.put(i)
+    assert len(prefetcher) == 6
+    time.sleep(0.1)
+    # only the read-ahead depth is loaded before the items are taken
+    assert sorted(loading) == [0, 1]
+    assert prefetcher.get() == (0, 0)
+    time.sleep(0.1)
+    assert sorted(loading) == [0, 1, 2]
+    prefetcher.close()
+
+
+def test_prefetch_stall():
+    prefetcher = pipeline.Prefetcher(lambda item: time.sleep(0.05), depth=1, no_workers=1)
+    prefetcher.put(0)
+    prefetcher.get()
+    prefetcher.put(1)
+    time.sleep(0.1)
+    prefetcher.get()
+    prefetcher.close()
+    stats = prefetcher.get_stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+    assert stats['stall_time'] > 0
+
+
+def test_prefetch_error():
+    def load(item):
+        if item == 1:
+            raise IOError('cannot read')
+        return item
+
+    prefetcher = pipeline.Prefetcher(load)
+    prefetcher.put(0)
+    prefetcher.put(1)
+    prefetcher.put(2)
+    assert prefetcher.get() == (0, 0)
+    try:
+        prefetcher.get()
+        assert False
+    except IOError:
+        pass
+    assert prefetcher.get() == (2, 2)
+    prefetcher.close()
+
+
+def test_readahead():
+    fd, file = tempfile.mkstemp()
+    os.write(fd, b'x' * 1000)
+    os.close(fd)
+    assert pipeline.readahead(file) == 1000
+    os.remove(file)
+    assert pipeline.readahead(file) is None
@@ -0,0 +1,64 @@
+import sys
+import logging
+import test.epics
+
+# the pv module is verified with the epics stub, if pyepics is not installed
+sys.modules.setdefault('epics', test.epics)
+import dquality.pv as pv
+
+
+def test_read_pvs():
+    test.epics.PV.values = {'a': 1.0, 'b': None}
+    pv.connections.clear()
+    created = test.epics.PV.created
+    values = pv.read_pvs(['a', 'b', 'c'], timeout=0.1)
+    assert values['a'][0] == 1.0
+    assert values['c'][0] == 4.0
+    # the PV that did not connect has no value, and waited for the timeout
+    assert values['b'][0] is None
+    assert values['b'][1] >= 0.1
+    assert values['a'][1] < 0.1
+    # the connections are reused
+    assert pv.read('a') == 1.0
+    pv.read_pvs(['a', 'b', 'c'], timeout=0)
+    assert test.epics.PV.created == created + 3
+    test.epics.PV.values = {}
+
+
+def test_evaluate():
+    logger = logging.getLogger(__name__)
+    attr = {'greater_than': 10.0, 'less_than': 20.0, 'description': 'energy'}
+    assert pv.evaluate(logger, 'energy', 15.0, attr)
+    assert not pv.evaluate(logger, 'energy', 4.0, attr)
+    assert not pv.evaluate(logger, 'energy', None, attr)
+
+
+def test_monitor():
+    test.epics.PV.values = {'b': None}
+    pv.connections.clear()
+    required = {'a': {'greater_than': 3.0}, 'b': {'less_than': 10.0}}
+    transitions = []
+    monitor = pv.PvMonitor(required, logging.getLogger(__name__),
+                           lambda name, value, ok: transitions.append((name, value, ok)))
+    monitor.start()
+    assert transitions == [('a', 4.0, True)]
+    a = pv.connections['a']
+    # only the transitions give feedback
+    a.put(5.0)
+    a.put(2.0)
+    a.put(1.0)
+    a.put(6.0)
+    assert transitions[1:] == [('a', 2.0, False), ('a', 6.0, True)]
+    assert not monitor.is_ok()
+    monitor.check_missing()
+    assert transitions[-1] == ('b', None, False)
+    b = pv.connections['b']
+    b.set_connected(True)
+    b.put(5.0)
+    assert monitor.is_ok()
+    a.set_connected(False)
+    assert transitions[-1] == ('a', None, False)
+    monitor.stop()
+    a.put(7.0)
+    assert transitions[-1] == ('a', None, False)
+    test.epics.PV.values = {}
@@ -0,0 +1,67 @@
+import numpy as np
+import dquality.common.qualitychecks as calc
+from dquality.common.containers import Data
+
+
+limits = {'mean': {'low_limit': 0, 'high_limit': 40000},
+          'std': {'low_limit': 0, 'high_limit': 30000},
+          'sum': {'low_limit': 0, 'high_limit': 1e12},
+          'pix_sat': {'high_limit': 60000},
+          'Npix_sat': {'high_limit': 100},
+          'diff_sat': {'high_limit': 100},
+          'pix_sat_cnt_rate': {'high_limit': 500000},
+          'Npix_sat_cnt_rate': {'high_limit': 100}}
+checks = ['mean', 'st_dev', 'sum', 'Npix_sat', 'diff_sat', 'Npix_sat_cnt_rate']
+
+
+def evaluate(frame, last_frame):
+    data = Data(0, frame, 'data', acq_time=0.1)
+    results = calc.run_quality_checks(data, 0, limits, checks, last_frame=last_frame)
+    return dict((result.quality_id, result) for result in results.results)
+
+
+def compare(frame, last_frame):
+    # the results on native data type must match results on frames upcast as the readers used to do
+    native = evaluate(frame, last_frame)
+    upcast = evaluate(np.array(frame, dtype=np.int32), np.array(last_frame, dtype=np.int32))
+    for qc in native:
+        assert np.isclose(float(native[qc].res), float(upcast[qc].res), rtol=1e-6)
+        assert native[qc].error == upcast[qc].error
+
+
+def test_native_uint16():
+    rs = np.random.RandomState(0)
+    frame = rs.randint(0, 65536, size=(512, 512)).astype(np.uint16)
+    last_frame = rs.randint(0, 65536, size=(512, 512)).astype(np.uint16)
+    compare(frame, last_frame)
+
+
+def test_native_uint8():
+    rs = np.random.RandomState(1)
+    frame = rs.randint(0, 256, size=(256, 256)).astype(np.uint8)
+    last_frame = rs.randint(0, 256, size=(256, 256)).astype(np.uint8)
+    compare(frame, last_frame)
+
+
+def test_sum_does_not_overflow():
+    frame = np.full((2048, 2048), 4000000000, dtype=np.uint32)
+    data = Data(0, frame, 'data')
+    result = calc.sum(data=data, limits=limits)
+    assert result.res == 4000000000 * 2048 * 2048
+
+
+def test_diff_sat_unsigned():
+    # the pixels decreasing in intensity must not wrap around to high differences
+    last_frame = np.full((16, 16), 1000, dtype=np.uint16)
+    frame = np.full((16, 16), 10, dtype=np.uint16)
+    frame[0, 0:5] = 65000
+    data = Data(0, frame, 'data')
+    result = calc.diff_sat(data=data, limits=limits, last_frame=last_frame)
+    assert result.res == 5
+
+
+def test_evaluate_metrics():
+    values = np.array([-1.0, 0.0, 50.0, 100.0, 101.0, np.nan])
+    for this_limits in ({'low_limit': 0, 'high_limit': 100}, {'high_limit': 100}, {'low_limit': 0}, {}):
+        errors = calc.evaluate_metrics(values, this_limits)
+        assert list(errors) == [calc.find_result(value, 'mean', this_limits).error for value in values]
@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import logging
+import h5py
+import numpy as np
+import dquality.common.constants as const
+import dquality.common.result_cache as result_cache
+import dquality.data as dataver
+from dquality.common.result_cache import ResultCache
+from dquality.common.containers import Metrics
+
+
+limits = {'data': {'mean': {'low_limit': 0, 'high_limit': 1000},
+                   'std': {'low_limit': 0, 'high_limit': 1000},
+                   'pix_sat': {'high_limit': 90},
+                   'Npix_sat': {'high_limit': 1000}}}
+quality_checks = {'data': ['mean', 'st_dev', 'Npix_sat']}
+
+
+def write_file(dir, name, data):
+    file = os.path.join(dir, name)
+    with open(file, 'wb') as fp:
+        fp.write(data)
+    return file
+
+
+def test_config_key():
+    key = result_cache.get_config_key(quality_checks, limits)
+    changed = {'data': dict(limits['data'], mean={'low_limit': 0, 'high_limit': 10})}
+    # the thresholds are evaluated against cached results, the calculation parameters are not
+    assert result_cache.get_config_key(quality_checks, changed) == key
+    changed = {'data': dict(limits['data'], pix_sat={'high_limit': 80})}
+    assert result_cache.get_config_key(quality_checks, changed) != key
+    assert result_cache.get_config_key({'data': ['mean']}, limits) != key
+    statistical = {'data': ['mean', 'stat_mean']}
+    changed = {'data': dict(limits['data'], mean={'low_limit': 0, 'high_limit': 10})}
+    assert result_cache.get_config_key(statistical, changed) != result_cache.get_config_key(statistical, limits)
+
+
+def test_identity_and_eviction():
+    dir = tempfile.mkdtemp()
+    cache = ResultCache(os.path.join(dir, 'cache'), max_entries=2)
+    files = [write_file(dir, 'f%d' % i, b'data') for i in range(3)]
+    metrics = {'data': Metrics('data', np.arange(2), {'mean': np.array([1.0, 2.0])})}
+
+    keys = [cache.get_key(file, 'config') for file in files]
+    assert len(set(keys)) == 3
+    assert cache.get_key(os.path.join(dir, 'missing'), 'config') is None
+    for key, file in zip(keys, files):
+        cache.put(key, file, metrics)
+    # the first entry is the least recently used one
+    assert cache.get(keys[0]) is None
+    cached = cache.get(keys[2])
+    assert np.array_equal(cached['data'].values['mean'], [1.0, 2.0])
+    assert len([f for f in os.listdir(os.path.join(dir, 'cache')) if f.endswith('.npz')]) == 2
+
+    # a modified file is a different file
+    os.utime(files[2], (1500000000, 1500000000))
+    assert cache.get_key(files[2], 'config') != keys[2]
+    cache.close()
+    shutil.rmtree(dir)
+
+
+def test_fast_hash():
+    dir = tempfile.mkdtemp()
+    cache = ResultCache(os.path.join(dir, 'cache'), fast_hash=True)
+    file = write_file(dir, 'f', b'a' * 200000)
+    key = cache.get_key(file, 'config')
+    write_file(dir, 'f', b'a' * 199999 + b'b')
+    os.utime(file, (1500000000, 1500000000))
+    key1 = cache.get_key(file, 'config')
+    write_file(dir, 'f', b'a' * 199999 + b'c')
+    os.utime(file, (1500000000, 1500000000))
+    assert key != key1
+    assert cache.get_key(file, 'config') != key1
+    cache.close()
+    shutil.rmtree(dir)
+
+
+def test_verify_cached():
+    dir = tempfile.mkdtemp()
+    file = os.path.join(dir, 'test.h5')
+    data = np.random.RandomState(0).randint(0, 100, size=(6, 8, 8)).astype(np.uint16)
+    types = ['data_dark', 'data_white', 'data']
+    tags = {}
+    with h5py.File(file, 'w') as fp:
+        for type in types:
+            tags[type] = '/exchange/' + type
+            fp.create_dataset(tags[type], data=data)
+    checks = dict((type, quality_checks['data']) for type in types)
+    logger = logging.getLogger(__name__)
+    cache = ResultCache(os.path.join(dir, 'cache'))
+
+    def verify(limits):
+        limits = dict((type, limits['data']) for type in types)
+        return dataver.verify_file(logger, file, const.FILE_TYPE_HDF, tags, limits, checks, const.REPORT_NONE,
+                                   None, None, True, cache)
+
+    assert verify(limits)['data'] == []
+    assert (cache.hits, cache.misses) == (0, 1)
+    # the cached results are evaluated against the changed threshold
+    high_limit = float(np.median(data.mean(axis=(1, 2))))
+    changed = {'data': dict(limits['data'], mean={'low_limit': 0, 'high_limit': high_limit})}
+    expected = [i + 2 * len(data) for i in range(len(data)) if data[i].mean() > high_limit]
+    assert sorted(verify(changed)['data']) == expected
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+    shutil.rmtree(dir)
@@ -0,0 +1,61 @@
+import os
+import json
+import shutil
+import tempfile
+import logging
+import numpy as np
+import dquality.rethreshold as rethreshold
+import dquality.common.result_cache as result_cache
+from dquality.common.containers import Metrics
+
+
+limits = {'data': {'mean': {'low_limit': 10, 'high_limit': 90},
+                   'std': {'low_limit': 0, 'high_limit': 30}}}
+quality_checks = {'data': ['mean', 'st_dev']}
+
+
+def get_metrics(seed, n):
+    rs = np.random.RandomState(seed)
+    values = {'mean': rs.uniform(0, 100, n), 'st_dev': rs.uniform(0, 40, n)}
+    return {'data': Metrics('data', np.arange(n), values)}
+
+
+def expected(metrics):
+    values = metrics['data'].values
+    failed = (values['mean'] < 10) | (values['mean'] > 90) | (values['st_dev'] > 30)
+    return np.nonzero(failed)[0].tolist()
+
+
+def test_evaluate():
+    metrics = get_metrics(0, 100000)
+    bad_indexes = rethreshold.evaluate(logging.getLogger(__name__), metrics, limits, quality_checks)
+    assert bad_indexes['data'] == expected(metrics)
+
+
+def test_verify():
+    dir = tempfile.mkdtemp()
+    metrics_dir = os.path.join(dir, 'metrics')
+    os.makedirs(metrics_dir)
+    with open(os.path.join(dir, 'limits.json'), 'w') as fp:
+        json.dump(limits, fp)
+    with open(os.path.join(dir, 'qc.json'), 'w') as fp:
+        json.dump(quality_checks, fp)
+    config = os.path.join(dir, 'dqconfig.ini')
+    with open(config, 'w') as fp:
+        fp.write("'limits' = " + os.path.join(dir, 'limits.json') + "\n")
+        fp.write("'quality_checks' = " + os.path.join(dir, 'qc.json') + "\n")
+        fp.write("'log_file' = " + os.path.join(dir, 'default.log') + "\n")
+
+    all_metrics = {}
+    for i in range(3):
+        file = os.path.join(dir, 'scan_%d.h5' % i)
+        all_metrics[file] = get_metrics(i, 1000)
+        result_cache.save_metrics(result_cache.get_metrics_file(file, metrics_dir), all_metrics[file], file)
+
+    report_file = os.path.join(dir, 'rethreshold.report')
+    bad_indexes = rethreshold.verify(config, metrics_dir, report_file)
+    assert sorted(bad_indexes.keys()) == sorted(all_metrics.keys())
+    for file in all_metrics:
+        assert bad_indexes[file]['data'] == expected(all_metrics[file])
+    assert os.path.getsize(report_file) > 0
+    shutil.rmtree(dir)
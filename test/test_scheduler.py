@@ -0,0 +1,56 @@
+import time
+import threading
+from dquality.common.scheduler import PollScheduler, PollJob
+
+
+def test_backoff_and_speedup():
+    job = PollJob('folder', None, 1.0, 0.25, 8.0)
+    job.adjust(0)
+    job.adjust(0)
+    assert job.interval == 4.0
+    job.adjust(0)
+    job.adjust(0)
+    assert job.interval == 8.0
+    job.adjust(3)
+    assert job.interval == 0.25
+
+
+def test_single_thread_polls():
+    threads = set()
+    polls = {'a': 0, 'b': 0}
+
+    def poll(name):
+        threads.add(threading.current_thread().ident)
+        polls[name] += 1
+        return 1
+
+    scheduler = PollScheduler()
+    job_a = scheduler.add('a', lambda: poll('a'), 0.02)
+    job_b = scheduler.add('b', lambda: poll('b'), 0.05)
+    time.sleep(0.3)
+    scheduler.remove(job_a)
+    count = polls['a']
+    time.sleep(0.1)
+    scheduler.stop()
+
+    assert len(threads) == 1
+    assert count >= 5
+    # the removed job is not polled any more
+    assert polls['a'] == count
+    assert polls['b'] >= 3
+    metrics = job_b.get_metrics()
+    assert metrics['polls'] == polls['b']
+    assert metrics['activity'] == polls['b']
+    assert metrics['max_time'] >= metrics['mean_time']
+
+
+def test_failed_poll():
+    def poll():
+        raise IOError('directory removed')
+
+    scheduler = PollScheduler()
+    job = scheduler.add('a', poll, 0.01, 0.01, 0.04)
+    time.sleep(0.2)
+    scheduler.stop()
+    assert job.polls >= 2
+    assert job.interval == 0.04
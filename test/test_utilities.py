@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import h5py
+import numpy as np
+import dquality.common.utilities as utils
+
+
+def write_hdf(file):
+    with h5py.File(file, 'w') as fp:
+        fp.create_dataset('/exchange/data', data=np.zeros((2, 4, 4), dtype='u2'))
+        fp.create_dataset('/exchange/theta', data=np.zeros(2))
+        fp.create_group('/measurement')
+
+
+def test_hdf_index():
+    dir = tempfile.mkdtemp()
+    file = os.path.join(dir, 'test.h5')
+    write_hdf(file)
+
+    fp, tags = utils.get_data_hdf(file)
+    assert tags['/exchange/data'] == '/exchange/data'
+    assert '/exchange/theta' in tags
+    assert '/measurement' not in tags
+    assert tags.get('/exchange/missing') is None
+    try:
+        tags['/exchange/missing']
+        assert False
+    except KeyError:
+        pass
+    # the names were resolved without traversal
+    layout = utils.get_hdf_layout(file)
+    assert layout['names'] is None
+    assert sorted(tags.keys()) == ['/exchange/data', '/exchange/theta']
+    fp.close()
+
+    # the layout is reused when the file is opened again, and not when it was modified
+    fp, tags = utils.get_data_hdf(file)
+    assert tags.layout is layout
+    fp.close()
+    os.utime(file, (1500000000, 1500000000))
+    fp, tags = utils.get_data_hdf(file)
+    assert tags.layout is not layout
+    fp.close()
+    shutil.rmtree(dir)
+
+
+def test_hdf_template():
+    dir = tempfile.mkdtemp()
+    files = [os.path.join(dir, 'test_%d.h5' % i) for i in range(3)]
+    for file in files:
+        write_hdf(file)
+
+    for file in files:
+        fp, tags = utils.get_data_hdf(file, files[0])
+        assert np.array_equal(fp[tags['/exchange/data']][0], np.zeros((4, 4)))
+        assert tags.layout is utils.get_hdf_layout(files[0])
+        fp.close()
+    shutil.rmtree(dir)
+
+
+def test_logger(tmpdir):
+    import logging
+    import multiprocessing
+    lfile = os.path.join(str(tmpdir), 'test.log')
+    conf = {'log_file': lfile, 'time_zone': 'UTC'}
+    logger = utils.get_logger('test_logger', conf)
+    # the handler is added once, the writer is shared
+    assert utils.get_logger('test_logger', conf).handlers == logger.handlers
+    logger.info('frame %d verified', 3)
+    utils.stop_log_writers()
+    with open(lfile) as f:
+        assert f.read().endswith('INFO:  test_logger:  frame 3 verified\n')
+    # a new writer is started when the logger is initialized again
+    logger = utils.get_logger('test_logger', conf)
+    assert len(logger.handlers) == 1
+    logger.info('again')
+    utils.stop_log_writers()
+    with open(lfile) as f:
+        assert f.read().endswith('test_logger:  again\n')
+
+    # the records that do not fit in the queue are dropped and counted
+    log_queue = multiprocessing.Queue(1)
+    handler = utils.LogQueueHandler(log_queue, lfile)
+    for i in range(3):
+        handler.emit(logging.makeLogRecord({'msg': 'record %d', 'args': (i,)}))
+    assert handler.dropped == 2
+    assert log_queue.get(timeout=5).msg == 'record 0'
+    handler.emit(logging.makeLogRecord({'name': 'test', 'msg': 'record'}))
+    assert log_queue.get(timeout=5).msg == '2 log records dropped, the log writer did not keep up'